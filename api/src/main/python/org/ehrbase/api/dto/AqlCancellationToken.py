@@ -0,0 +1,70 @@
+import threading
+import time
+from enum import Enum
+from typing import Callable, Dict, Optional
+
+from aql_query_cancelled_exception import AqlQueryCancelledException
+
+
+class AqlCancelReason(Enum):
+    CLIENT_DISCONNECT = "client_disconnect"
+    TIMEOUT = "timeout"
+    CANCELLED = "cancelled"
+
+
+class AqlCancellationToken:
+    """
+    Cancellation state of one AQL execution, shared between the thread running the query and
+    the ones that may cancel it (HTTP disconnect watcher, job cancellation). Callbacks registered
+    by the repository issue the backend cancel of the running statement.
+    """
+
+    def __init__(self, timeout: Optional[int] = None, clock: Callable[[], float] = time.monotonic):
+        # timeout in milliseconds, enforced as statement_timeout while the query runs
+        self.clock = clock
+        self.deadline = clock() + timeout / 1000 if timeout is not None else None
+        self.reason: Optional[AqlCancelReason] = None
+        self._callbacks: Dict[int, Callable[[AqlCancelReason], None]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def cancel(self, reason: AqlCancelReason = AqlCancelReason.CANCELLED) -> None:
+        with self._lock:
+            if self.reason is not None:
+                return
+            self.reason = reason
+            callbacks = list(self._callbacks.values())
+        for callback in callbacks:
+            callback(reason)
+
+    def is_cancelled(self) -> bool:
+        if self.reason is None and self.deadline is not None and self.clock() >= self.deadline:
+            self.cancel(AqlCancelReason.TIMEOUT)
+        return self.reason is not None
+
+    def remaining(self) -> Optional[int]:
+        """Milliseconds left until the deadline, None without timeout."""
+        if self.deadline is None:
+            return None
+        return max(0, int((self.deadline - self.clock()) * 1000))
+
+    def raise_if_cancelled(self) -> None:
+        if self.is_cancelled():
+            raise AqlQueryCancelledException(f"AQL query cancelled: {self.reason.value}", self.reason)
+
+    def on_cancel(self, callback: Callable[[AqlCancelReason], None]) -> Callable[[], None]:
+        """Registers a callback run once on cancellation, immediately if already cancelled; returns its removal."""
+        with self._lock:
+            reason = self.reason
+            if reason is None:
+                callback_id = self._next_id
+                self._next_id += 1
+                self._callbacks[callback_id] = callback
+        if reason is not None:
+            callback(reason)
+            return lambda: None
+
+        def remove() -> None:
+            with self._lock:
+                self._callbacks.pop(callback_id, None)
+        return remove
@@ -0,0 +1,18 @@
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from query_result_dto import QueryResultDto
+
+
+@dataclass
+class AqlQueryBatchItem:
+    """Outcome of one query of a batch, see AqlQueryBatchService."""
+    query: str
+    # the meta data the query would have been answered with on its own
+    meta: Any = None
+    result: Optional[QueryResultDto] = None
+    # set instead of result when the query failed, the other queries of the batch are not affected
+    error: Optional[Exception] = field(default=None, compare=False)
+
+    def succeeded(self) -> bool:
+        return self.error is None
@@ -18,6 +18,11 @@ class EhrbaseMetaProperty(Enum):
     DRY_RUN = "dry_run"
     EXECUTED_SQL = "executed_sql"
     QUERY_PLAN = "query_plan"
+    PLAN_CACHE = "plan_cache"
+    CONTINUATION_TOKEN = "continuation_token"
+    RESULT_CACHE = "result_cache"
+    PROFILE = "profile"
+    SAMPLE = "sample"
 
     def property_name(self) -> str:
         return self.value
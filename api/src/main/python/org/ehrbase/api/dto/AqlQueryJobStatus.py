@@ -0,0 +1,32 @@
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+from typing import Dict, Optional
+
+
+class AqlQueryJobState(Enum):
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    SUCCEEDED = "SUCCEEDED"
+    FAILED = "FAILED"
+    CANCELLED = "CANCELLED"
+
+    def is_finished(self) -> bool:
+        return self in (AqlQueryJobState.SUCCEEDED, AqlQueryJobState.FAILED, AqlQueryJobState.CANCELLED)
+
+
+@dataclass
+class AqlQueryJobStatus:
+    job_id: str
+    state: AqlQueryJobState
+    query: str
+    submitted: datetime
+    started: Optional[datetime] = None
+    finished: Optional[datetime] = None
+    # rows spooled so far; the final row count once the job succeeded
+    row_count: int = 0
+    # column name -> AQL path, available once the job is running
+    columns: Optional[Dict[str, Optional[str]]] = None
+    error: Optional[str] = None
+    # the job and its result are removed after this point in time
+    expires: Optional[datetime] = None
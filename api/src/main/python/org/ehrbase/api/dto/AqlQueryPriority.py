@@ -0,0 +1,9 @@
+from enum import Enum
+
+
+class AqlQueryPriority(Enum):
+    """Admission class of an AQL query, each class has its own concurrency limit."""
+    # clinical reads waiting for an answer
+    INTERACTIVE = "interactive"
+    # analytics, background jobs and queries demoted for their estimated cost
+    BATCH = "batch"
@@ -2,12 +2,25 @@ from dataclasses import dataclass, field
 from typing import Dict, Optional, Any
 import json
 
+from aql_cancellation_token import AqlCancellationToken
+from aql_query_priority import AqlQueryPriority
+
 @dataclass
 class AqlQueryRequest:
     query_string: str
     parameters: Optional[Dict[str, Any]] = field(default_factory=dict)
     fetch: Optional[int] = None
     offset: Optional[int] = None
+    # keyset pagination: the first page is requested with keyset=True, later pages with the returned token
+    keyset: bool = False
+    continuation_token: Optional[str] = None
+    # opt-in to the AQL result cache
+    cache: bool = False
+    # approximate execution over this ratio of the version objects, see AqlQuerySample
+    sample: Optional[float] = None
+    priority: AqlQueryPriority = AqlQueryPriority.INTERACTIVE
+    # cancels the execution on client disconnect or after the timeout it was created with
+    cancellation: Optional[AqlCancellationToken] = field(default=None, compare=False, repr=False)
 
     def __post_init__(self):
         if self.parameters is not None:
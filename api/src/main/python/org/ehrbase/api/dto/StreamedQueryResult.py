@@ -0,0 +1,42 @@
+from dataclasses import dataclass
+from itertools import islice
+from typing import Dict, Iterator, List, Optional
+
+
+@dataclass
+class StreamedQueryResult:
+    # column name -> AQL path, as in QueryResultDto.variables
+    columns: Dict[str, Optional[str]]
+    # lazily fetched result rows; must be exhausted or closed to release the database connection
+    rows: Iterator[List[object]]
+    # the same result as one list of column values per fetched chunk, rows then iterates over them;
+    # consume either rows or chunks
+    chunks: Optional[Iterator[List[List[object]]]] = None
+
+    @staticmethod
+    def of_chunks(columns: Dict[str, Optional[str]], chunks: Iterator[List[List[object]]]) -> 'StreamedQueryResult':
+        return StreamedQueryResult(columns, StreamedQueryResult.chunk_rows(chunks), chunks)
+
+    @staticmethod
+    def chunk_rows(chunks: Iterator[List[List[object]]]) -> Iterator[List[object]]:
+        for chunk in chunks:
+            yield from map(list, zip(*chunk))
+
+    def column_chunks(self, chunk_rows: int = 1000) -> Iterator[List[List[object]]]:
+        """The result column-wise, chunk by chunk, also when it was created from rows."""
+        if self.chunks is not None:
+            return self.chunks
+        return self._transposed(chunk_rows)
+
+    def _transposed(self, chunk_rows: int) -> Iterator[List[List[object]]]:
+        while True:
+            rows = list(islice(self.rows, chunk_rows))
+            if not rows:
+                return
+            yield [list(column) for column in zip(*rows)]
+
+    def close(self) -> None:
+        for iterator in (self.rows, self.chunks):
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
@@ -0,0 +1,6 @@
+class AqlQueryCancelledException(RuntimeError):
+    """Raised when an AQL query was cancelled before it completed, see AqlCancellationToken."""
+
+    def __init__(self, message: str, reason: 'AqlCancelReason'):
+        super().__init__(message)
+        self.reason = reason
@@ -0,0 +1,6 @@
+class ServiceUnavailableException(RuntimeError):
+    """Raised when a request is rejected because the server is at capacity; it may be retried later."""
+
+    def __init__(self, message: str, retry_after: int = None):
+        super().__init__(message)
+        self.retry_after = retry_after
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import Callable, List, Optional
 from uuid import UUID
 import io
 
@@ -86,3 +86,19 @@ class KnowledgeCacheService(ABC):
         :return: UUID or None
         """
         pass
+
+    @abstractmethod
+    def add_template_change_listener(self, listener: Callable[[str], None]) -> None:
+        """
+        Registers a callback that is invoked with the template ID whenever a template is added, updated or deleted.
+        :param listener: Callback receiving the template ID
+        """
+        pass
+
+    @abstractmethod
+    def get_containment_index(self) -> 'TemplateContainmentIndex':
+        """
+        Archetype nestings of all stored templates, used to prune AQL CONTAINS clauses.
+        :return: Index that is replaced whenever a template is added, updated or deleted
+        """
+        pass
@@ -8,3 +8,11 @@ class EHRbaseHeader:
     AQL_EXECUTED_SQL = "EHRbase-AQL-Executed-SQL"
     
     AQL_QUERY_PLAN = "EHRbase-AQL-Query-Plan"
+    
+    AQL_STREAM = "EHRbase-AQL-Stream"
+    
+    AQL_CACHE = "EHRbase-AQL-Cache"
+    
+    AQL_SAMPLE = "EHRbase-AQL-Sample"
+    
+    AQL_PRIORITY = "EHRbase-AQL-Priority"
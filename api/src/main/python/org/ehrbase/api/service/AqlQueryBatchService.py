@@ -0,0 +1,21 @@
+from abc import ABC, abstractmethod
+from typing import List
+
+from aql_query_batch_item import AqlQueryBatchItem
+from aql_query_request import AqlQueryRequest
+
+
+class AqlQueryBatchService(ABC):
+    """Runs several independent AQL queries of one client request concurrently."""
+
+    @abstractmethod
+    def execute(self, aql_query_requests: List[AqlQueryRequest], snapshot: bool = False) -> List[AqlQueryBatchItem]:
+        """
+        Executes the queries and returns their outcomes in request order. A failing query
+        is reported in its item and does not fail the batch.
+
+        :param snapshot: Whether all queries read from one REPEATABLE READ snapshot,
+            so their results are consistent with each other
+        :raises UnprocessableEntityException: When the batch holds more queries than allowed
+        """
+        pass
@@ -0,0 +1,44 @@
+from abc import ABC, abstractmethod
+from typing import Iterator
+
+from aql_query_request import AqlQueryRequest
+from aql_query_job_status import AqlQueryJobStatus
+
+
+class AqlQueryJobService(ABC):
+    """Runs AQL queries in the background and keeps their results for later download."""
+
+    @abstractmethod
+    def submit(self, aql_query_request: AqlQueryRequest) -> AqlQueryJobStatus:
+        """
+        Queues the query for background execution.
+
+        :raises ServiceUnavailableException: When too many jobs are queued or running
+        """
+        pass
+
+    @abstractmethod
+    def get_status(self, job_id: str) -> AqlQueryJobStatus:
+        """
+        :raises ObjectNotFoundException: When there is no such job, e.g. because its retention period ended
+        """
+        pass
+
+    @abstractmethod
+    def read_rows(self, job_id: str, offset: int, limit: int) -> Iterator[str]:
+        """
+        Reads a range of spooled result rows, each as a serialized JSON array.
+
+        :raises ObjectNotFoundException: When there is no such job
+        :raises StateConflictException: When the job has not succeeded
+        """
+        pass
+
+    @abstractmethod
+    def cancel(self, job_id: str) -> AqlQueryJobStatus:
+        """
+        Cancels a queued or running job; finished jobs are left unchanged.
+
+        :raises ObjectNotFoundException: When there is no such job
+        """
+        pass
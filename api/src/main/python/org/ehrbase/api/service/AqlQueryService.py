@@ -10,6 +10,10 @@ class QueryResultDto:
     # Placeholder for the QueryResultDto class definition.
     pass
 
+class StreamedQueryResult:
+    # Placeholder for the StreamedQueryResult class definition.
+    pass
+
 class AqlQueryService(ABC):
     @abstractmethod
     def query(self, aql_query_request: AqlQueryRequest) -> QueryResultDto:
@@ -20,3 +24,13 @@ class AqlQueryService(ABC):
         :return: An object containing the results of the query.
         """
         pass
+
+    @abstractmethod
+    def stream(self, aql_query_request: AqlQueryRequest) -> StreamedQueryResult:
+        """
+        Execute an AQL query and return its rows lazily, fetched in chunks from a server-side cursor.
+
+        :param aql_query_request: An object containing the AQL query and optional parameters.
+        :return: The result columns and an iterator over the result rows.
+        """
+        pass
@@ -14,10 +14,20 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from datetime import timedelta
+
 from flask import Flask
 from flask_injector import FlaskInjector
 from injector import singleton, inject
 
+from aql_connection_pool import AqlConnectionPool
+from aql_query_plan_cache import AqlQueryPlanCache
+from aql_sql_query_builder import AqlSqlQueryBuilder
+from aql_result_cache import AqlResultCache
+from aql_query_job_service_imp import AqlQueryJobServiceImp
+from aql_query_batch_service_imp import AqlQueryBatchServiceImp
+from aql_admission_control import AqlAdmissionControl, AqlAdmissionProperties, OverLimitAction
+
 # Assuming a module-level scan (mimicking @ComponentScan in Java)
 # We define components/modules below
 
@@ -39,6 +49,65 @@ class AqlEngineModuleConfiguration:
         # Register the module or services (mimicking component scanning)
         FlaskInjector(app=self.app, modules=[AqlEngineModule])
 
+def create_aql_sql_query_builder(knowledge_cache, post_processor=None) -> AqlSqlQueryBuilder:
+    """
+    Creates the SQL query builder on the static table model of jooq_tables;
+    building queries does not contact the database.
+    """
+    return AqlSqlQueryBuilder(knowledge_cache, post_processor)
+
+def create_aql_query_plan_cache(knowledge_cache, max_size: int = AqlQueryPlanCache.DEFAULT_MAX_SIZE) -> AqlQueryPlanCache:
+    """
+    Creates the shared AQL plan cache and evicts it whenever a template is added, updated or deleted.
+    """
+    plan_cache = AqlQueryPlanCache(max_size)
+    knowledge_cache.add_template_change_listener(plan_cache.on_template_changed)
+    return plan_cache
+
+def create_aql_result_cache(knowledge_cache, change_notifier, max_size: int = AqlResultCache.DEFAULT_MAX_SIZE,
+                            ttl: float = AqlResultCache.DEFAULT_TTL) -> AqlResultCache:
+    """
+    Creates the shared AQL result cache, evicted by commits reported through the EhrDataChangeNotifier
+    and cleared whenever a template changes.
+    """
+    result_cache = AqlResultCache(max_size, ttl)
+    change_notifier.add_listener(result_cache.on_ehr_changed)
+    knowledge_cache.add_template_change_listener(result_cache.on_template_changed)
+    return result_cache
+
+def create_aql_query_job_service(aql_query_service, spool_dir: str = None, max_concurrent: int = 2, max_queued: int = 20,
+                                 retention_hours: float = 24, row_serializer=None) -> AqlQueryJobServiceImp:
+    """
+    Creates the background AQL job executor. aql_query_service has to use a query context
+    that is not bound to an HTTP request, as jobs outlive the request that submitted them.
+    """
+    return AqlQueryJobServiceImp(
+        aql_query_service, spool_dir, max_concurrent, max_queued, timedelta(hours=retention_hours), row_serializer
+    )
+
+def create_aql_query_batch_service(aql_query_service, connection_pool: AqlConnectionPool, context_factory,
+                                   max_concurrent: int = 4, max_queries: int = 20) -> AqlQueryBatchServiceImp:
+    """
+    Creates the executor of AQL query batches. Every query runs on a copy of aql_query_service
+    with a fresh context from context_factory, which must not depend on the HTTP request,
+    as the queries run on worker threads.
+    """
+    return AqlQueryBatchServiceImp(
+        aql_query_service.with_context, context_factory, connection_pool, max_concurrent, max_queries
+    )
+
+def create_aql_admission_control(max_cost: float = None, max_rows: float = None, over_limit: str = "REJECT",
+                                 interactive_max_concurrent: int = 16, batch_max_concurrent: int = 2,
+                                 queue_timeout: float = 30.0) -> AqlAdmissionControl:
+    """
+    Creates the admission control passed to AqlQueryServiceImp. The concurrency limits apply per
+    server instance; together they should stay below the size of the AQL connection pool.
+    """
+    return AqlAdmissionControl(AqlAdmissionProperties(
+        max_cost, max_rows, OverLimitAction(over_limit.upper()),
+        interactive_max_concurrent, batch_max_concurrent, queue_timeout
+    ))
+
 # Create the Flask app and apply the configuration
 def create_app():
     app = Flask(__name__)
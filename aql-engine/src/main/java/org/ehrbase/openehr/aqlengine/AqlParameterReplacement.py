@@ -164,21 +164,136 @@ def pattern_compile(regex: str):
     """Wrapper around Python's regex compile function."""
     return re.compile(regex)
 import re
-from typing import List, Optional, Dict, Union
+from dataclasses import dataclass, replace
+from typing import List, Optional, Dict, Set, Union
+
+# kind of temporal string parameters, which are never bound (see ParameterBinder)
+TEMPORAL_KIND = "temporal"
+# kinds of list parameters by size: inlined, bound as one array, loaded into a temporary table
+LIST_KIND = "list"
+ARRAY_KIND = "array"
+TEMP_TABLE_KIND = "temp_table"
+
+
+@dataclass(frozen=True)
+class BoundParameter:
+    """Operand standing in for an AQL $parameter that is sent to the database as bind parameter."""
+    name: str
+    bind_name: str
+    # a list of MATCHES values, bound as one text array
+    array: bool = False
+    # a list of MATCHES values, loaded into a temporary table named bind_name per execution
+    temp_table: bool = False
+    # the parameter is also inlined elsewhere in the query, so the generated SQL depends on its value
+    inlined: bool = False
+
+
+class InlinedParameters(dict):
+    """The parameter values, remembering the names of those read to be inlined."""
+
+    def __init__(self, parameter_map: Dict[str, Union[int, float, str, bool]]):
+        super().__init__(parameter_map)
+        self.names: Set[str] = set()
+
+    def __getitem__(self, name: str):
+        value = super().__getitem__(name)
+        self.names.add(name)
+        return value
+
+    def get(self, name: str, default=None):
+        if name in self:
+            self.names.add(name)
+        return super().get(name, default)
+
+
+class ParameterBinder:
+    """
+    Decides which $parameters of the WHERE clause become bind parameters instead of being inlined.
+
+    With bind_scalars, scalar, non-temporal values compared against data paths are bound.
+    Values the ASL resolves while it is built (template uuids, archetype concepts, change type
+    codes, the system id) and temporal values (converted depending on the compared type) are
+    still inlined.
+
+    Independent of bind_scalars, MATCHES lists of at least ARRAY_THRESHOLD values are bound as
+    a single array, so parsing, rendering and planning do not grow with the list. From
+    TEMP_TABLE_THRESHOLD values on they are loaded into an analyzed temporary table instead,
+    giving the planner a row estimate that unnest() can not provide.
+    """
+
+    INLINED_PATH_ATTRIBUTES = frozenset({"archetype_node_id", "template_id", "change_type", "system_id"})
+    ARRAY_THRESHOLD = 100
+    TEMP_TABLE_THRESHOLD = 10000
+
+    def __init__(self, parameter_map: Dict[str, Union[int, float, str, bool]], bind_scalars: bool = True):
+        self.parameter_map = parameter_map
+        self.bind_scalars = bind_scalars
+        self.bound: Dict[str, BoundParameter] = {}
+
+    @staticmethod
+    def bind_name(name: str) -> str:
+        return "aql_" + re.sub(r"\W", "_", name)
+
+    def bind(self, statement, operand, matches: bool = False) -> Optional[BoundParameter]:
+        if not isinstance(operand, QueryParameter) or operand.name not in self.parameter_map:
+            return None
+        kind = AqlParameterReplacement.parameter_kind(self.parameter_map[operand.name])
+        if matches and kind in (ARRAY_KIND, TEMP_TABLE_KIND):
+            bound = BoundParameter(operand.name, self.bind_name(operand.name), True, kind == TEMP_TABLE_KIND)
+        elif self.bind_scalars and kind in ("str", "int", "float", "bool"):
+            bound = BoundParameter(operand.name, self.bind_name(operand.name))
+        else:
+            return None
+        if not isinstance(statement, IdentifiedPath) or statement.path is None:
+            return None
+        if self.INLINED_PATH_ATTRIBUTES.intersection(statement.path.render().split("/")):
+            return None
+        self.bound[operand.name] = bound
+        return bound
+
 
 class AqlParameterReplacement:
 
     @staticmethod
-    def replace_parameters(aql_query, parameter_map: Dict[str, Union[int, float, str, bool]]):
+    def replace_parameters(aql_query, parameter_map: Dict[str, Union[int, float, str, bool]],
+                           bind_parameters: bool = False) -> Dict[str, BoundParameter]:
+        """
+        Replaces the $parameters of aql_query by their values. Large MATCHES lists and, with
+        bind_parameters, eligible scalar parameters of the WHERE clause are replaced by
+        BoundParameter operands instead, so the generated SQL is the same for all values.
+        Returns the bound parameters by name; those also inlined at another occurrence are
+        marked as inlined.
+        """
+        binder = ParameterBinder(parameter_map, bind_parameters)
         if parameter_map:
+            inlined = InlinedParameters(parameter_map)
             # SELECT
-            SelectParams.replace_parameters(aql_query.select, parameter_map)
+            SelectParams.replace_parameters(aql_query.select, inlined)
             # FROM
-            ContainmentParams.replace_parameters(aql_query.from_, parameter_map)
+            ContainmentParams.replace_parameters(aql_query.from_, inlined)
             # WHERE
-            WhereParams.replace_parameters(aql_query.where, parameter_map)
+            WhereParams.replace_parameters(aql_query.where, inlined, binder)
             # ORDER BY
-            OrderByParams.replace_parameters(parameter_map, aql_query.order_by)
+            OrderByParams.replace_parameters(inlined, aql_query.order_by)
+            for name in inlined.names & binder.bound.keys():
+                binder.bound[name] = replace(binder.bound[name], inlined=True)
+        return binder.bound
+
+    @staticmethod
+    def parameter_kind(value) -> str:
+        """Type of a parameter value as far as it affects the generated SQL."""
+        if isinstance(value, str) and TemporalPrimitivePattern.matches(value):
+            return TEMPORAL_KIND
+        if isinstance(value, (list, tuple)):
+            if len(value) >= ParameterBinder.TEMP_TABLE_THRESHOLD:
+                return TEMP_TABLE_KIND
+            return ARRAY_KIND if len(value) >= ParameterBinder.ARRAY_THRESHOLD else LIST_KIND
+        return type(value).__name__
+
+    @staticmethod
+    def bind_value(bound: BoundParameter, value):
+        # lists are bound as text and cast to the type of the compared column in SQL
+        return [str(v) for v in value] if bound.array else value
 
     @staticmethod
     def replace_identified_path_parameters(identified_path, parameter_map: Dict[str, Union[int, float, str, bool]]):
@@ -218,26 +333,34 @@ class OrderByParams:
 class WhereParams:
 
     @staticmethod
-    def replace_parameters(where_condition, parameter_map: Dict[str, Union[int, float, str, bool]]):
+    def replace_parameters(where_condition, parameter_map: Dict[str, Union[int, float, str, bool]],
+                           binder: ParameterBinder):
         if where_condition is None:
             return
         elif isinstance(where_condition, ComparisonOperatorCondition):
             WhereParams.replace_comparison_left_operand_parameters(where_condition.statement, parameter_map)
-            AqlParameterReplacement.replace_operand_parameters(where_condition.value, parameter_map).if_present(
-                lambda value: where_condition.set_value(value)
-            )
+            bound = binder.bind(where_condition.statement, where_condition.value)
+            if bound is not None:
+                where_condition.set_value(bound)
+            else:
+                AqlParameterReplacement.replace_operand_parameters(where_condition.value, parameter_map).if_present(
+                    lambda value: where_condition.set_value(value)
+                )
         elif isinstance(where_condition, NotCondition):
-            WhereParams.replace_parameters(where_condition.condition_dto, parameter_map)
+            WhereParams.replace_parameters(where_condition.condition_dto, parameter_map, binder)
         elif isinstance(where_condition, MatchesCondition):
+            Utils.revise_list(where_condition.values,
+                              lambda operand: binder.bind(where_condition.statement, operand, matches=True))
             for i, operand in enumerate(where_condition.values):
                 WhereParams.replace_matches_parameters(operand, parameter_map)
         elif isinstance(where_condition, LikeCondition):
+            # LIKE patterns are translated to SQL while the ASL is built, so they are always inlined
             WhereParams.replace_like_operand_parameters(where_condition.value, parameter_map).if_present(
                 lambda value: where_condition.set_value(value)
             )
         elif isinstance(where_condition, LogicalOperatorCondition):
             for condition in where_condition.values:
-                WhereParams.replace_parameters(condition, parameter_map)
+                WhereParams.replace_parameters(condition, parameter_map, binder)
 
 
 class Utils:
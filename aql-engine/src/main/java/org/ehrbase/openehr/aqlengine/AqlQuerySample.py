@@ -0,0 +1,64 @@
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy import Text, cast, func
+
+from unprocessable_entity_exception import UnprocessableEntityException
+
+# z value of the reported error margin
+CONFIDENCE_Z = 1.96
+
+
+@dataclass(frozen=True)
+class AqlQuerySample:
+    """
+    Approximate execution over a deterministic sample of the queried version objects:
+    a row is kept when the hash of its vo_id (the ehr id for EHR roots) falls into the first
+    buckets of BUCKETS. Unlike TABLESAMPLE this also works on the structure subqueries of the
+    ASL, keeps a composition together with all of its data rows and selects the same sample
+    on every execution, so repeated dashboards do not flicker.
+    """
+    buckets: int
+
+    BUCKETS = 10000
+    METHOD = "vo_id_hash"
+
+    @staticmethod
+    def of_ratio(ratio: Any) -> 'AqlQuerySample':
+        try:
+            ratio = float(ratio)
+        except (TypeError, ValueError) as e:
+            raise UnprocessableEntityException(f"Invalid sampling ratio: {ratio}", e)
+        if not 0 < ratio <= 1:
+            raise UnprocessableEntityException(f"Sampling ratio {ratio} must be in (0, 1]")
+        return AqlQuerySample(max(1, round(ratio * AqlQuerySample.BUCKETS)))
+
+    @property
+    def ratio(self) -> float:
+        """The effective ratio, the requested one rounded to whole buckets."""
+        return self.buckets / self.BUCKETS
+
+    def condition(self, sampled_id):
+        # masked to a non-negative int4, abs() would overflow for -2^31
+        bucket = func.hashtext(cast(sampled_id, Text)).op("&")(0x7FFFFFFF) % self.BUCKETS
+        return bucket < self.buckets
+
+    def relative_error(self, count: int) -> Optional[float]:
+        """
+        Relative margin of a scaled count at CONFIDENCE_Z, treating the hash as Bernoulli
+        sampling: the standard error of count is sqrt(count * (1 - ratio) / ratio).
+        """
+        if count <= 0:
+            return None
+        return CONFIDENCE_Z * math.sqrt((1 - self.ratio) / (count * self.ratio))
+
+    def to_meta(self, counts: Iterable[int]) -> Dict[str, Any]:
+        # the smallest count has the largest relative error, it bounds all others
+        errors = [e for e in map(self.relative_error, counts) if e is not None]
+        return {
+            "ratio": self.ratio,
+            "method": self.METHOD,
+            "confidence": 0.95,
+            "relative_error": max(errors) if errors else None
+        }
@@ -0,0 +1,102 @@
+import base64
+import hashlib
+import json
+from dataclasses import dataclass
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from unprocessable_entity_exception import UnprocessableEntityException
+
+# labels of the hidden columns appended to the SELECT of keyset paginated queries
+KEYSET_COLUMN_PREFIX = "keyset_"
+KEYSET_TIEBREAKER_COLUMN = "keyset_vo_id"
+
+
+@dataclass(frozen=True)
+class ContinuationToken:
+    """
+    Position after the last row of a keyset paginated page:
+    the ORDER BY key values of that row plus its vo_id as tiebreaker.
+    """
+    query_hash: str
+    order_by_values: Tuple[Any, ...]
+    tiebreaker: Any
+
+    @staticmethod
+    def hash_query(normalized_aql: str, parameters: Optional[Dict[str, Any]] = None) -> str:
+        digest = hashlib.sha256(normalized_aql.encode("utf-8"))
+        if parameters:
+            digest.update(json.dumps(parameters, sort_keys=True, default=str).encode("utf-8"))
+        return digest.hexdigest()[:16]
+
+    @staticmethod
+    def from_keyset_row(query_hash: str, keyset_values: List[Any]) -> 'ContinuationToken':
+        return ContinuationToken(query_hash, tuple(keyset_values[:-1]), keyset_values[-1])
+
+    def encode(self) -> str:
+        payload = {
+            "q": self.query_hash,
+            "k": [_to_json(v) for v in self.order_by_values],
+            "t": _to_json(self.tiebreaker)
+        }
+        raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+    @staticmethod
+    def decode(token: str, expected_query_hash: Optional[str] = None) -> 'ContinuationToken':
+        try:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+            payload = json.loads(raw)
+            decoded = ContinuationToken(
+                payload["q"],
+                tuple(_from_json(v) for v in payload["k"]),
+                _from_json(payload["t"])
+            )
+        except (ValueError, KeyError, TypeError) as e:
+            raise UnprocessableEntityException(f"Invalid continuation token: {token}", e)
+
+        if expected_query_hash is not None and decoded.query_hash != expected_query_hash:
+            raise UnprocessableEntityException("Continuation token was issued for a different query")
+        return decoded
+
+    def null_mask(self) -> Tuple[bool, ...]:
+        """The seek predicate differs for NULL keys, so this is part of the compiled plan's identity."""
+        return tuple(v is None for v in self.order_by_values)
+
+    def bind_values(self) -> Dict[str, Any]:
+        values = {f"{KEYSET_COLUMN_PREFIX}{i}": v for i, v in enumerate(self.order_by_values) if v is not None}
+        values[KEYSET_TIEBREAKER_COLUMN] = self.tiebreaker
+        return values
+
+
+def _to_json(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    if isinstance(value, time):
+        return {"tm": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"n": str(value)}
+    if isinstance(value, UUID):
+        return {"u": str(value)}
+    return value
+
+
+def _from_json(value: Any) -> Any:
+    if not isinstance(value, dict):
+        return value
+    (tag, v), = value.items()
+    if tag == "dt":
+        return datetime.fromisoformat(v)
+    if tag == "d":
+        return date.fromisoformat(v)
+    if tag == "tm":
+        return time.fromisoformat(v)
+    if tag == "n":
+        return Decimal(v)
+    if tag == "u":
+        return UUID(v)
+    raise ValueError(f"Unknown continuation token value type {tag}")
@@ -1,13 +1,12 @@
 from typing import List, Optional, Dict, Set, Tuple, Callable, Union
-from sqlalchemy import create_engine, Table, Column, MetaData, select, and_, or_, desc, asc
+from sqlalchemy import ARRAY, Column, Text, select, and_, or_, desc, asc, false, bindparam, cast, column, table
 from sqlalchemy.sql import func
-from sqlalchemy.orm import sessionmaker
 
-# Define a basic setup for SQLAlchemy
-engine = create_engine('your_database_url')
-Session = sessionmaker(bind=engine)
-session = Session()
-metadata = MetaData()
+from additional_sql_functions import AdditionalSQLFunctions
+from aql_parameter_replacement import BoundParameter
+from aql_query_sample import AqlQuerySample
+from continuation_token import KEYSET_COLUMN_PREFIX, KEYSET_TIEBREAKER_COLUMN
+from unprocessable_entity_exception import UnprocessableEntityException
 
 # Placeholder for your actual KnowledgeCacheService and SystemService implementations
 class KnowledgeCacheService:
@@ -44,35 +43,101 @@ class AqlSqlLayer:
         path_to_field = AslPathCreator(alias_provider, self.knowledge_cache, self.system_service.get_system_id()).add_path_queries(query, contains_to_structure_subquery, asl_query)
 
         # SELECT
+        sample = query.get('sample')
         if not query.get('nonPrimitiveSelects'):
-            self.add_synthetic_select(query, contains_to_structure_subquery, asl_query)
+            self.add_synthetic_select(query, contains_to_structure_subquery, asl_query, sample)
         else:
-            uses_aggregate_function = self.add_select(query, path_to_field, asl_query)
-            self.add_order_by(query, path_to_field, asl_query, uses_aggregate_function)
+            uses_aggregate_function = self.add_select(query, path_to_field, asl_query, sample)
+            asl_query = self.add_order_by(query, path_to_field, asl_query, uses_aggregate_function)
+            asl_query = self.add_keyset(query, path_to_field, contains_to_structure_subquery, asl_query)
 
         # WHERE
         where_conditions = self.build_where_condition(query.get('where'), path_to_field)
         if where_conditions:
             asl_query = asl_query.where(and_(*where_conditions))
+        asl_query = self.add_sample(sample, contains_to_structure_subquery, asl_query)
 
         # LIMIT
         if query.get('limit') is not None:
             asl_query = asl_query.limit(query['limit'])
-        if query.get('offset') is not None:
+        if query.get('offset') is not None and not query.get('keyset'):
             asl_query = asl_query.offset(query['offset'])
 
         return asl_query
 
-    def add_order_by(self, query: dict, path_to_field: dict, root_query: select, uses_aggregate_function: bool):
+    def add_order_by(self, query: dict, path_to_field: dict, root_query: select, uses_aggregate_function: bool) -> select:
         order_by = query.get('orderBy', [])
         for o in order_by:
             field = path_to_field.get(o['identifiedPath'])
-            if field:
-                order = desc() if o['direction'] == 'DESC' else asc()
+            if field is not None:
+                order = desc(field) if o['direction'] == 'DESC' else asc(field)
                 root_query = root_query.order_by(order)
-
-    def add_select(self, query: dict, path_to_field: dict, root_query: select) -> bool:
+        return root_query
+
+    def add_keyset(self, query: dict, path_to_field: dict, contains_to_structure_subquery: select, root_query: select) -> select:
+        """
+        Keyset pagination: orders by the vo_id as tiebreaker, appends the ORDER BY keys as hidden
+        columns so that the next continuation token can be built from the last row and, when
+        continuing, replaces OFFSET by a seek predicate bound from the continuation token.
+        The vo_id only identifies a row for queries on a single root object, the others are rejected
+        by AqlQueryServiceImp.ensure_keyset_supported.
+        """
+        keyset = query.get('keyset')
+        if not keyset:
+            return root_query
+
+        keys = [
+            (path_to_field[o['identifiedPath']], o['direction'] == 'DESC')
+            for o in query.get('orderBy', [])
+        ]
+        tiebreaker = self.keyset_tiebreaker(contains_to_structure_subquery)
+
+        root_query = root_query.order_by(asc(tiebreaker))
+        root_query = root_query.add_columns(
+            *(field.label(f"{KEYSET_COLUMN_PREFIX}{i}") for i, (field, _) in enumerate(keys)),
+            tiebreaker.label(KEYSET_TIEBREAKER_COLUMN)
+        )
+        if keyset['seek']:
+            root_query = root_query.where(self.seek_condition(keys, keyset['null_mask'], tiebreaker))
+        return root_query
+
+    def add_sample(self, sample: Optional[AqlQuerySample], contains_to_structure_subquery: select, root_query: select) -> select:
+        """Restricts the query to the sampled version objects, see AqlQuerySample."""
+        if sample is None:
+            return root_query
+        return root_query.where(sample.condition(self.keyset_tiebreaker(contains_to_structure_subquery)))
+
+    @staticmethod
+    def keyset_tiebreaker(contains_to_structure_subquery: select):
+        columns = contains_to_structure_subquery.selected_columns
+        # EHR roots have no version object, their primary key is the ehr id
+        return columns.vo_id if 'vo_id' in columns else columns.id
+
+    @staticmethod
+    def seek_condition(keys: List[Tuple[Column, bool]], null_mask: Tuple[bool, ...], tiebreaker: Column):
+        """
+        (k1 after v1) OR (k1 = v1 AND k2 after v2) OR ... OR (k1 = v1 AND ... AND vo_id > v_vo_id),
+        following PostgreSQL's default NULLS LAST for ASC and NULLS FIRST for DESC.
+        """
+        alternatives = []
+        equal_prefix = []
+        for i, (field, descending) in enumerate(keys):
+            is_null = null_mask[i]
+            value = None if is_null else bindparam(f"{KEYSET_COLUMN_PREFIX}{i}")
+            if is_null:
+                after = field.is_not(None) if descending else false()
+                equal = field.is_(None)
+            else:
+                after = field < value if descending else or_(field > value, field.is_(None))
+                equal = field == value
+            alternatives.append(and_(*equal_prefix, after))
+            equal_prefix.append(equal)
+        alternatives.append(and_(*equal_prefix, tiebreaker > bindparam(KEYSET_TIEBREAKER_COLUMN)))
+        return or_(*alternatives)
+
+    def add_select(self, query: dict, path_to_field: dict, root_query: select, sample: Optional[AqlQuerySample] = None) -> bool:
         select_fields = query.get('nonPrimitiveSelects', [])
+        sample_ratio = sample.ratio if sample is not None else None
         aggregate_functions = []
         for select_item in select_fields:
             if select_item['type'] == 'PATH':
@@ -81,9 +146,12 @@ class AqlSqlLayer:
                     root_query = root_query.add_columns(field)
             elif select_item['type'] == 'AGGREGATE_FUNCTION':
                 field = path_to_field.get(select_item.get('identifiedPath'))
-                aggregate_function = func.count() if select_item.get('aggregateFunctionName') == 'COUNT' else None
-                if aggregate_function:
-                    aggregate_functions.append(aggregate_function(field))
+                if select_item.get('aggregateFunctionName') == 'COUNT':
+                    # counts over a sample are extrapolated, the other aggregates are estimated by the sample as is
+                    distinct = select_item.get('distinct', False)
+                    if distinct and sample is not None:
+                        raise UnprocessableEntityException("COUNT(DISTINCT) is not supported for sampled queries")
+                    aggregate_functions.append(AdditionalSQLFunctions.count(distinct, field, sample_ratio))
             else:
                 raise ValueError("Unsupported select type")
 
@@ -94,10 +162,12 @@ class AqlSqlLayer:
 
         return bool(aggregate_functions)
 
-    def add_synthetic_select(self, query: dict, contains_to_structure_subquery: select, root_query: select):
+    def add_synthetic_select(self, query: dict, contains_to_structure_subquery: select, root_query: select,
+                             sample: Optional[AqlQuerySample] = None):
         owner_for_synthetic_select = contains_to_structure_subquery  # Implement actual logic
         # Add a synthetic select for COUNT(*)
-        root_query = root_query.add_columns(func.count().label('count'))
+        sample_ratio = sample.ratio if sample is not None else None
+        root_query = root_query.add_columns(AdditionalSQLFunctions.count(False, None, sample_ratio).label('count'))
 
     def build_where_condition(self, condition: Optional[dict], path_to_field: dict) -> List[Union[and_, or_]]:
         if not condition:
@@ -114,9 +184,12 @@ class AqlSqlLayer:
         if 'comparisonOperator' in condition:
             field = path_to_field.get(condition['leftComparisonOperand']['path'])
             operator = condition['operator']
-            values = condition['rightComparisonOperands']
+            operands = condition['rightComparisonOperands']
+            values = [self.operand_value(v) for v in operands]
             if operator == 'EXISTS':
                 return [field.is_not(None)]
+            elif operator == 'MATCHES' and any(isinstance(v, BoundParameter) and v.array for v in operands):
+                return [self.matches_condition(field, operands)]
             elif operator in ('LIKE', 'MATCHES', 'EQ', 'GT_EQ', 'GT', 'LT_EQ', 'LT', 'NEQ'):
                 return [field.op(operator.lower())(values)]
             else:
@@ -124,6 +197,31 @@ class AqlSqlLayer:
 
         return []
 
+    @staticmethod
+    def operand_value(operand):
+        # bound AQL parameters stay placeholders, their values are supplied per execution
+        if isinstance(operand, BoundParameter):
+            return bindparam(operand.bind_name)
+        return operand
+
+    @staticmethod
+    def matches_condition(field, operands):
+        arrays = [o for o in operands if isinstance(o, BoundParameter) and o.array]
+        scalars = [AqlSqlLayer.operand_value(o) for o in operands if o not in arrays]
+        conditions = [field.in_(AqlSqlLayer.array_values(a, field.type)) for a in arrays]
+        if scalars:
+            conditions.append(field.in_(scalars))
+        return or_(*conditions)
+
+    @staticmethod
+    def array_values(bound: BoundParameter, value_type):
+        """Subquery over the values of a bound MATCHES list; the SQL is the same for any list length."""
+        if bound.temp_table:
+            # created and filled per execution by AqlQueryRepository.load_temp_tables
+            values = table(bound.bind_name, column("value", Text))
+            return select(cast(values.c.value, value_type))
+        return select(func.unnest(cast(bindparam(bound.bind_name, type_=ARRAY(Text)), ARRAY(value_type))))
+
 # Placeholders for other classes
 class AliasProvider:
     pass
@@ -1,13 +1,15 @@
-from typing import List, Dict, Optional, Tuple, Callable
-from sqlalchemy import create_engine, Table, Column, MetaData, select, join, and_, or_, func
-from sqlalchemy.orm import sessionmaker
+from typing import List, Dict, FrozenSet, Optional, Set, Tuple, Callable
+from sqlalchemy import select, join, and_, or_, func
 from sqlalchemy.sql import Join
 
-# Define your SQLAlchemy setup
-engine = create_engine('your_database_url')
-Session = sessionmaker(bind=engine)
-session = Session()
-metadata = MetaData()
+from aql_object_path_util import AqlObjectPathUtil
+from asl_false_query_condition import AslFalseQueryCondition
+from asl_field_value_query_condition import AslFieldValueQueryCondition
+from asl_utils import AslConditionOperator, AslStructureColumn, AslUtils
+from comparison_operator_predicate import ComparisonOperatorPredicate
+from rm_contains_wrapper import RmContainsWrapper
+from string_primitive import StringPrimitive
+from template_containment_index import ArchetypePath, TemplateContainmentIndex
 
 # Placeholder classes for functionality that needs to be implemented
 class KnowledgeCacheService:
@@ -75,10 +77,17 @@ class AslFromCreator:
     def __init__(self, alias_provider: AliasProvider, knowledge_cache: KnowledgeCacheService):
         self.alias_provider = alias_provider
         self.knowledge_cache = knowledge_cache
+        # set per FROM clause by prune_contains_chain
+        self.containment_index: Optional[TemplateContainmentIndex] = None
+        self.template_restrictions: Dict[ContainsWrapper, FrozenSet[str]] = {}
+        self.pruned_operands: Set[int] = set()
 
     def add_from_clause(self, root_query: AslEncapsulatingQuery, query_wrapper: 'AqlQueryWrapper') -> Callable[[ContainsWrapper], OwnerProviderTuple]:
         contains_to_structure_subquery = {}
         from_chain = query_wrapper.contains_chain()
+        if not self.prune_contains_chain(from_chain):
+            # no stored template can produce the requested archetype nesting, the query is not sent to the database
+            root_query.add_condition_and(AslFalseQueryCondition())
         self.add_contains_chain(root_query, None, from_chain, False, contains_to_structure_subquery)
 
         condition = self.build_contains_condition(from_chain, False, contains_to_structure_subquery)
@@ -123,6 +132,9 @@ class AslFromCreator:
 
         structure_query = self.contains_subquery(used_wrapper, requires_version_join, source_relation)
         structure_query.set_represents_original_version_expression(is_original_version)
+        template_ids = self.template_restrictions.get(used_wrapper)
+        if template_ids is not None and template_ids != self.containment_index.template_ids():
+            structure_query.add_condition_and(self.template_id_condition(structure_query, template_ids))
 
         self.add_contains_subquery_to_container(encapsulating_query, structure_query, current_parent, use_left_join)
 
@@ -161,6 +173,8 @@ class AslFromCreator:
     ):
         set_operator = contains_chain.trailing_set_operation()
         for operand in set_operator.operands():
+            if id(operand) in self.pruned_operands:
+                continue
             requires_or_operand_subquery = set_operator.operator == 'OR' and len(operand) > 1
 
             if requires_or_operand_subquery:
@@ -198,6 +212,98 @@ class AslFromCreator:
 
         return or_sq
 
+    def prune_contains_chain(self, from_chain: 'ContainsChain') -> bool:
+        """
+        Checks the archetype nesting of the FROM clause against the stored templates.
+        Restricts each COMPOSITION to the templates that can contain its archetypes and
+        drops OR operands no template can match. Returns False if the whole clause is impossible.
+        """
+        self.containment_index = self.knowledge_cache.get_containment_index()
+        self.pruned_operands = set()
+        restrictions = self.collect_template_restrictions(from_chain, None, ())
+        self.template_restrictions = restrictions or {}
+        return restrictions is not None
+
+    def collect_template_restrictions(
+        self,
+        contains_chain: 'ContainsChain',
+        composition: Optional[ContainsWrapper],
+        archetype_path: ArchetypePath
+    ) -> Optional[Dict[ContainsWrapper, FrozenSet[str]]]:
+        restrictions = {}
+        for descriptor in contains_chain.chain():
+            used_wrapper = descriptor.child() if isinstance(descriptor, VersionContainsWrapper) else descriptor
+            rm_type = used_wrapper.get_rm_type()
+            if rm_type == 'COMPOSITION':
+                composition, archetype_path = used_wrapper, ()
+            elif rm_type in ('EHR', 'EHR_STATUS', 'FOLDER'):
+                # only compositions are described by templates
+                composition, archetype_path = None, ()
+
+            archetype_id = self.archetype_node_id(used_wrapper)
+            if composition is not None and archetype_id is not None:
+                archetype_path = archetype_path + (archetype_id,)
+                # a longer path can only narrow the templates of the shorter one
+                template_ids = self.containment_index.templates_containing(archetype_path)
+                if not template_ids:
+                    return None
+                restrictions[composition] = template_ids
+
+        if not contains_chain.has_trailing_set_operation():
+            return restrictions
+
+        set_operator = contains_chain.trailing_set_operation()
+        operand_restrictions = []
+        for operand in set_operator.operands():
+            operand_restriction = self.collect_template_restrictions(operand, composition, archetype_path)
+            if operand_restriction is not None:
+                operand_restrictions.append(operand_restriction)
+            elif set_operator.operator == 'OR':
+                self.pruned_operands.add(id(operand))
+            else:
+                return None
+        if not operand_restrictions:
+            return None
+
+        for key in {k for r in operand_restrictions for k in r}:
+            restricting = [r[key] for r in operand_restrictions if key in r]
+            if set_operator.operator != 'OR':
+                template_ids = frozenset.intersection(*restricting)
+                if not template_ids:
+                    return None
+                restrictions[key] = template_ids
+            elif key is not composition:
+                # contained in a single operand
+                restrictions[key] = restricting[0]
+            elif len(restricting) == len(operand_restrictions):
+                restrictions[key] = frozenset.union(*restricting)
+        return restrictions
+
+    @staticmethod
+    def archetype_node_id(contains: ContainsWrapper) -> Optional[str]:
+        """The archetype id of an [archetype_node_id=...] predicate, if it is the only alternative."""
+        if not isinstance(contains, RmContainsWrapper):
+            return None
+        predicates = contains.get_predicate()
+        if not predicates or len(predicates) != 1:
+            # OR-ed predicates may admit several archetypes
+            return None
+        for p in predicates[0].get_operands():
+            if (p.get_path() == AqlObjectPathUtil.ARCHETYPE_NODE_ID
+                    and p.get_operator() == ComparisonOperatorPredicate.PredicateComparisonOperator.EQ
+                    and isinstance(p.get_value(), StringPrimitive)):
+                return p.get_value().get_value()
+        return None
+
+    def template_id_condition(self, structure_query: AslStructureQuery, template_ids: FrozenSet[str]) -> AslFieldValueQueryCondition:
+        # sorted, so the generated SQL does not depend on set iteration order
+        uuids = [u for u in (self.knowledge_cache.find_uuid_by_template_id(t) for t in sorted(template_ids)) if u is not None]
+        return AslFieldValueQueryCondition(
+            AslUtils.find_field_for_owner(AslStructureColumn.TEMPLATE_ID, structure_query.fields, structure_query),
+            AslConditionOperator.IN,
+            uuids
+        )
+
     def contains_subquery(
         self,
         contains_wrapper: ContainsWrapper,
@@ -70,6 +70,16 @@ class AslUtils:
         else:
             raise ValueError("Unsupported condition type")
 
+    @staticmethod
+    def is_always_false(condition: Optional[AslQueryCondition]) -> bool:
+        if isinstance(condition, AslFalseQueryCondition):
+            return True
+        if isinstance(condition, AslAndQueryCondition):
+            return any(AslUtils.is_always_false(operand) for operand in condition.operands)
+        if isinstance(condition, AslOrQueryCondition):
+            return all(AslUtils.is_always_false(operand) for operand in condition.operands)
+        return False
+
     @staticmethod
     def translate_aql_like_pattern_to_sql(aql_like: str) -> str:
         escaped = re.escape(aql_like)
@@ -0,0 +1,71 @@
+import threading
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Sequence, Tuple
+
+ARCHETYPE_PREFIX = "openEHR-EHR-"
+
+# archetype ids from the structure root down to an archetyped node
+ArchetypePath = Tuple[str, ...]
+
+
+class TemplateContainmentIndex:
+    """
+    Maps each template to the archetype nestings it can produce, so the FROM clause of an AQL
+    query can be checked against the stored templates before any SQL is generated.
+
+    A CONTAINS chain A CONTAINS B CONTAINS C can only match compositions of a template
+    in which B is a descendant of A and C a descendant of B, i.e. where the archetype ids
+    of the chain form a subsequence of one root-to-node path of the template.
+    Instances are immutable; a new index is built when templates change.
+    """
+
+    MAX_CACHED_CHAINS = 4096
+
+    def __init__(self, paths_by_template: Dict[str, Iterable[ArchetypePath]]):
+        self.paths_by_template: Dict[str, FrozenSet[ArchetypePath]] = {
+            template_id: frozenset(paths) for template_id, paths in paths_by_template.items()
+        }
+        self._templates_by_chain: Dict[ArchetypePath, FrozenSet[str]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_web_templates(cls, web_templates: Dict[str, 'WebTemplate']) -> 'TemplateContainmentIndex':
+        return cls({
+            template_id: set(cls.archetype_paths(web_template.get_tree()))
+            for template_id, web_template in web_templates.items()
+        })
+
+    @staticmethod
+    def archetype_paths(root: 'WebTemplateNode') -> Iterator[ArchetypePath]:
+        """Yields the path of archetype ids leading to every archetyped node of the tree."""
+        stack: List[Tuple['WebTemplateNode', ArchetypePath]] = [(root, ())]
+        while stack:
+            node, path = stack.pop()
+            node_id = node.get_node_id()
+            if node_id and node_id.startswith(ARCHETYPE_PREFIX):
+                path = path + (node_id,)
+                yield path
+            stack.extend((child, path) for child in node.get_children())
+
+    def template_ids(self) -> FrozenSet[str]:
+        return frozenset(self.paths_by_template)
+
+    def templates_containing(self, chain: Sequence[str]) -> FrozenSet[str]:
+        """Ids of the templates in which the archetypes of chain can be nested in this order."""
+        key = tuple(chain)
+        templates = self._templates_by_chain.get(key)
+        if templates is None:
+            templates = frozenset(
+                template_id for template_id, paths in self.paths_by_template.items()
+                if any(self._is_subsequence(key, path) for path in paths)
+            )
+            with self._lock:
+                if len(self._templates_by_chain) >= self.MAX_CACHED_CHAINS:
+                    self._templates_by_chain.clear()
+                self._templates_by_chain[key] = templates
+        return templates
+
+    @staticmethod
+    def _is_subsequence(chain: ArchetypePath, path: ArchetypePath) -> bool:
+        remaining = iter(path)
+        return all(archetype_id in remaining for archetype_id in chain)
+
@@ -1,6 +1,8 @@
 from typing import Optional
 from dataclasses import dataclass
 
+from structure_rm_type import StructureRmType
+
 ARCHETYPE_PREFIX = "openEHR-EHR-"
 
 @dataclass
@@ -34,10 +36,9 @@ class AslRmTypeAndConcept:
             return None
         return AslRmTypeAndConcept.from_archetype_node_id(archetype_node_id).concept
 
-# Assuming RmTypeAlias is implemented in Python
 class RmTypeAlias:
     @staticmethod
-    def optional_alias(alias: str) -> Optional[str]:
-        # Implement the method to return the alias if it exists
-        # This is a placeholder implementation
-        return alias if alias in ['supported_alias'] else None
+    def optional_alias(rm_type: str) -> Optional[str]:
+        # archetyped objects are structure nodes, aliased as in the entity columns
+        structure_rm_type = StructureRmType.by_rm_type_name(rm_type)
+        return structure_rm_type.alias if structure_rm_type is not None else None
@@ -1,6 +1,7 @@
-from collections import defaultdict, deque
-from typing import List, Dict, Set, Optional, Tuple, Union
+from collections import OrderedDict, defaultdict, deque
+from typing import Iterable, List, Dict, Set, Optional, Tuple, Union
 import re
+import threading
 
 class AttInfo:
     def __init__(self, multiple_valued: bool, nullable: bool, target_types: Set[str]):
@@ -8,11 +9,84 @@ class AttInfo:
         self.nullable = nullable
         self.target_types = target_types
 
+class RmTypeIndex:
+    """Interns RM type names, so sets of them can be handled as int bitmasks."""
+    _bits: Dict[str, int] = {}
+    _names: List[str] = []
+    _lock = threading.Lock()
+
+    @classmethod
+    def bit(cls, type_name: str) -> int:
+        bit = cls._bits.get(type_name)
+        if bit is None:
+            with cls._lock:
+                bit = cls._bits.get(type_name)
+                if bit is None:
+                    bit = 1 << len(cls._names)
+                    cls._names.append(type_name)
+                    cls._bits[type_name] = bit
+        return bit
+
+    @classmethod
+    def mask(cls, type_names: Optional[Iterable[str]]) -> Optional[int]:
+        if type_names is None:
+            return None
+        mask = 0
+        for type_name in type_names:
+            mask |= cls.bit(type_name)
+        return mask
+
+    @classmethod
+    def names(cls, mask: Optional[int]) -> Optional[Set[str]]:
+        if mask is None:
+            return None
+        names = set()
+        while mask:
+            lowest = mask & -mask
+            names.add(cls._names[lowest.bit_length() - 1])
+            mask ^= lowest
+        return names
+
+class AttributeTypeMasks:
+    """Type constellations of one attribute: the base types declaring it and their target types, as bitmasks."""
+
+    def __init__(self):
+        self.base_mask = 0
+        self.target_mask = 0
+        self.targets_by_base: List[Tuple[int, int]] = []
+
+    def add(self, base_type: str, target_types: Set[str]):
+        base_bit = RmTypeIndex.bit(base_type)
+        targets = RmTypeIndex.mask(target_types)
+        self.targets_by_base = [(b, t | targets if b == base_bit else t) for b, t in self.targets_by_base]
+        if not self.base_mask & base_bit:
+            self.targets_by_base.append((base_bit, targets))
+        self.base_mask |= base_bit
+        self.target_mask |= targets
+
+    def targets_of(self, base_mask: int) -> int:
+        if base_mask == self.base_mask:
+            return self.target_mask
+        result = 0
+        for base_bit, targets in self.targets_by_base:
+            if base_mask & base_bit:
+                result |= targets
+        return result
+
+    def bases_reaching(self, target_mask: int) -> int:
+        result = 0
+        for base_bit, targets in self.targets_by_base:
+            if target_mask & targets:
+                result |= base_bit
+        return result
+
 class AttributeInfos:
     rm_types: Set[str] = set()
     base_types_by_attribute: Dict[str, Set[str]] = {}
     typed_attributes: Dict[str, Dict[str, Set[str]]] = {}
     attribute_infos: Dict[str, Dict[str, AttInfo]] = {}
+    # typed_attributes as bitmasks, used for the constraint propagation in PathAnalysis
+    attribute_type_masks: Dict[str, AttributeTypeMasks] = {}
 
     @classmethod
     def initialize(cls):
@@ -21,6 +95,7 @@ class AttributeInfos:
         cls.base_types_by_attribute = defaultdict(set)
         cls.typed_attributes = defaultdict(lambda: defaultdict(set))
         cls.attribute_infos = defaultdict(lambda: defaultdict(lambda: AttInfo(False, False, set())))
+        cls.attribute_type_masks = {}
 
         cls.add_ehr_attributes()
 
@@ -39,8 +114,13 @@ class AttributeInfos:
         cls.base_types_by_attribute[attribute].add(base_type)
         cls.typed_attributes[attribute][base_type].update(target_types)
         cls.attribute_infos[attribute][base_type] = AttInfo(False, False, target_types)
+        cls.attribute_type_masks.setdefault(attribute, AttributeTypeMasks()).add(base_type, target_types)
 
 class PathAnalysis:
+    ANALYSIS_CACHE_SIZE = 4096
+    _analysis_cache: "OrderedDict[Tuple, ANode]" = OrderedDict()
+    _analysis_cache_lock = threading.Lock()
+
     @staticmethod
     def validate_attribute_names_exist(root_node):
         for node in PathAnalysis.iterate_nodes(root_node):
@@ -58,17 +138,40 @@ class PathAnalysis:
 
     @staticmethod
     def analyze_aql_path_types(root_type: str, variable_predicates: List, root_predicates: List, path, candidate_types: Set[str]):
+        """
+        The same paths appear in most queries, so results are memoized.
+        The returned tree is shared between callers and must not be modified.
+        """
+        key = (
+            root_type,
+            _predicates_key(variable_predicates),
+            _predicates_key(root_predicates),
+            _path_key(path),
+            frozenset(candidate_types) if candidate_types is not None else None
+        )
+        cache = PathAnalysis._analysis_cache
+        with PathAnalysis._analysis_cache_lock:
+            root_node = cache.get(key)
+            if root_node is not None:
+                cache.move_to_end(key)
+                return root_node
+
         root_node = ANode(root_type, variable_predicates, root_predicates)
         PathAnalysis.append_path(root_node, path, candidate_types)
         PathAnalysis.validate_attribute_names_exist(root_node)
 
         while PathAnalysis.apply_child_attribute_constraints(root_node):
             pass
+
+        with PathAnalysis._analysis_cache_lock:
+            cache[key] = root_node
+            if len(cache) > PathAnalysis.ANALYSIS_CACHE_SIZE:
+                cache.popitem(last=False)
         return root_node
 
     @staticmethod
     def apply_child_attribute_constraints(node):
-        if not node.attributes or (node.candidate_types is not None and not node.candidate_types):
+        if not node.attributes or node.candidate_mask == 0:
             return False
         
         changed = False
@@ -79,30 +182,25 @@ class PathAnalysis:
 
     @staticmethod
     def apply_attribute_constraints(parent_node, att_name, child_node):
-        type_constellations = AttributeInfos.typed_attributes.get(att_name)
-        if type_constellations is None:
-            parent_node.candidate_types = set()
-            child_node.candidate_types = set()
-            return True
-
-        if parent_node.candidate_types is None:
-            if child_node.candidate_types is None:
-                parent_node.candidate_types = set(type_constellations.keys())
-                child_node.candidate_types = set.union(*type_constellations.values())
-            else:
-                child_constraints = set.union(*type_constellations.values())
-                child_node.candidate_types.intersection_update(child_constraints)
-                parent_node.candidate_types = {k for k in type_constellations if any(t in child_node.candidate_types for t in type_constellations[k])}
-            return True
-
-        changed = parent_node.candidate_types.copy()
-        parent_node.candidate_types.intersection_update(type_constellations.keys())
-        child_constraints = set.union(*[type_constellations[k] for k in parent_node.candidate_types])
-        if child_node.candidate_types is None:
-            child_node.candidate_types = child_constraints
-            changed = True
-        else:
-            changed |= child_node.candidate_types.intersection_update(child_constraints)
+        type_masks = AttributeInfos.attribute_type_masks.get(att_name)
+        if type_masks is None:
+            changed = parent_node.candidate_mask != 0 or child_node.candidate_mask != 0
+            parent_node.candidate_mask = 0
+            child_node.candidate_mask = 0
+            return changed
+
+        parent = type_masks.base_mask
+        if parent_node.candidate_mask is not None:
+            parent &= parent_node.candidate_mask
+        child = type_masks.targets_of(parent)
+        if child_node.candidate_mask is not None:
+            child &= child_node.candidate_mask
+        # only base types that can still reach one of the child types remain
+        parent &= type_masks.bases_reaching(child)
+
+        changed = parent != parent_node.candidate_mask or child != child_node.candidate_mask
+        parent_node.candidate_mask = parent
+        child_node.candidate_mask = child
         return changed
 
     @staticmethod
@@ -112,10 +210,8 @@ class PathAnalysis:
         for node in path.get_path_nodes():
             root = PathAnalysis.add_attributes(root, node)
         if candidate_types is not None:
-            if root.candidate_types is None:
-                root.candidate_types = set(candidate_types)
-            else:
-                root.candidate_types.intersection_update(candidate_types)
+            mask = RmTypeIndex.mask(candidate_types)
+            root.candidate_mask = mask if root.candidate_mask is None else root.candidate_mask & mask
 
     @staticmethod
     def add_attributes(root, child):
@@ -137,7 +233,22 @@ class ANode:
         self.variable_predicates = variable_predicates
         self.root_predicates = root_predicates
         self.attributes = {}
-        self.candidate_types = None
+        # bitmask over RmTypeIndex, None while unconstrained
+        self.candidate_mask: Optional[int] = None
+
+    @property
+    def candidate_types(self) -> Optional[Set[str]]:
+        return RmTypeIndex.names(self.candidate_mask)
+
+    @candidate_types.setter
+    def candidate_types(self, candidate_types: Optional[Set[str]]):
+        self.candidate_mask = RmTypeIndex.mask(candidate_types)
+
+    def get_candidate_types(self) -> Set[str]:
+        return self.candidate_types or set()
+
+    def get_attribute(self, attribute: str) -> Optional['ANode']:
+        return self.attributes.get(attribute)
 
     def constrain_by_archetype(self, predicates):
         # Implement logic as needed
@@ -147,5 +258,21 @@ class ANode:
         # Implement logic as needed
         pass
 
+def _path_key(path) -> Optional[str]:
+    return path.render() if path is not None else None
+
+def _predicates_key(predicates: Optional[List]) -> Optional[Tuple]:
+    if predicates is None:
+        return None
+    return tuple(
+        tuple((_path_key(o.get_path()), str(o.get_operator()), _operand_key(o.get_value())) for o in p.get_operands())
+        for p in predicates
+    )
+
+def _operand_key(value) -> Tuple:
+    if hasattr(value, "get_value"):
+        return type(value).__name__, value.get_value()
+    return type(value).__name__, _path_key(value)
+
 # Initialize attribute information
 AttributeInfos.initialize()
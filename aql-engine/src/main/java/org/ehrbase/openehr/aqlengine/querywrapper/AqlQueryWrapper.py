@@ -67,6 +67,10 @@ class AqlQueryWrapper:
         self.limit = limit
         self.offset = offset
         self.path_infos = path_infos
+        # keyset pagination settings, see AqlSqlLayer.add_keyset
+        self.keyset: Optional[Dict] = None
+        # approximate execution over a sample, see AqlSqlLayer.add_sample
+        self.sample: Optional['AqlQuerySample'] = None
 
     def non_primitive_selects(self):
         return (select for select in self.selects if select.select_type != SelectType.PRIMITIVE)
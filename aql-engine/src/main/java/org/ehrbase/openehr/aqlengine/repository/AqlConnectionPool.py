@@ -0,0 +1,222 @@
+import logging
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Optional
+
+import sqlalchemy as sa
+from sqlalchemy import event, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.pool import QueuePool
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram
+
+from aql_cancellation_token import AqlCancellationToken, AqlCancelReason
+from aql_query_cancelled_exception import AqlQueryCancelledException
+
+logger = logging.getLogger(__name__)
+
+# SQLSTATE query_canceled, raised by a backend cancel and by statement_timeout
+QUERY_CANCELED = "57014"
+
+# e.g. 00000003-0000001B-1, as returned by pg_export_snapshot()
+_SNAPSHOT_ID = re.compile(r"[0-9A-Fa-f]+(-[0-9A-Fa-f]+)+")
+
+
+@dataclass
+class AqlPoolProperties:
+    url: str
+    pool_size: int = 10
+    max_overflow: int = 10
+    # seconds to wait for a free connection before failing
+    pool_timeout: float = 30.0
+    # seconds after which idle connections are replaced
+    pool_recycle: int = 1800
+    # milliseconds, applied to every connection via SET statement_timeout; None disables it.
+    # This is the server-wide maximum, per-query timeouts can only shorten it
+    statement_timeout: Optional[int] = None
+    pre_ping: bool = True
+    # executions of the same SQL on a connection before psycopg prepares it server-side, None disables it
+    prepare_threshold: Optional[int] = None
+    # prepared statements kept per connection
+    prepared_max: int = 100
+
+
+class AqlConnectionPool:
+    """
+    Long-lived, pooled SQLAlchemy engine shared by all AQL executions.
+    Checkout latency and pool saturation are exported as prometheus metrics.
+
+    Connections checked out inside use_snapshot() read from a snapshot exported by snapshot(),
+    so queries running concurrently on different connections see the same committed data.
+    """
+
+    def __init__(self, engine: Engine, properties: AqlPoolProperties, registry: CollectorRegistry = REGISTRY):
+        self.engine = engine
+        self.properties = properties
+        self._snapshot_id: ContextVar[Optional[str]] = ContextVar("aql_snapshot_id", default=None)
+
+        self.checkout_latency = Histogram(
+            'ehrbase_aql_pool_checkout_seconds',
+            'Time spent waiting for a database connection from the AQL pool',
+            registry=registry
+        )
+        self.in_use = Gauge(
+            'ehrbase_aql_pool_connections_in_use',
+            'Connections currently checked out of the AQL pool',
+            registry=registry
+        )
+        self.saturation = Gauge(
+            'ehrbase_aql_pool_saturation',
+            'Checked out connections relative to pool_size + max_overflow',
+            registry=registry
+        )
+        self.cancellations = Counter(
+            'ehrbase_aql_cancelled',
+            'AQL statements cancelled while running',
+            ['reason'],
+            registry=registry
+        )
+
+        if properties.statement_timeout is not None:
+            event.listen(engine, "connect", self._set_statement_timeout)
+        if properties.prepare_threshold is not None:
+            if engine.dialect.driver == "psycopg":
+                event.listen(engine, "connect", self._configure_prepared_statements)
+            else:
+                logger.warning(f"Server-side prepared statements require psycopg 3, not supported by driver {engine.dialect.driver}")
+
+    @classmethod
+    def create(cls, properties: AqlPoolProperties, registry: CollectorRegistry = REGISTRY) -> 'AqlConnectionPool':
+        engine = sa.create_engine(
+            properties.url,
+            poolclass=QueuePool,
+            pool_size=properties.pool_size,
+            max_overflow=properties.max_overflow,
+            pool_timeout=properties.pool_timeout,
+            pool_recycle=properties.pool_recycle,
+            pool_pre_ping=properties.pre_ping
+        )
+        return cls(engine, properties, registry)
+
+    def _set_statement_timeout(self, dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f"SET statement_timeout = {int(self.properties.statement_timeout)}")
+        finally:
+            cursor.close()
+
+    def _configure_prepared_statements(self, dbapi_connection, connection_record) -> None:
+        # psycopg prepares a statement once it was executed prepare_threshold times on the connection
+        dbapi_connection.prepare_threshold = self.properties.prepare_threshold
+        dbapi_connection.prepared_max = self.properties.prepared_max
+
+    @contextmanager
+    def connect(self) -> Iterator[Connection]:
+        start = time.monotonic()
+        conn = self.engine.connect()
+        self.checkout_latency.observe(time.monotonic() - start)
+        self._update_usage()
+        try:
+            snapshot_id = self._snapshot_id.get()
+            if snapshot_id is not None:
+                conn = conn.execution_options(isolation_level="REPEATABLE READ")
+                # has to be the first statement of the transaction
+                conn.execute(text(f"SET TRANSACTION SNAPSHOT '{snapshot_id}'"))
+            yield conn
+        finally:
+            conn.close()
+            self._update_usage()
+
+    @contextmanager
+    def snapshot(self) -> Iterator[str]:
+        """
+        Exports the snapshot of a REPEATABLE READ transaction and yields its id. The exporting
+        connection is held until the block is left, as the snapshot is only importable while it is open.
+        """
+        with self.connect() as conn:
+            conn = conn.execution_options(isolation_level="REPEATABLE READ")
+            yield conn.execute(text("SELECT pg_export_snapshot()")).scalar_one()
+
+    @contextmanager
+    def use_snapshot(self, snapshot_id: Optional[str]) -> Iterator[None]:
+        """Connections checked out by the current thread within the block read from the given snapshot."""
+        if snapshot_id is not None and not _SNAPSHOT_ID.fullmatch(snapshot_id):
+            # the id is part of the SQL, SET TRANSACTION SNAPSHOT takes no bind parameters
+            raise ValueError(f"Invalid snapshot id {snapshot_id}")
+        reset = self._snapshot_id.set(snapshot_id)
+        try:
+            yield
+        finally:
+            self._snapshot_id.reset(reset)
+
+    @contextmanager
+    def cancellable(self, conn: Connection, cancellation: Optional[AqlCancellationToken]) -> Iterator[None]:
+        """
+        Binds the statements run on conn within the block to the token: a cancellation issues a backend
+        cancel, and the remaining time of the token is applied as statement_timeout of the transaction.
+        Cancelled statements raise AqlQueryCancelledException; the connection is released as usual.
+        """
+        if cancellation is None:
+            yield
+            return
+        cancellation.raise_if_cancelled()
+        timeout = cancellation.remaining()
+        if timeout is not None and self.engine.dialect.name == "postgresql" and (
+                self.properties.statement_timeout is None or timeout < self.properties.statement_timeout):
+            # SET LOCAL is reset by the rollback when the connection goes back to the pool
+            conn.execute(text(f"SET LOCAL statement_timeout = {max(timeout, 1)}"))
+
+        remove_callback = cancellation.on_cancel(lambda reason: self._cancel_backend(conn, reason))
+        try:
+            yield
+        except DBAPIError as e:
+            remove_callback()
+            if cancellation.reason is not None:
+                # backend cancels were counted when issued
+                reason = cancellation.reason
+            elif getattr(e.orig, "sqlstate", None) == QUERY_CANCELED:
+                reason = AqlCancelReason.TIMEOUT
+                self.cancellations.labels(reason.value).inc()
+            else:
+                raise
+            raise AqlQueryCancelledException(f"AQL query cancelled: {reason.value}", reason) from e
+        finally:
+            remove_callback()
+
+    def _cancel_backend(self, conn: Connection, reason: AqlCancelReason) -> None:
+        dbapi_connection = conn.connection.dbapi_connection
+        # psycopg 3.2 cancel_safe, older psycopg cancel, sqlite3 interrupt
+        cancel = next((getattr(dbapi_connection, name) for name in ("cancel_safe", "cancel", "interrupt")
+                       if hasattr(dbapi_connection, name)), None)
+        if cancel is None:
+            logger.warning(f"Cannot cancel running statements of driver {self.engine.dialect.driver}")
+            return
+        logger.debug(f"Cancelling AQL statement: {reason.value}")
+        self.cancellations.labels(reason.value).inc()
+        cancel()
+
+    def _update_usage(self) -> None:
+        checked_out = self.engine.pool.checkedout()
+        self.in_use.set(checked_out)
+        self.saturation.set(checked_out / self.capacity())
+
+    def capacity(self) -> int:
+        return self.properties.pool_size + max(self.properties.max_overflow, 0)
+
+    def status(self) -> Dict[str, Any]:
+        pool = self.engine.pool
+        checked_out = pool.checkedout()
+        return {
+            "size": pool.size(),
+            "checked_out": checked_out,
+            "overflow": pool.overflow(),
+            "capacity": self.capacity(),
+            "saturation": checked_out / self.capacity()
+        }
+
+    def dispose(self) -> None:
+        logger.info("Disposing AQL connection pool")
+        self.engine.dispose()
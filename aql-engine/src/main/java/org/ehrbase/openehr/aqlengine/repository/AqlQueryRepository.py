@@ -1,23 +1,53 @@
-from typing import List, Dict, Optional, Callable, Tuple, Union
+import json
+from typing import Any, Iterator, List, Dict, Optional, Callable, Sequence, Tuple, Union
 from dataclasses import dataclass
 import sqlalchemy as sa
 from sqlalchemy.engine.base import Connection
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.sql import text
-
-@dataclass
-class PreparedQuery:
-    query: sa.sql.Select
-    post_processors: Dict[int, Callable[[sa.engine.base.Row], Union[None, object]]]
+from sqlalchemy.sql.base import Executable
+from sqlalchemy.sql.elements import ClauseElement
+
+from aql_cancellation_token import AqlCancellationToken
+from aql_connection_pool import AqlConnectionPool
+from aql_query_profile import AqlQueryProfile, AqlQueryStage, profiled
+from asl_utils import AslUtils
+from default_result_postprocessor import DefaultResultPostprocessor
+from extracted_column_result_postprocessor import ExtractedColumnResultPostprocessor
+from prepared_query import ColumnPostprocessor, PreparedQuery
+
+@dataclass(frozen=True)
+class PlanEstimate:
+    """Planner estimates of the root node of a query plan."""
+    total_cost: float
+    rows: float
+
+class Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) of a statement, keeping the bind parameters of the statement."""
+    inherit_cache = False
+
+    def __init__(self, statement: sa.sql.Select, analyze: bool = False):
+        self.statement = statement
+        self.analyze = analyze
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element: Explain, compiler, **kw) -> str:
+    options = "SUMMARY, COSTS, VERBOSE, FORMAT JSON, ANALYZE, TIMING" if element.analyze else "FORMAT JSON"
+    return f"EXPLAIN ({options}) {compiler.process(element.statement, **kw)}"
 
 class AqlQueryRepository:
-    NOOP_POSTPROCESSOR: Callable[[sa.engine.base.Row], Union[None, object]] = lambda v: v
+    NOOP_POSTPROCESSOR: Callable[[sa.engine.base.Row], Union[None, object]] = staticmethod(lambda v: v)
+    # selected RM objects are transcoded to canonical JSON
+    DEFAULT_POSTPROCESSOR = DefaultResultPostprocessor()
+    DEFAULT_FETCH_SIZE = 1000
 
-    def __init__(self, system_service, knowledge_cache, query_builder):
+    def __init__(self, system_service, knowledge_cache, query_builder, connection_pool: AqlConnectionPool):
         self.system_service = system_service
         self.knowledge_cache = knowledge_cache
         self.query_builder = query_builder
+        self.connection_pool = connection_pool
 
-    def prepare_query(self, asl_query, selects: List['SelectWrapper']) -> PreparedQuery:
+    def prepare_query(self, asl_query, selects: List['SelectWrapper'], keyset_columns: int = 0) -> PreparedQuery:
         # Build SQL query using the query builder
         select_query = self.query_builder.build_sql_query(asl_query)
 
@@ -30,22 +60,82 @@ class AqlQueryRepository:
                 for i, select in enumerate(selects)
             }
 
-        return PreparedQuery(select_query, post_processors)
+        for i in range(len(post_processors), len(post_processors) + keyset_columns):
+            post_processors[i] = self.NOOP_POSTPROCESSOR
+
+        column_processors = [self.get_column_processor(post_processors[i]) for i in range(len(post_processors))]
 
-    def execute_query(self, prepared_query: PreparedQuery) -> List[List[object]]:
-        with sa.create_engine('sqlite:///example.db').connect() as conn:  # Use appropriate engine
+        static_result = None
+        if AslUtils.is_always_false(asl_query.get_condition()):
+            # e.g. a CONTAINS clause no stored template can match, see AslFromCreator.prune_contains_chain
+            static_result = [] if selects else [[0]]
+        return PreparedQuery(select_query, post_processors, keyset_columns, column_processors, static_result)
+
+    def execute_query(self, prepared_query: PreparedQuery, profile: Optional[AqlQueryProfile] = None,
+                      cancellation: Optional[AqlCancellationToken] = None) -> List[List[object]]:
+        if prepared_query.static_result is not None:
+            # copies, callers modify the rows
+            return [list(row) for row in prepared_query.static_result]
+        with self.connection_pool.connect() as conn, self.connection_pool.cancellable(conn, cancellation):
+            self.load_temp_tables(conn, prepared_query.temp_tables)
             result = conn.execute(prepared_query.query)
-            return [self.post_process_db_record(row, prepared_query.post_processors) for row in result]
+            records = []
+            for partition in result.partitions(self.DEFAULT_FETCH_SIZE):
+                with profiled(profile, AqlQueryStage.POST_PROCESSING):
+                    records.extend(self.post_process_db_records(partition, prepared_query.column_processors))
+            return records
+
+    def stream_query(self, prepared_query: PreparedQuery, fetch_size: int = DEFAULT_FETCH_SIZE,
+                     cancellation: Optional[AqlCancellationToken] = None) -> Iterator[List[object]]:
+        """
+        Fetches the result through a server-side cursor, fetch_size rows at a time.
+        The connection is held until the iterator is exhausted or closed.
+        """
+        for columns in self.stream_query_chunks(prepared_query, fetch_size, cancellation):
+            yield from map(list, zip(*columns))
+
+    def stream_query_chunks(self, prepared_query: PreparedQuery, fetch_size: int = DEFAULT_FETCH_SIZE,
+                            cancellation: Optional[AqlCancellationToken] = None) -> Iterator[List[List[object]]]:
+        """Like stream_query, but yields the post-processed column vectors of each fetched chunk."""
+        if prepared_query.static_result is not None:
+            if prepared_query.static_result:
+                yield [list(column) for column in zip(*prepared_query.static_result)]
+            return
+        with self.connection_pool.connect() as conn, self.connection_pool.cancellable(conn, cancellation):
+            self.load_temp_tables(conn, prepared_query.temp_tables)
+            result = conn.execution_options(stream_results=True, yield_per=fetch_size).execute(prepared_query.query)
+            for partition in result.partitions():
+                yield self.post_process_db_columns(partition, prepared_query.column_processors)
+
+    @staticmethod
+    def load_temp_tables(conn: Connection, temp_tables: Dict[str, List[str]]) -> None:
+        """
+        Creates and fills the temporary tables of large MATCHES lists. They are dropped with
+        the transaction, which ends when the connection is returned to the pool.
+        """
+        for name, values in temp_tables.items():
+            table = sa.table(name, sa.column("value", sa.Text))
+            conn.execute(text(f'CREATE TEMPORARY TABLE "{name}" (value text) ON COMMIT DROP'))
+            conn.execute(sa.insert(table), [{"value": v} for v in values])
+            # unlike unnest(), an analyzed table gives the planner the real row count
+            conn.execute(text(f'ANALYZE "{name}"'))
 
     @staticmethod
     def get_query_sql(prepared_query: PreparedQuery) -> str:
         return str(prepared_query.query)
 
-    def explain_query(self, analyze: bool, prepared_query: PreparedQuery) -> str:
-        # SQLAlchemy doesn't have a built-in explain method like jOOQ, so this is illustrative
-        with sa.create_engine('sqlite:///example.db').connect() as conn:  # Use appropriate engine
-            result = conn.execute(text(f"EXPLAIN QUERY PLAN {self.get_query_sql(prepared_query)}"))
-            return result.fetchall()
+    def explain_query(self, analyze: bool, prepared_query: PreparedQuery) -> List[Dict[str, Any]]:
+        """The JSON plan of the query with its bound values; with analyze the query is executed."""
+        with self.connection_pool.connect() as conn:
+            self.load_temp_tables(conn, prepared_query.temp_tables)
+            plan = conn.execute(Explain(prepared_query.query, analyze)).scalar_one()
+        # psycopg decodes json columns, other drivers return the text
+        return json.loads(plan) if isinstance(plan, str) else plan
+
+    def estimate_query(self, prepared_query: PreparedQuery) -> PlanEstimate:
+        """Cost and row estimates of the planner, without executing the query."""
+        root = self.explain_query(False, prepared_query)[0]["Plan"]
+        return PlanEstimate(float(root["Total Cost"]), float(root["Plan Rows"]))
 
     def get_post_processor(self, select: 'SelectWrapper') -> Callable[[sa.engine.base.Row], object]:
         # This method will need to be implemented based on your specific requirements
@@ -58,19 +148,45 @@ class AqlQueryRepository:
         # Placeholder for the actual implementation to find an appropriate post-processor
         extracted_column = self.find_extracted_column(select.root, select_path)
         if extracted_column:
-            return lambda row: self.process_extracted_column(extracted_column, row)
-        
-        return lambda row: row
+            return ExtractedColumnResultPostprocessor(
+                extracted_column, self.knowledge_cache, self.system_service.get_system_id())
+
+        return self.DEFAULT_POSTPROCESSOR
+
+    def get_column_processor(self, post_processor: Callable[[object], object]) -> Optional[ColumnPostprocessor]:
+        if post_processor is self.NOOP_POSTPROCESSOR:
+            return None
+        batch = getattr(post_processor, 'post_process_columns', None)
+        if batch is not None:
+            return batch
+        return lambda values: [post_processor(v) for v in values]
 
     def post_process_db_record(self, row: sa.engine.base.Row, post_processors: Dict[int, Callable[[sa.engine.base.Row], object]]) -> List[object]:
         return [post_processors[i](row[i]) for i in range(len(row))]
 
+    @staticmethod
+    def post_process_db_records(rows: Sequence[sa.engine.base.Row],
+                                column_processors: List[Optional[ColumnPostprocessor]]) -> List[List[object]]:
+        """
+        Post-processes a fetched chunk column by column: each processor receives the whole column vector,
+        which avoids per-cell dispatch and lets repeated values be resolved once.
+        """
+        if not rows:
+            return []
+        return [list(r) for r in zip(*AqlQueryRepository.post_process_db_columns(rows, column_processors))]
+
+    @staticmethod
+    def post_process_db_columns(rows: Sequence[sa.engine.base.Row],
+                                column_processors: List[Optional[ColumnPostprocessor]]) -> List[List[object]]:
+        """The post-processed column vectors of a fetched chunk."""
+        columns = [list(c) for c in zip(*rows)]
+        for i, process in enumerate(column_processors):
+            if process is not None:
+                columns[i] = process(columns[i])
+        return columns
+
     def find_extracted_column(self, root, path) -> Optional['AslExtractedColumn']:
         # Implement finding logic
         pass
 
-    def process_extracted_column(self, extracted_column, row) -> object:
-        # Implement processing logic
-        pass
-
 # Define other classes and methods as necessary to complete the translation
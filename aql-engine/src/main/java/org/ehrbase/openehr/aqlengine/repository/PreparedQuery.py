@@ -1,11 +1,25 @@
-from typing import Dict, Callable
-from dataclasses import dataclass
+from typing import Dict, Callable, List, Optional, Union
+from dataclasses import dataclass, field, replace
 import sqlalchemy as sa
 
+# converts all values of one result column of a fetched chunk
+ColumnPostprocessor = Callable[[List[object]], List[object]]
+
 @dataclass
 class PreparedQuery:
-    select_query: sa.sql.Select
-    post_processors: Dict[int, Callable[[sa.engine.base.Row], object]]
+    query: sa.sql.Select
+    post_processors: Dict[int, Callable[[sa.engine.base.Row], Union[None, object]]]
+    # number of trailing hidden columns holding the keyset pagination keys
+    keyset_columns: int = 0
+    # batch form of post_processors by column index, None for columns passed through unchanged
+    column_processors: List[Optional[ColumnPostprocessor]] = field(default_factory=list)
+    # rows returned without executing the query, set when its condition can never hold
+    static_result: Optional[List[List[object]]] = None
+    # values of temporary tables the query selects from, created per execution
+    temp_tables: Dict[str, List[str]] = field(default_factory=dict)
+
+    def bind(self, values: Dict[str, object], temp_tables: Optional[Dict[str, List[str]]] = None) -> 'PreparedQuery':
+        return replace(self, query=self.query.params(**values), temp_tables={**self.temp_tables, **(temp_tables or {})})
 
     def __str__(self) -> str:
-        return str(self.select_query)
+        return str(self.query)
@@ -0,0 +1,118 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from enum import Enum
+from typing import Dict, Iterator, Optional
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram
+
+from aql_query_priority import AqlQueryPriority
+from aql_query_repository import PlanEstimate
+from service_unavailable_exception import ServiceUnavailableException
+from unprocessable_entity_exception import UnprocessableEntityException
+
+logger = logging.getLogger(__name__)
+
+
+class OverLimitAction(Enum):
+    # the query is refused with 422
+    REJECT = "REJECT"
+    # the query runs in the BATCH class, behind the other expensive queries
+    QUEUE = "QUEUE"
+
+
+@dataclass
+class AqlAdmissionProperties:
+    # limits on the planner estimates of EXPLAIN, None disables the check
+    max_cost: Optional[float] = None
+    max_rows: Optional[float] = None
+    over_limit: OverLimitAction = OverLimitAction.REJECT
+    interactive_max_concurrent: int = 16
+    batch_max_concurrent: int = 2
+    # seconds a query waits for a free slot of its class before it is refused with 503
+    queue_timeout: float = 30.0
+
+
+class AqlAdmissionControl:
+    """
+    Decides whether and in which priority class an AQL query may run. Queries whose EXPLAIN
+    estimates exceed the configured limits are rejected or demoted to the BATCH class; each
+    class has its own concurrency limit, so heavy analytics cannot starve interactive reads.
+    """
+
+    def __init__(self, properties: AqlAdmissionProperties, registry: CollectorRegistry = REGISTRY):
+        self.properties = properties
+        self._slots: Dict[AqlQueryPriority, threading.BoundedSemaphore] = {
+            AqlQueryPriority.INTERACTIVE: threading.BoundedSemaphore(properties.interactive_max_concurrent),
+            AqlQueryPriority.BATCH: threading.BoundedSemaphore(properties.batch_max_concurrent)
+        }
+
+        self.running = Gauge(
+            'ehrbase_aql_admission_running',
+            'AQL queries currently executing per priority class',
+            ['priority'],
+            registry=registry
+        )
+        self.queue_seconds = Histogram(
+            'ehrbase_aql_admission_queue_seconds',
+            'Time AQL queries waited for a slot of their priority class',
+            ['priority'],
+            registry=registry
+        )
+        self.rejected = Counter(
+            'ehrbase_aql_admission_rejected',
+            'AQL queries refused by admission control',
+            ['reason'],
+            registry=registry
+        )
+
+    def requires_estimate(self) -> bool:
+        return self.properties.max_cost is not None or self.properties.max_rows is not None
+
+    def classify(self, estimate: PlanEstimate, priority: AqlQueryPriority) -> AqlQueryPriority:
+        """
+        The priority class the query runs in.
+
+        :raises UnprocessableEntityException: When the estimate exceeds a limit and over-limit queries are rejected
+        """
+        exceeded = self.exceeded_limit(estimate)
+        if exceeded is None:
+            return priority
+        if self.properties.over_limit == OverLimitAction.QUEUE:
+            logger.debug(f"AQL query demoted to batch class: {exceeded}")
+            return AqlQueryPriority.BATCH
+        self.rejected.labels("cost").inc()
+        raise UnprocessableEntityException(f"AQL query is too expensive: {exceeded}")
+
+    def exceeded_limit(self, estimate: PlanEstimate) -> Optional[str]:
+        max_cost = self.properties.max_cost
+        max_rows = self.properties.max_rows
+        if max_cost is not None and estimate.total_cost > max_cost:
+            return f"estimated cost {estimate.total_cost:.0f} exceeds {max_cost:.0f}"
+        if max_rows is not None and estimate.rows > max_rows:
+            return f"estimated rows {estimate.rows:.0f} exceed {max_rows:.0f}"
+        return None
+
+    @contextmanager
+    def admit(self, priority: AqlQueryPriority) -> Iterator[None]:
+        """
+        Holds a slot of the priority class while the block runs.
+
+        :raises ServiceUnavailableException: When no slot got free within the queue timeout
+        """
+        slots = self._slots[priority]
+        start = time.monotonic()
+        if not slots.acquire(timeout=self.properties.queue_timeout):
+            self.rejected.labels("queue_timeout").inc()
+            raise ServiceUnavailableException(
+                f"Too many {priority.value} AQL queries, try again later", int(self.properties.queue_timeout))
+        self.queue_seconds.labels(priority.value).observe(time.monotonic() - start)
+        running = self.running.labels(priority.value)
+        running.inc()
+        try:
+            yield
+        finally:
+            running.dec()
+            slots.release()
@@ -0,0 +1,65 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from aql_connection_pool import AqlConnectionPool
+from aql_query_batch_item import AqlQueryBatchItem
+from aql_query_batch_service import AqlQueryBatchService
+from aql_query_context import AqlQueryContext
+from aql_query_request import AqlQueryRequest
+from aql_query_service import AqlQueryService
+from unprocessable_entity_exception import UnprocessableEntityException
+
+logger = logging.getLogger(__name__)
+
+
+class AqlQueryBatchServiceImp(AqlQueryBatchService):
+    """
+    Executes the queries of a batch on a bounded thread pool shared by all batches, each on its
+    own pooled connection and with its own query context, so every query gets its own meta data.
+
+    With snapshot=True the calling thread exports a REPEATABLE READ snapshot that all queries
+    of the batch import; it holds one additional pooled connection until the batch is done.
+    """
+
+    def __init__(self,
+                 query_service_factory: Callable[[AqlQueryContext], AqlQueryService],
+                 context_factory: Callable[[], AqlQueryContext],
+                 connection_pool: AqlConnectionPool,
+                 max_concurrent: int = 4,
+                 max_queries: int = 20):
+        self.query_service_factory = query_service_factory
+        self.context_factory = context_factory
+        self.connection_pool = connection_pool
+        self.max_queries = max_queries
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="aql-batch")
+
+    def execute(self, aql_query_requests: List[AqlQueryRequest], snapshot: bool = False) -> List[AqlQueryBatchItem]:
+        if len(aql_query_requests) > self.max_queries:
+            raise UnprocessableEntityException(
+                f"Batch of {len(aql_query_requests)} queries exceeds the maximum of {self.max_queries}")
+        if not aql_query_requests:
+            return []
+        if not snapshot:
+            return self.run_all(aql_query_requests, None)
+        with self.connection_pool.snapshot() as snapshot_id:
+            return self.run_all(aql_query_requests, snapshot_id)
+
+    def run_all(self, aql_query_requests: List[AqlQueryRequest], snapshot_id: Optional[str]) -> List[AqlQueryBatchItem]:
+        futures = [self.executor.submit(self.run, r, snapshot_id) for r in aql_query_requests]
+        return [f.result() for f in futures]
+
+    def run(self, aql_query_request: AqlQueryRequest, snapshot_id: Optional[str]) -> AqlQueryBatchItem:
+        context = self.context_factory()
+        item = AqlQueryBatchItem(aql_query_request.query_string)
+        try:
+            with self.connection_pool.use_snapshot(snapshot_id):
+                item.result = self.query_service_factory(context).query(aql_query_request)
+        except Exception as e:
+            logger.debug(f"AQL query of batch failed: {e}")
+            item.error = e
+        item.meta = context.create_meta_data(None)
+        return item
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=True, cancel_futures=True)
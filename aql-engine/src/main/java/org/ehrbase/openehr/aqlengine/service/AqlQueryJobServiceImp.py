@@ -0,0 +1,197 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterator, List, Optional
+
+from aql_cancellation_token import AqlCancellationToken
+from aql_query_job_service import AqlQueryJobService
+from aql_query_job_status import AqlQueryJobState, AqlQueryJobStatus
+from aql_query_request import AqlQueryRequest
+from aql_query_service import AqlQueryService
+from object_not_found_exception import ObjectNotFoundException
+from service_unavailable_exception import ServiceUnavailableException
+from state_conflict_exception import StateConflictException
+
+logger = logging.getLogger(__name__)
+
+
+def _utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _serialize_row(row: List[object]) -> str:
+    return json.dumps(row, default=str)
+
+
+@dataclass
+class _AqlQueryJob:
+    request: AqlQueryRequest
+    status: AqlQueryJobStatus
+    spool_path: str
+    cancelled: threading.Event = field(default_factory=threading.Event)
+    future: Optional[Future] = None
+    # byte offset of every INDEX_INTERVAL-th row in the spool file
+    row_offsets: List[int] = field(default_factory=list)
+
+
+class AqlQueryJobServiceImp(AqlQueryJobService):
+    """
+    Executes AQL queries on a bounded thread pool and spools their rows to NDJSON files,
+    one JSON array per line.
+
+    The queries run through AqlQueryService.stream, so the given service must not depend
+    on a request scoped query context. Finished jobs are removed after the retention period.
+    """
+
+    INDEX_INTERVAL = 1000
+
+    def __init__(self,
+                 aql_query_service: AqlQueryService,
+                 spool_dir: Optional[str] = None,
+                 max_concurrent: int = 2,
+                 max_queued: int = 20,
+                 retention: timedelta = timedelta(hours=24),
+                 row_serializer: Optional[Callable[[List[object]], str]] = None,
+                 clock: Callable[[], datetime] = _utc_now):
+        self.aql_query_service = aql_query_service
+        self.spool_dir = spool_dir or tempfile.mkdtemp(prefix="ehrbase-aql-jobs-")
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.retention = retention
+        self.row_serializer = row_serializer or _serialize_row
+        self.clock = clock
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="aql-job")
+        self._jobs: Dict[str, _AqlQueryJob] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, aql_query_request: AqlQueryRequest) -> AqlQueryJobStatus:
+        self.purge_expired()
+        job_id = str(uuid.uuid4())
+        if aql_query_request.cancellation is None:
+            # lets cancel() stop the running statement instead of waiting for its next row
+            aql_query_request = replace(aql_query_request, cancellation=AqlCancellationToken())
+        job = _AqlQueryJob(
+            aql_query_request,
+            AqlQueryJobStatus(job_id, AqlQueryJobState.QUEUED, aql_query_request.query_string, self.clock()),
+            os.path.join(self.spool_dir, f"{job_id}.ndjson")
+        )
+        with self._lock:
+            active = sum(1 for j in self._jobs.values() if not j.status.state.is_finished())
+            if active >= self.max_concurrent + self.max_queued:
+                raise ServiceUnavailableException(f"Too many AQL query jobs ({active}), try again later")
+            self._jobs[job_id] = job
+            job.future = self.executor.submit(self.run, job)
+        logger.debug(f"Submitted AQL query job {job_id}")
+        return replace(job.status)
+
+    def get_status(self, job_id: str) -> AqlQueryJobStatus:
+        self.purge_expired()
+        return replace(self.find_job(job_id).status)
+
+    def read_rows(self, job_id: str, offset: int, limit: int) -> Iterator[str]:
+        job = self.find_job(job_id)
+        if job.status.state != AqlQueryJobState.SUCCEEDED:
+            raise StateConflictException(f"AQL query job {job_id} is {job.status.state.value}, its result is not available")
+        if offset < 0 or limit < 0:
+            raise ValueError("offset and limit must not be negative")
+        if offset >= job.status.row_count or limit == 0:
+            return iter(())
+        return self._read_spool(job, offset, min(limit, job.status.row_count - offset))
+
+    def _read_spool(self, job: _AqlQueryJob, offset: int, limit: int) -> Iterator[str]:
+        with open(job.spool_path, "rb") as spool:
+            spool.seek(job.row_offsets[offset // self.INDEX_INTERVAL])
+            for _ in range(offset % self.INDEX_INTERVAL):
+                spool.readline()
+            for _ in range(limit):
+                yield spool.readline().rstrip(b"\n").decode("utf-8")
+
+    def cancel(self, job_id: str) -> AqlQueryJobStatus:
+        job = self.find_job(job_id)
+        job.cancelled.set()
+        job.request.cancellation.cancel()
+        if job.future is not None and job.future.cancel():
+            # still queued, run() will never be called
+            self._finish(job, AqlQueryJobState.CANCELLED)
+        return replace(job.status)
+
+    def find_job(self, job_id: str) -> _AqlQueryJob:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            raise ObjectNotFoundException("AQL query job", f"No AQL query job with id {job_id}")
+        return job
+
+    def run(self, job: _AqlQueryJob) -> None:
+        if job.cancelled.is_set():
+            self._finish(job, AqlQueryJobState.CANCELLED)
+            return
+        job.status.state = AqlQueryJobState.RUNNING
+        job.status.started = self.clock()
+        try:
+            result = self.aql_query_service.stream(job.request)
+            job.status.columns = result.columns
+            try:
+                self._spool(job, result.rows)
+            finally:
+                # releases the server-side cursor, also when the job was cancelled mid-stream
+                result.close()
+        except Exception as e:
+            if job.cancelled.is_set():
+                self._finish(job, AqlQueryJobState.CANCELLED)
+                return
+            logger.warning(f"AQL query job {job.status.job_id} failed: {e}")
+            self._finish(job, AqlQueryJobState.FAILED, str(e))
+            return
+        self._finish(job, AqlQueryJobState.CANCELLED if job.cancelled.is_set() else AqlQueryJobState.SUCCEEDED)
+
+    def _spool(self, job: _AqlQueryJob, rows: Iterator[List[object]]) -> None:
+        with open(job.spool_path, "wb") as spool:
+            for row in rows:
+                if job.cancelled.is_set():
+                    return
+                if job.status.row_count % self.INDEX_INTERVAL == 0:
+                    job.row_offsets.append(spool.tell())
+                spool.write(self.row_serializer(row).encode("utf-8"))
+                spool.write(b"\n")
+                job.status.row_count += 1
+
+    def _finish(self, job: _AqlQueryJob, state: AqlQueryJobState, error: Optional[str] = None) -> None:
+        job.status.state = state
+        job.status.error = error
+        job.status.finished = self.clock()
+        job.status.expires = job.status.finished + self.retention
+        if state != AqlQueryJobState.SUCCEEDED:
+            self._delete_spool(job)
+        logger.debug(f"AQL query job {job.status.job_id} finished: {state.value}")
+
+    def purge_expired(self) -> None:
+        now = self.clock()
+        with self._lock:
+            expired = [j for j in self._jobs.values() if j.status.expires is not None and j.status.expires <= now]
+            for job in expired:
+                del self._jobs[job.status.job_id]
+        for job in expired:
+            self._delete_spool(job)
+
+    @staticmethod
+    def _delete_spool(job: _AqlQueryJob) -> None:
+        try:
+            os.remove(job.spool_path)
+        except FileNotFoundError:
+            pass
+
+    def shutdown(self) -> None:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            job.cancelled.set()
+            job.request.cancellation.cancel()
+        self.executor.shutdown(wait=True, cancel_futures=True)
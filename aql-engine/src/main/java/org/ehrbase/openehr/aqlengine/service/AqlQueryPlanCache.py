@@ -0,0 +1,154 @@
+import json
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Collection, Dict, FrozenSet, Hashable, List, Optional, Tuple
+
+from aql_parameter_replacement import AqlParameterReplacement, BoundParameter
+from aql_query import AqlQuery
+from aql_query_wrapper import AqlQueryWrapper, SelectWrapper
+from prepared_query import PreparedQuery
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CompiledAqlPlan:
+    """
+    Everything AqlQueryServiceImp derives from an AQL string before execution.
+    Instances are shared between requests and must be treated as read-only.
+    """
+    aql_query: AqlQuery
+    query_wrapper: AqlQueryWrapper
+    non_primitive_selects: List[SelectWrapper]
+    prepared_query: PreparedQuery
+    # by AQL parameter name, parameters whose values are bound at execution
+    bound_parameters: Dict[str, BoundParameter] = field(default_factory=dict)
+
+
+class AqlQueryPlanCache:
+    """
+    Bounded LRU cache of compiled AQL plans.
+
+    The key is the normalized AQL text with its $parameter references left in place,
+    combined with fetch/offset and the parameter values. The values of inlined parameters
+    are part of the key because AqlParameterReplacement writes them into the generated SQL;
+    parameters bound at every occurrence only contribute their kind.
+
+    Which parameters a query binds is only known once it has been compiled, so the cache
+    remembers it per query shape (the key with every value replaced by its kind).
+    """
+
+    DEFAULT_MAX_SIZE = 500
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE):
+        if max_size < 1:
+            raise ValueError(f"max_size must be positive, got {max_size}")
+        self.max_size = max_size
+        self._plans: "OrderedDict[Hashable, CompiledAqlPlan]" = OrderedDict()
+        self._bound_by_shape: "OrderedDict[Hashable, FrozenSet[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def normalize(aql: str) -> str:
+        """Collapses whitespace outside of string literals."""
+        parts = []
+        in_literal = None
+        pending_space = False
+        for ch in aql.strip():
+            if in_literal is not None:
+                parts.append(ch)
+                if ch == in_literal:
+                    in_literal = None
+            elif ch.isspace():
+                pending_space = True
+            else:
+                if pending_space:
+                    parts.append(" ")
+                    pending_space = False
+                if ch in ("'", '"'):
+                    in_literal = ch
+                parts.append(ch)
+        return "".join(parts)
+
+    @staticmethod
+    def plan_key(query_string: str,
+                 parameters: Optional[Dict[str, Any]],
+                 fetch: Optional[int],
+                 offset: Optional[int],
+                 keyset: Optional[Hashable] = None,
+                 bound_parameters: Collection[str] = ()) -> Tuple:
+        if parameters and bound_parameters:
+            parameters = {
+                name: {"kind": AqlParameterReplacement.parameter_kind(value)} if name in bound_parameters else value
+                for name, value in parameters.items()
+            }
+        values = json.dumps(parameters, sort_keys=True, default=str) if parameters else None
+        return AqlQueryPlanCache.normalize(query_string), fetch, offset, values, keyset
+
+    @staticmethod
+    def shape_key(query_string: str,
+                  parameters: Optional[Dict[str, Any]],
+                  fetch: Optional[int],
+                  offset: Optional[int],
+                  keyset: Optional[Hashable] = None) -> Tuple:
+        return AqlQueryPlanCache.plan_key(query_string, parameters, fetch, offset, keyset, parameters or ())
+
+    @staticmethod
+    def value_independent(bound_parameters: Dict[str, BoundParameter]) -> FrozenSet[str]:
+        """The bound parameters that are not also inlined, whose values do not change the plan."""
+        return frozenset(name for name, bound in bound_parameters.items() if not bound.inlined)
+
+    def bound_parameters(self, shape: Hashable) -> FrozenSet[str]:
+        """Parameters bound by the plans of a query shape, empty if none was compiled yet."""
+        with self._lock:
+            return self._bound_by_shape.get(shape, frozenset())
+
+    def put_shape(self, shape: Hashable, bound_parameters: Collection[str]) -> None:
+        with self._lock:
+            self._bound_by_shape[shape] = frozenset(bound_parameters)
+            self._bound_by_shape.move_to_end(shape)
+            while len(self._bound_by_shape) > self.max_size:
+                self._bound_by_shape.popitem(last=False)
+
+    def get(self, key: Hashable) -> Optional[CompiledAqlPlan]:
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is None:
+                self._misses += 1
+                return None
+            self._plans.move_to_end(key)
+            self._hits += 1
+            return plan
+
+    def put(self, key: Hashable, plan: CompiledAqlPlan) -> None:
+        with self._lock:
+            self._plans[key] = plan
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.max_size:
+                self._plans.popitem(last=False)
+
+    def invalidate_all(self) -> None:
+        with self._lock:
+            self._plans.clear()
+            self._bound_by_shape.clear()
+
+    def on_template_changed(self, template_id: str) -> None:
+        # template ids and uuids are resolved while building the ASL, so every plan may be affected
+        logger.debug(f"Template {template_id} changed, invalidating {len(self)} AQL plans")
+        self.invalidate_all()
+
+    def hit_rate(self) -> float:
+        with self._lock:
+            total = self._hits + self._misses
+            return self._hits / total if total else 0.0
+
+    def stats(self, hit: bool) -> Dict[str, Any]:
+        return {"hit": hit, "hit_rate": round(self.hit_rate(), 4), "size": len(self)}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._plans)
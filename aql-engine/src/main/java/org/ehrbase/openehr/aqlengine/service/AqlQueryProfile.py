@@ -0,0 +1,92 @@
+import time
+from contextlib import contextmanager, nullcontext
+from enum import Enum
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, Optional
+
+from prometheus_client import REGISTRY, CollectorRegistry, Histogram
+
+
+class AqlQueryStage(Enum):
+    PARSE = "parse"
+    FEATURE_CHECK = "feature_check"
+    ASL = "asl"
+    SQL = "sql"
+    # EXPLAIN estimate and wait for a slot, see AqlAdmissionControl
+    ADMISSION = "admission"
+    EXECUTION = "execution"
+    POST_PROCESSING = "post_processing"
+    FORMAT = "format"
+
+
+class AqlQueryProfile:
+    """
+    Timings of the stages of one AQL query, plus the size of its result.
+
+    Stage times are exclusive: time spent in a stage entered while another one is
+    running is only counted for the inner stage, e.g. the post-processing done
+    by the repository while the rows are fetched.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self.clock = clock
+        self.started = clock()
+        self.stages: Dict[AqlQueryStage, float] = {}
+        self.rows: Optional[int] = None
+        self.bytes: Optional[int] = None
+        self._nested: List[float] = []
+
+    @contextmanager
+    def stage(self, stage: AqlQueryStage) -> Iterator[None]:
+        start = self.clock()
+        self._nested.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = self.clock() - start
+            self.stages[stage] = self.stages.get(stage, 0.0) + elapsed - self._nested.pop()
+            if self._nested:
+                self._nested[-1] += elapsed
+
+    def elapsed(self) -> float:
+        return self.clock() - self.started
+
+    def to_meta(self) -> Dict[str, Any]:
+        meta = {
+            "total_ms": round(self.elapsed() * 1000, 3),
+            "stages_ms": {stage.value: round(seconds * 1000, 3) for stage, seconds in self.stages.items()}
+        }
+        if self.rows is not None:
+            meta["rows"] = self.rows
+        if self.bytes is not None:
+            meta["bytes"] = self.bytes
+        return meta
+
+
+def profiled(profile: Optional[AqlQueryProfile], stage: AqlQueryStage) -> ContextManager[None]:
+    return profile.stage(stage) if profile is not None else nullcontext()
+
+
+class AqlQueryProfiler:
+    """Exports the stage timings and result sizes of AQL query profiles as prometheus histograms."""
+
+    ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000, float("inf"))
+
+    def __init__(self, registry: CollectorRegistry = REGISTRY):
+        self.stage_seconds = Histogram(
+            'ehrbase_aql_stage_seconds',
+            'Time spent per AQL query stage',
+            ['stage'],
+            registry=registry
+        )
+        self.result_rows = Histogram(
+            'ehrbase_aql_result_rows',
+            'Rows returned per AQL query',
+            buckets=self.ROW_BUCKETS,
+            registry=registry
+        )
+
+    def record(self, profile: AqlQueryProfile) -> None:
+        for stage, seconds in profile.stages.items():
+            self.stage_seconds.labels(stage.value).observe(seconds)
+        if profile.rows is not None:
+            self.result_rows.observe(profile.rows)
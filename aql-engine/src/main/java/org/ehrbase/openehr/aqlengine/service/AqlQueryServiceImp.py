@@ -1,7 +1,10 @@
+import copy
+import dataclasses
 import json
 import logging
 import re
-from typing import List, Dict, Optional
+from contextlib import ExitStack, nullcontext
+from typing import Any, ContextManager, Hashable, Iterator, List, Dict, Optional, Tuple
 
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
@@ -15,12 +18,24 @@ from aql_query_context import AqlQueryContext
 from aql_query_request import AqlQueryRequest
 from aql_query import AqlQuery
 from aql_query_parser import AqlQueryParser
+from aql_parameter_replacement import AqlParameterReplacement, BoundParameter
 from aql_renderer import AqlRenderer
 from result_holder import ResultHolder
 from query_result_dto import QueryResultDto
+from streamed_query_result import StreamedQueryResult
 from containment_expression import ContainmentClassExpression, ContainmentSetOperator, ContainmentSetOperatorSymbol
 from aql_util import AqlUtil
 from aql_query_wrapper import AqlQueryWrapper, SelectWrapper, SelectType
+from aql_query_plan_cache import AqlQueryPlanCache, CompiledAqlPlan
+from prepared_query import PreparedQuery
+from aql_result_cache import AqlResultCache, AqlResultScope, CachedAqlResult
+from continuation_token import ContinuationToken
+from aql_query_sample import AqlQuerySample
+from aql_query_profile import AqlQueryProfile, AqlQueryProfiler, AqlQueryStage, profiled
+from aql_admission_control import AqlAdmissionControl
+from aql_cancellation_token import AqlCancellationToken
+from rm_constants import RmConstants
+from version_contains_wrapper import VersionContainsWrapper
 
 logger = logging.getLogger(__name__)
 
@@ -36,7 +51,12 @@ class AqlQueryServiceImp:
                  default_limit: Optional[int] = None,
                  max_limit: Optional[int] = None,
                  max_fetch: Optional[int] = None,
-                 fetch_precedence: str = 'REJECT'):
+                 fetch_precedence: str = 'REJECT',
+                 plan_cache: Optional[AqlQueryPlanCache] = None,
+                 result_cache: Optional[AqlResultCache] = None,
+                 profiler: Optional[AqlQueryProfiler] = None,
+                 bind_parameters: bool = False,
+                 admission_control: Optional[AqlAdmissionControl] = None):
         self.aql_query_repository = aql_query_repository
         self.ts_adapter = ts_adapter
         self.aql_sql_layer = aql_sql_layer
@@ -47,11 +67,92 @@ class AqlQueryServiceImp:
         self.max_limit = max_limit
         self.max_fetch = max_fetch
         self.fetch_precedence = fetch_precedence
+        self.plan_cache = plan_cache
+        self.result_cache = result_cache
+        self.profiler = profiler
+        # send eligible $parameters as bind parameters, so the SQL (and its server-side plan) is shared by all values
+        self.bind_parameters = bind_parameters
+        self.admission_control = admission_control
+
+    def with_context(self, aql_query_context: AqlQueryContext) -> 'AqlQueryServiceImp':
+        """A service writing its meta data to the given context, sharing repository and caches with this one."""
+        service = copy.copy(self)
+        service.aql_query_context = aql_query_context
+        return service
 
     def query(self, aql_query_request: AqlQueryRequest) -> QueryResultDto:
         return self.query_aql(aql_query_request)
 
     def query_aql(self, aql_query_request: AqlQueryRequest) -> QueryResultDto:
+        profile = AqlQueryProfile()
+        try:
+            plan = self.prepare_execution(aql_query_request, profile)
+            query_wrapper = plan.query_wrapper
+
+            if self.aql_query_context.is_dry_run():
+                result_data = []
+            else:
+                result_data = self.fetch_result(aql_query_request, plan, profile)
+                self.aql_query_context.set_meta_property(AqlQueryContext.EHRBASE_META_PROPERTY_RESULT_SIZE, len(result_data))
+                if query_wrapper.sample is not None:
+                    self.aql_query_context.set_meta_property(
+                        AqlQueryContext.EHRBASE_META_PROPERTY_SAMPLE,
+                        query_wrapper.sample.to_meta(self.sampled_counts(query_wrapper, plan.non_primitive_selects, result_data))
+                    )
+
+            with profile.stage(AqlQueryStage.FORMAT):
+                result = self.format_result(query_wrapper.selects(), result_data)
+            profile.rows = len(result_data)
+            self.report_profile(profile, result_data)
+            return result
+
+        except (ValueError, json.JSONDecodeError, RequestException, SQLAlchemyError, AqlParseException) as e:
+            raise self.translate_exception(e) from e
+
+    def stream(self, aql_query_request: AqlQueryRequest) -> StreamedQueryResult:
+        """
+        Like query(), but rows are fetched through a server-side cursor and post-processed lazily.
+        Errors raised while iterating the rows are not translated, as the response has already started.
+        """
+        profile = AqlQueryProfile()
+        try:
+            plan = self.prepare_execution(aql_query_request, profile)
+        except (ValueError, json.JSONDecodeError, RequestException, SQLAlchemyError, AqlParseException) as e:
+            raise self.translate_exception(e) from e
+
+        selects = plan.query_wrapper.selects()
+        if self.aql_query_context.is_dry_run():
+            chunks = iter(())
+        else:
+            # admitted before the response starts, the slot is held until the chunks are exhausted or closed
+            admission = self.admitted(aql_query_request, plan, profile)
+            chunks = self.iterate_admitted(
+                admission, self.stream_query(plan.prepared_query, plan.query_wrapper, plan.non_primitive_selects,
+                                             aql_query_request.cancellation))
+        # rows are produced lazily, so only the preparation stages are profiled
+        self.report_profile(profile)
+        return StreamedQueryResult.of_chunks(self.result_columns(selects), chunks)
+
+    @staticmethod
+    def translate_exception(e: Exception) -> Exception:
+        if isinstance(e, (ValueError, json.JSONDecodeError)):
+            return InternalServerError(str(e))
+        if isinstance(e, RequestException):
+            return BadGatewayError(f"Bad gateway: {str(e)}")
+        if isinstance(e, SQLAlchemyError):
+            return InternalServerError(f"Data Access Error: {str(e)}")
+        return IllegalAqlException(f"Could not parse AQL query: {str(e)}")
+
+    def report_profile(self, profile: AqlQueryProfile, result_data: Optional[List[List[object]]] = None) -> None:
+        if self.profiler is not None:
+            self.profiler.record(profile)
+        if self.aql_query_context.show_executed_sql():
+            if result_data is not None:
+                # only measured on request, serializing the rows twice is too expensive otherwise
+                profile.bytes = len(json.dumps(result_data, default=str).encode("utf-8"))
+            self.aql_query_context.set_meta_property(AqlQueryContext.EHRBASE_META_PROPERTY_PROFILE, profile.to_meta())
+
+    def prepare_execution(self, aql_query_request: AqlQueryRequest, profile: Optional[AqlQueryProfile] = None) -> CompiledAqlPlan:
         if self.default_limit is not None:
             self.aql_query_context.set_meta_property(AqlQueryContext.EHRBASE_META_PROPERTY_DEFAULT_LIMIT, self.default_limit)
         if self.max_limit is not None:
@@ -59,61 +160,139 @@ class AqlQueryServiceImp:
         if self.max_fetch is not None:
             self.aql_query_context.set_meta_property(AqlQueryContext.EHRBASE_META_PROPERTY_MAX_FETCH, self.max_fetch)
 
-        try:
-            aql_query = self.build_aql_query(aql_query_request)
-
+        token = self.decode_continuation_token(aql_query_request)
+        plan = self.compile_plan(aql_query_request, token, profile)
+        if plan.bound_parameters:
+            plan = dataclasses.replace(plan, prepared_query=self.bind_parameter_values(plan, aql_query_request.parameters))
+        if token is not None:
+            plan = dataclasses.replace(plan, prepared_query=plan.prepared_query.bind(token.bind_values()))
+        prepared_query = plan.prepared_query
+        query_wrapper = plan.query_wrapper
+
+        if self.aql_query_context.show_executed_sql():
+            with profiled(profile, AqlQueryStage.SQL):
+                executed_sql = self.aql_query_repository.get_query_sql(prepared_query)
+            self.aql_query_context.set_meta_property(AqlQueryContext.EHRBASE_META_PROPERTY_EXECUTED_SQL, executed_sql)
+        if self.aql_query_context.show_query_plan():
+            analyze = not self.aql_query_context.is_dry_run()
+            explained_query = self.aql_query_repository.explain_query(analyze, prepared_query)
+            self.aql_query_context.set_meta_property(AqlQueryContext.EHRBASE_META_PROPERTY_QUERY_PLAN, explained_query)
+
+        if self.aql_query_context.show_executed_aql():
+            self.aql_query_context.set_executed_aql(AqlRenderer.render(plan.aql_query))
+
+        if query_wrapper.sample is not None:
+            # the error estimate is added once the result is known, see query_aql
+            self.aql_query_context.set_meta_property(AqlQueryContext.EHRBASE_META_PROPERTY_SAMPLE, query_wrapper.sample.to_meta(()))
+
+        limit = query_wrapper.limit()
+        if limit is not None:
+            self.aql_query_context.set_meta_property(AqlQueryContext.EHRBASE_META_PROPERTY_FETCH, limit)
+            offset = query_wrapper.offset() or 0
+            self.aql_query_context.set_meta_property(AqlQueryContext.EHRBASE_META_PROPERTY_OFFSET, offset)
+
+        return plan
+
+    @staticmethod
+    def bind_parameter_values(plan: CompiledAqlPlan, parameters: Dict[str, Any]) -> PreparedQuery:
+        values = {}
+        temp_tables = {}
+        for name, bound in plan.bound_parameters.items():
+            value = AqlParameterReplacement.bind_value(bound, parameters[name])
+            if bound.temp_table:
+                temp_tables[bound.bind_name] = value
+            else:
+                values[bound.bind_name] = value
+        return plan.prepared_query.bind(values, temp_tables)
+
+    @staticmethod
+    def query_hash(aql_query_request: AqlQueryRequest) -> str:
+        return ContinuationToken.hash_query(
+            AqlQueryPlanCache.normalize(aql_query_request.query_string),
+            aql_query_request.parameters
+        )
+
+    def decode_continuation_token(self, aql_query_request: AqlQueryRequest) -> Optional[ContinuationToken]:
+        if aql_query_request.continuation_token is None:
+            return None
+        return ContinuationToken.decode(aql_query_request.continuation_token, self.query_hash(aql_query_request))
+
+    @staticmethod
+    def keyset_spec(aql_query_request: AqlQueryRequest, token: Optional[ContinuationToken]) -> Optional[Dict]:
+        if token is not None:
+            return {'seek': True, 'null_mask': token.null_mask()}
+        if aql_query_request.keyset:
+            return {'seek': False, 'null_mask': ()}
+        return None
+
+    @staticmethod
+    def sample_spec(aql_query_request: AqlQueryRequest) -> Optional[AqlQuerySample]:
+        if aql_query_request.sample is None:
+            return None
+        return AqlQuerySample.of_ratio(aql_query_request.sample)
+
+    @staticmethod
+    def execution_variant(keyset: Optional[Hashable], sample: Optional[AqlQuerySample]) -> Optional[Hashable]:
+        """Part of the plan key for the execution options that change the SQL of a query."""
+        return keyset if sample is None else (keyset, sample)
+
+    def compile_plan(self, aql_query_request: AqlQueryRequest, token: Optional[ContinuationToken] = None,
+                     profile: Optional[AqlQueryProfile] = None) -> CompiledAqlPlan:
+        keyset = self.keyset_spec(aql_query_request, token)
+        sample = self.sample_spec(aql_query_request)
+        if self.plan_cache is None:
+            return self.build_plan(aql_query_request, keyset, profile, sample)
+
+        key_args = (
+            aql_query_request.query_string,
+            aql_query_request.parameters,
+            aql_query_request.fetch,
+            aql_query_request.offset,
+            self.execution_variant((keyset['seek'], keyset['null_mask']) if keyset else None, sample)
+        )
+        shape = AqlQueryPlanCache.shape_key(*key_args)
+        key = AqlQueryPlanCache.plan_key(*key_args, self.plan_cache.bound_parameters(shape))
+        plan = self.plan_cache.get(key)
+        hit = plan is not None
+        if not hit:
+            plan = self.build_plan(aql_query_request, keyset, profile, sample)
+            value_independent = AqlQueryPlanCache.value_independent(plan.bound_parameters)
+            self.plan_cache.put(AqlQueryPlanCache.plan_key(*key_args, value_independent), plan)
+            self.plan_cache.put_shape(shape, value_independent)
+
+        self.aql_query_context.set_meta_property(AqlQueryContext.EHRBASE_META_PROPERTY_PLAN_CACHE, self.plan_cache.stats(hit))
+        return plan
+
+    def build_plan(self, aql_query_request: AqlQueryRequest, keyset: Optional[Dict] = None,
+                   profile: Optional[AqlQueryProfile] = None, sample: Optional[AqlQuerySample] = None) -> CompiledAqlPlan:
+        with profiled(profile, AqlQueryStage.PARSE):
+            aql_query, bound_parameters = self.build_aql_query(aql_query_request)
+
+        with profiled(profile, AqlQueryStage.FEATURE_CHECK):
             self.aql_query_feature_check.ensure_query_supported(aql_query)
 
-            if logger.isEnabledFor(logging.TRACE):
-                logger.trace(self.object_mapper.dumps(aql_query))
+        if logger.isEnabledFor(logging.TRACE):
+            logger.trace(self.object_mapper.dumps(aql_query))
 
+        with profiled(profile, AqlQueryStage.ASL):
             query_wrapper = AqlQueryWrapper.create(aql_query)
+            # materialized, as cached plans are executed many times
+            non_primitive_selects = list(query_wrapper.non_primitive_selects())
+            keyset_columns = 0
+            if keyset is not None:
+                self.ensure_keyset_supported(query_wrapper, non_primitive_selects)
+                query_wrapper.keyset = keyset
+                keyset_columns = len(query_wrapper.order_by()) + 1
+            query_wrapper.sample = sample
             asl_query = self.aql_sql_layer.build_asl_root_query(query_wrapper)
-            non_primitive_selects = query_wrapper.non_primitive_selects()
-
-            prepared_query = self.aql_query_repository.prepare_query(asl_query, non_primitive_selects)
-
-            if self.aql_query_context.show_executed_sql():
-                self.aql_query_context.set_meta_property(
-                    AqlQueryContext.EHRBASE_META_PROPERTY_EXECUTED_SQL,
-                    self.aql_query_repository.get_query_sql(prepared_query)
-                )
-            if self.aql_query_context.show_query_plan():
-                analyze = not self.aql_query_context.is_dry_run()
-                explained_query = self.aql_query_repository.explain_query(analyze, prepared_query)
-                self.aql_query_context.set_meta_property(
-                    AqlQueryContext.EHRBASE_META_PROPERTY_QUERY_PLAN,
-                    self.object_mapper.loads(explained_query)
-                )
 
-            if self.aql_query_context.show_executed_aql():
-                self.aql_query_context.set_executed_aql(AqlRenderer.render(aql_query))
+        with profiled(profile, AqlQueryStage.SQL):
+            prepared_query = self.aql_query_repository.prepare_query(asl_query, non_primitive_selects, keyset_columns)
+        return CompiledAqlPlan(aql_query, query_wrapper, non_primitive_selects, prepared_query, bound_parameters)
 
-            limit = query_wrapper.limit()
-            if limit is not None:
-                self.aql_query_context.set_meta_property(AqlQueryContext.EHRBASE_META_PROPERTY_FETCH, limit)
-                offset = query_wrapper.offset() or 0
-                self.aql_query_context.set_meta_property(AqlQueryContext.EHRBASE_META_PROPERTY_OFFSET, offset)
-
-            if self.aql_query_context.is_dry_run():
-                result_data = []
-            else:
-                result_data = self.execute_query(prepared_query, query_wrapper, non_primitive_selects)
-                self.aql_query_context.set_meta_property(AqlQueryContext.EHRBASE_META_PROPERTY_RESULT_SIZE, len(result_data))
-
-            return self.format_result(query_wrapper.selects(), result_data)
-
-        except (ValueError, json.JSONDecodeError) as e:
-            raise InternalServerError(str(e)) from e
-        except RequestException as e:
-            raise BadGatewayError(f"Bad gateway: {str(e)}") from e
-        except SQLAlchemyError as e:
-            raise InternalServerError(f"Data Access Error: {str(e)}") from e
-        except AqlParseException as e:
-            raise IllegalAqlException(f"Could not parse AQL query: {str(e)}") from e
-
-    def build_aql_query(self, aql_query_request: AqlQueryRequest) -> AqlQuery:
-        aql_query = AqlQueryParser.parse(aql_query_request.query_string())
+    def build_aql_query(self, aql_query_request: AqlQueryRequest) -> Tuple[AqlQuery, Dict[str, BoundParameter]]:
+        """Parses the query and applies limits and parameters; also returns the parameters left to be bound."""
+        aql_query = AqlQueryParser.parse(aql_query_request.query_string)
 
         fetch_param = aql_query_request.fetch
         offset_param = aql_query_request.offset
@@ -132,10 +311,124 @@ class AqlQueryServiceImp:
         aql_query.limit = limit or self.default_limit
         aql_query.offset = offset_param or query_offset
 
-        AqlParameterReplacement.replace_parameters(aql_query, aql_query_request.parameters)
+        bound_parameters = AqlParameterReplacement.replace_parameters(
+            aql_query, aql_query_request.parameters, self.bind_parameters)
         self.replace_ehr_paths(aql_query)
 
-        return aql_query
+        return aql_query, bound_parameters
+
+    @staticmethod
+    def ensure_keyset_supported(query_wrapper: AqlQueryWrapper, non_primitive_selects: List[SelectWrapper]) -> None:
+        if query_wrapper.limit() is None:
+            raise UnprocessableEntityException("Keyset pagination requires a fetch parameter or LIMIT clause")
+        if query_wrapper.offset() is not None:
+            raise UnprocessableEntityException("Keyset pagination must not be combined with an offset")
+        if query_wrapper.distinct() or not non_primitive_selects or any(
+                s.type == SelectType.AGGREGATE_FUNCTION for s in non_primitive_selects):
+            raise UnprocessableEntityException("Keyset pagination is not supported for DISTINCT, aggregating or primitive-only queries")
+        if not AqlQueryServiceImp.has_one_row_per_object(query_wrapper):
+            raise UnprocessableEntityException(
+                "Keyset pagination is only supported for queries on a single EHR, EHR_STATUS or COMPOSITION")
+
+    @staticmethod
+    def has_one_row_per_object(query_wrapper: AqlQueryWrapper) -> bool:
+        """
+        If rows are identified by the vo_id (EHR: id) used as keyset tiebreaker, see AqlSqlLayer.add_keyset.
+        That is only the case without further containments or VERSION: those yield one row per contained
+        object or version, which would share the tiebreaker, so rows could be skipped between pages.
+        """
+        contains_chain = query_wrapper.contains_chain()
+        if contains_chain.has_trailing_set_operation() or len(contains_chain.chain) != 1:
+            return False
+        contains = contains_chain.chain[0]
+        return (not isinstance(contains, VersionContainsWrapper)
+                and contains.get_rm_type() in (RmConstants.EHR, RmConstants.EHR_STATUS, RmConstants.COMPOSITION))
+
+    @staticmethod
+    def result_key(aql_query_request: AqlQueryRequest) -> Hashable:
+        plan_key = AqlQueryPlanCache.plan_key(
+            aql_query_request.query_string,
+            aql_query_request.parameters,
+            aql_query_request.fetch,
+            aql_query_request.offset,
+            AqlQueryServiceImp.execution_variant(aql_query_request.keyset, AqlQueryServiceImp.sample_spec(aql_query_request))
+        )
+        return plan_key, aql_query_request.continuation_token
+
+    def fetch_result(self, aql_query_request: AqlQueryRequest, plan: CompiledAqlPlan,
+                     profile: Optional[AqlQueryProfile] = None) -> List[List[object]]:
+        if self.result_cache is None or not aql_query_request.cache:
+            result_data, meta = self.run_query(aql_query_request, plan, profile)
+        else:
+            key = self.result_key(aql_query_request)
+            cached = self.result_cache.get(key)
+            if cached is None:
+                # read before executing, so results of queries overlapping a commit are not stored
+                generation = self.result_cache.generation()
+                result_data, meta = self.run_query(aql_query_request, plan, profile)
+                scope = AqlResultScope.of(plan.query_wrapper, aql_query_request.parameters)
+                self.result_cache.put(key, CachedAqlResult(result_data, scope, meta), generation)
+            else:
+                result_data, meta = cached.rows, cached.meta
+            self.aql_query_context.set_meta_property(
+                AqlQueryContext.EHRBASE_META_PROPERTY_RESULT_CACHE, self.result_cache.stats(cached is not None))
+
+        for meta_property, value in meta.items():
+            self.aql_query_context.set_meta_property(meta_property, value)
+        return result_data
+
+    def run_query(self, aql_query_request: AqlQueryRequest, plan: CompiledAqlPlan,
+                  profile: Optional[AqlQueryProfile] = None) -> Tuple[List[List[object]], Dict[Any, Any]]:
+        """Executes the plan, returning the rows and the meta properties that depend on them."""
+        with self.admitted(aql_query_request, plan, profile):
+            result_data = self.execute_query(plan.prepared_query, plan.query_wrapper, plan.non_primitive_selects, profile,
+                                             aql_query_request.cancellation)
+        meta = {}
+        if plan.prepared_query.keyset_columns:
+            with profiled(profile, AqlQueryStage.POST_PROCESSING):
+                token = self.apply_keyset_page(aql_query_request, plan, result_data)
+            if token is not None:
+                meta[AqlQueryContext.EHRBASE_META_PROPERTY_CONTINUATION_TOKEN] = token
+        return result_data, meta
+
+    def admitted(self, aql_query_request: AqlQueryRequest, plan: CompiledAqlPlan,
+                 profile: Optional[AqlQueryProfile] = None) -> ContextManager[None]:
+        """
+        Waits for a slot of the query's priority class, after checking the EXPLAIN estimates if limits are configured.
+        The returned context manager already holds the slot and releases it on exit.
+        """
+        if self.admission_control is None or plan.prepared_query.static_result is not None:
+            return nullcontext()
+        admission = ExitStack()
+        with profiled(profile, AqlQueryStage.ADMISSION):
+            priority = aql_query_request.priority
+            if self.admission_control.requires_estimate():
+                estimate = self.aql_query_repository.estimate_query(plan.prepared_query)
+                priority = self.admission_control.classify(estimate, priority)
+            admission.enter_context(self.admission_control.admit(priority))
+        return admission
+
+    @staticmethod
+    def iterate_admitted(admission: ContextManager[None], rows: Iterator[List[object]]) -> Iterator[List[object]]:
+        def iterate():
+            with admission:
+                yield
+                yield from rows
+        admitted_rows = iterate()
+        # enters the with block, so closing the iterator releases the slot even if no row was read
+        next(admitted_rows)
+        return admitted_rows
+
+    def apply_keyset_page(self, aql_query_request: AqlQueryRequest, plan: CompiledAqlPlan, result_data: List[List[object]]) -> Optional[str]:
+        """Removes the hidden keyset columns and, if the page is full, returns the token for the next page."""
+        keyset_columns = plan.prepared_query.keyset_columns
+        last_keys = result_data[-1][-keyset_columns:] if result_data else None
+        for row in result_data:
+            del row[-keyset_columns:]
+
+        if last_keys is not None and len(result_data) == plan.query_wrapper.limit():
+            return ContinuationToken.from_keyset_row(self.query_hash(aql_query_request), last_keys).encode()
+        return None
 
     def apply_fetch_precedence(self, query_limit: Optional[int], query_offset: Optional[int], fetch_param: Optional[int], offset_param: Optional[int]) -> Optional[int]:
         if fetch_param is None:
@@ -153,22 +446,67 @@ class AqlQueryServiceImp:
                 raise UnprocessableEntityException(f"Query contains an OFFSET clause, fetch parameter must not be used (with fetch precedence {self.fetch_precedence})")
             return min(query_limit, fetch_param)
 
-    def execute_query(self, prepared_query, query_wrapper, non_primitive_selects: List[SelectWrapper]) -> List[List[object]]:
-        result_data = self.aql_query_repository.execute_query(prepared_query)
+    def execute_query(self, prepared_query, query_wrapper, non_primitive_selects: List[SelectWrapper],
+                      profile: Optional[AqlQueryProfile] = None,
+                      cancellation: Optional[AqlCancellationToken] = None) -> List[List[object]]:
+        with profiled(profile, AqlQueryStage.EXECUTION):
+            result_data = self.aql_query_repository.execute_query(prepared_query, profile, cancellation)
+
+        with profiled(profile, AqlQueryStage.POST_PROCESSING):
+            if not non_primitive_selects:
+                result_data = [[None] * len(result_data[0])] * int(result_data[0][0])
+
+            selects = query_wrapper.selects()
+            for i, sd in enumerate(selects):
+                if sd.type == SelectType.PRIMITIVE:
+                    value = sd.primitive.value
+                    for row in result_data:
+                        row.insert(i, value)
+        return result_data
+
+    def stream_query(self, prepared_query, query_wrapper, non_primitive_selects: List[SelectWrapper],
+                     cancellation: Optional[AqlCancellationToken] = None) -> Iterator[List[List[object]]]:
+        """The result columns of each fetched chunk, with the selected primitives as constant columns."""
+        primitives = [(i, sd.primitive.value) for i, sd in enumerate(query_wrapper.selects()) if sd.type == SelectType.PRIMITIVE]
+        chunks = self.aql_query_repository.stream_query_chunks(prepared_query, cancellation=cancellation)
 
         if not non_primitive_selects:
-            result_data = [[None] * len(result_data[0])] * int(result_data[0][0])
-
-        selects = query_wrapper.selects()
-        for i, sd in enumerate(selects):
-            if sd.type == SelectType.PRIMITIVE:
-                value = sd.primitive.value
-                for row in result_data:
-                    row.insert(i, value)
-        return result_data
+            # only primitives are selected: the query just counted the matching rows
+            first = next(chunks, None)
+            chunks.close()
+            count = int(first[0][0]) if first else 0
+            fetch_size = self.aql_query_repository.DEFAULT_FETCH_SIZE
+            for start in range(0, count, fetch_size):
+                size = min(fetch_size, count - start)
+                yield [[value] * size for _, value in primitives]
+            return
+
+        keyset_columns = prepared_query.keyset_columns
+        for columns in chunks:
+            if keyset_columns:
+                del columns[-keyset_columns:]
+            size = len(columns[0])
+            for i, value in primitives:
+                columns.insert(i, [value] * size)
+            yield columns
+
+    @staticmethod
+    def sampled_counts(query_wrapper: AqlQueryWrapper, non_primitive_selects: List[SelectWrapper],
+                       result_data: List[List[object]]) -> List[int]:
+        """The extrapolated counts of a sampled result, the base of its error estimate."""
+        if not non_primitive_selects:
+            # the synthetic COUNT determined the number of rows
+            return [len(result_data)]
+        indices = [i for i, sd in enumerate(query_wrapper.selects())
+                   if sd.type == SelectType.AGGREGATE_FUNCTION and sd.aggregate_function_name == 'COUNT']
+        return [row[i] for row in result_data for i in indices if row[i] is not None]
+
+    @staticmethod
+    def result_columns(select_fields: List[SelectWrapper]) -> Dict[str, Optional[str]]:
+        return {sf.select_alias or f"#{i}": sf.select_path or None for i, sf in enumerate(select_fields)}
 
     def format_result(self, select_fields: List[SelectWrapper], result_data: List[List[object]]) -> QueryResultDto:
-        columns = {sf.select_alias or f"#{i}": sf.select_path or None for i, sf in enumerate(select_fields)}
+        columns = self.result_columns(select_fields)
 
         dto = QueryResultDto()
         dto.variables = columns
@@ -0,0 +1,221 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, Hashable, Iterator, List, Optional, Set
+from uuid import UUID
+
+from aql_parameter_replacement import BoundParameter
+from aql_query_wrapper import AqlQueryWrapper
+from asl_extracted_column import AslExtractedColumn
+from comparison_operator_condition_wrapper import ComparisonOperatorConditionWrapper
+from condition_wrapper import ComparisonConditionOperator, LogicalConditionOperator
+from logical_operator_condition_wrapper import LogicalOperatorConditionWrapper
+from rm_constants import RmConstants
+from rm_contains_wrapper import RmContainsWrapper
+from version_contains_wrapper import VersionContainsWrapper
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class AqlResultScope:
+    """
+    EHRs and templates an AQL result is restricted to.
+    An empty set means the query is not restricted in that dimension.
+    """
+    ehr_ids: FrozenSet[str] = frozenset()
+    template_ids: FrozenSet[str] = frozenset()
+
+    @staticmethod
+    def of(query_wrapper: AqlQueryWrapper, parameters: Optional[Dict[str, Any]] = None) -> 'AqlResultScope':
+        """
+        The scope of the results of query_wrapper executed with parameters. Bound parameters are
+        resolved from parameters, as the wrapper of a cached plan is shared by all their values.
+        """
+        ehr_ids: Set[str] = set()
+        # alias -> template ids, one entry per COMPOSITION containment
+        composition_templates: Dict[str, Set[str]] = {}
+
+        for contains in _stream_contains(query_wrapper.contains_chain()):
+            rm_type = contains.get_rm_type()
+            if rm_type == RmConstants.EHR:
+                ehr_ids |= {v.lower() for v in _predicate_values(contains, AslExtractedColumn.EHR_ID)}
+            elif rm_type == RmConstants.COMPOSITION:
+                composition_templates[contains.alias()] = _predicate_values(contains, AslExtractedColumn.TEMPLATE_ID)
+
+        for condition in _top_level_conjuncts(query_wrapper.where()):
+            operand = condition.get_left_comparison_operand()
+            root = operand.get_root()
+            values = _condition_values(condition, parameters or {})
+            if root is None or values is None:
+                continue
+            path = operand.get_path().get_path()
+            if root.get_rm_type() == RmConstants.EHR and path == AslExtractedColumn.EHR_ID.get_path():
+                values = {v.lower() for v in values}
+                ehr_ids = ehr_ids & values if ehr_ids else values
+            elif root.get_rm_type() == RmConstants.COMPOSITION and path == AslExtractedColumn.TEMPLATE_ID.get_path():
+                known = composition_templates.get(root.alias())
+                composition_templates[root.alias()] = known & values if known else values
+
+        # the template scope only holds if every COMPOSITION in the query is restricted
+        template_ids: FrozenSet[str] = frozenset()
+        if composition_templates and all(composition_templates.values()):
+            template_ids = frozenset().union(*composition_templates.values())
+        return AqlResultScope(frozenset(ehr_ids), template_ids)
+
+    def affected_by(self, ehr_id: str, template_id: Optional[str]) -> bool:
+        if self.ehr_ids:
+            return ehr_id in self.ehr_ids
+        if self.template_ids and template_id is not None:
+            return template_id in self.template_ids
+        # EHR_STATUS, FOLDER and deletions without a known template may affect any query
+        return True
+
+
+def _stream_contains(contains_chain) -> Iterator[RmContainsWrapper]:
+    if contains_chain is None:
+        return
+    for contains in contains_chain.chain:
+        yield contains.child() if isinstance(contains, VersionContainsWrapper) else contains
+    if contains_chain.has_trailing_set_operation():
+        for operand in contains_chain.trailing_set_operation.operands:
+            yield from _stream_contains(operand)
+
+
+def _top_level_conjuncts(where) -> Iterator[ComparisonOperatorConditionWrapper]:
+    """Conditions every result row satisfies: the where clause itself or the operands of top-level ANDs."""
+    if isinstance(where, ComparisonOperatorConditionWrapper):
+        yield where
+    elif isinstance(where, LogicalOperatorConditionWrapper) and where.operator == LogicalConditionOperator.AND:
+        for operand in where.logical_operands:
+            yield from _top_level_conjuncts(operand)
+
+
+def _condition_values(condition: ComparisonOperatorConditionWrapper, parameters: Dict[str, Any]) -> Optional[Set[str]]:
+    if condition.get_operator() not in (ComparisonConditionOperator.EQ, ComparisonConditionOperator.MATCHES):
+        return None
+    values: Set[str] = set()
+    for operand in condition.get_right_comparison_operands():
+        if isinstance(operand, BoundParameter):
+            value = parameters.get(operand.name)
+            if value is None:
+                return None
+            if operand.array:
+                # a MATCHES list bound as one array or temporary table
+                values.update(str(v) for v in value)
+            else:
+                values.add(str(value))
+        else:
+            values.add(str(operand.get_value()))
+    return values
+
+
+def _predicate_values(contains: RmContainsWrapper, column: AslExtractedColumn) -> Set[str]:
+    predicates = contains.get_predicate() or []
+    # predicates are OR-ed, so the containment is only restricted if it is a single AND group
+    if len(predicates) != 1:
+        return set()
+    values: Set[str] = set()
+    for p in predicates[0].get_operands():
+        if p.get_path() == column.get_path() and p.get_operator() == p.PredicateComparisonOperator.EQ:
+            values.add(str(p.get_value().get_value()))
+    return values
+
+
+@dataclass
+class CachedAqlResult:
+    rows: List[List[Any]]
+    scope: AqlResultScope
+    # meta properties of the original execution that are part of the result, e.g. the continuation token
+    meta: Dict[str, Any] = field(default_factory=dict)
+    expires_at: Optional[float] = None
+
+
+class AqlResultCache:
+    """
+    Bounded LRU cache of post-processed AQL results.
+
+    Entries restricted to EHRs are evicted when data of one of these EHRs is committed.
+    All other entries additionally expire after ttl seconds, as commits to any EHR may change them.
+    Cached rows are shared between requests and must not be modified.
+    """
+
+    DEFAULT_MAX_SIZE = 1000
+    DEFAULT_TTL = 60.0
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE, ttl: float = DEFAULT_TTL, clock=time.monotonic):
+        if max_size < 1:
+            raise ValueError(f"max_size must be positive, got {max_size}")
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, CachedAqlResult]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+
+    def generation(self) -> int:
+        """To be read before executing a query and passed to put()."""
+        with self._lock:
+            return self._generation
+
+    def get(self, key: Hashable) -> Optional[CachedAqlResult]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at is not None and entry.expires_at <= self._clock():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry
+
+    def put(self, key: Hashable, result: CachedAqlResult, generation: int) -> bool:
+        """
+        Stores the result unless data was committed since generation was read,
+        as the result might then already be outdated.
+        """
+        with self._lock:
+            if generation != self._generation:
+                return False
+            if not result.scope.ehr_ids:
+                result.expires_at = self._clock() + self.ttl
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            return True
+
+    def on_ehr_changed(self, ehr_id: UUID, template_id: Optional[str] = None) -> None:
+        ehr = str(ehr_id).lower()
+        with self._lock:
+            self._generation += 1
+            evicted = [k for k, e in self._entries.items() if e.scope.affected_by(ehr, template_id)]
+            for k in evicted:
+                del self._entries[k]
+        logger.debug(f"Data of EHR {ehr} changed, evicted {len(evicted)} AQL results")
+
+    def invalidate_all(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def on_template_changed(self, template_id: str) -> None:
+        self.invalidate_all()
+
+    def hit_rate(self) -> float:
+        with self._lock:
+            total = self._hits + self._misses
+            return self._hits / total if total else 0.0
+
+    def stats(self, hit: bool) -> Dict[str, Any]:
+        return {"hit": hit, "hit_rate": round(self.hit_rate(), 4), "size": len(self)}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
@@ -1,27 +1,28 @@
-from typing import Any
 from dataclasses import dataclass
-import json
+from typing import Any, List
 
-# Assuming you have some way to handle JSONB and RMObject processing in Python.
-# Here, we'll use a placeholder for `DbToRmFormat.reconstructFromDbFormat`.
-class DbToRmFormat:
-    @staticmethod
-    def reconstruct_from_db_format(cls: type, data: dict) -> Any:
-        # Placeholder for actual implementation
-        return data  # Replace with actual transformation logic
+from db_to_canonical_json import DbToCanonicalJson
+from db_to_rm_format import DbToRmFormat, RMObject
 
-@dataclass
+
+@dataclass(frozen=True)
 class DefaultResultPostprocessor:
+    """
+    Converts selected RM objects from DB format. All query responses are JSON, so by default the
+    jsonb value is transcoded straight into canonical JSON; rm_objects=True reconstructs RM objects
+    instead, for callers that work with the result in the RM.
+    """
+    rm_objects: bool = False
+
     def __call__(self, column_value: Any) -> Any:
-        if column_value is None:
-            return None
-        elif isinstance(column_value, dict) and 'data' in column_value:
-            # Assuming `column_value` is a JSONB-like dictionary
-            return DbToRmFormat.reconstruct_from_db_format(RMObject, column_value['data'])
-        else:
+        # jsonb values come decoded from the driver, all other columns are passed through
+        if not isinstance(column_value, (dict, list)):
             return column_value
+        if self.rm_objects:
+            return DbToRmFormat.reconstruct_rm_object(RMObject, column_value)
+        return DbToCanonicalJson.transcode(column_value)
 
-# Example usage:
-postprocessor = DefaultResultPostprocessor()
-result = postprocessor({"data": json.dumps({"example": "data"})})
-print(result)
+    def post_process_columns(self, column_values: List[Any]) -> List[Any]:
+        """Converts all values of one column of a fetched chunk."""
+        transcode = self.__call__
+        return [transcode(v) for v in column_values]
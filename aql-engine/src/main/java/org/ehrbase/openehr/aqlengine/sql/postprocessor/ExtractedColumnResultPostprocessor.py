@@ -1,4 +1,4 @@
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional
 from dataclasses import dataclass
 from enum import Enum
 import uuid
@@ -87,34 +87,74 @@ class ExtractedColumnResultPostprocessor:
     knowledge_cache: KnowledgeCacheService
     node_name: str
 
+    # values of these columns repeat across rows, so each distinct value is converted only once per chunk
+    MEMOIZED_COLUMNS = frozenset({
+        AslExtractedColumn.TEMPLATE_ID,
+        AslExtractedColumn.AD_CHANGE_TYPE_DV,
+        AslExtractedColumn.AD_CHANGE_TYPE_VALUE,
+        AslExtractedColumn.AD_CHANGE_TYPE_PREFERRED_TERM,
+        AslExtractedColumn.AD_CHANGE_TYPE_CODE_STRING,
+        AslExtractedColumn.ROOT_CONCEPT,
+        AslExtractedColumn.EHR_SYSTEM_ID_DV,
+    })
+
+    def __post_init__(self):
+        # the converter only depends on the column, so it is picked once when the query is prepared
+        self._converter: Callable[[Any], Any] = self.select_converter()
+
+    def select_converter(self) -> Callable[[Any], Any]:
+        column = self.extracted_column
+        if column == AslExtractedColumn.TEMPLATE_ID:
+            return lambda v: self.knowledge_cache.find_template_id_by_uuid(uuid.UUID(str(v)))
+        elif column in {AslExtractedColumn.OV_TIME_COMMITTED_DV, AslExtractedColumn.EHR_TIME_CREATED_DV}:
+            return DvDateTime
+        elif column in {AslExtractedColumn.OV_TIME_COMMITTED, AslExtractedColumn.EHR_TIME_CREATED}:
+            return OpenEHRDateTimeSerializationUtils.format_date_time
+        elif column == AslExtractedColumn.AD_DESCRIPTION_DV:
+            return DvText
+        elif column == AslExtractedColumn.AD_CHANGE_TYPE_DV:
+            return self.contribution_change_type_as_dv_coded_text
+        elif column in {AslExtractedColumn.AD_CHANGE_TYPE_VALUE, AslExtractedColumn.AD_CHANGE_TYPE_PREFERRED_TERM}:
+            return lambda v: v.get_literal().lower()
+        elif column == AslExtractedColumn.AD_CHANGE_TYPE_CODE_STRING:
+            return ChangeTypeUtils.get_code_by_jooq_change_type
+        elif column == AslExtractedColumn.VO_ID:
+            return self.restore_vo_id
+        elif column == AslExtractedColumn.ROOT_CONCEPT:
+            return lambda v: AslRmTypeAndConcept.ARCHETYPE_PREFIX + RmConstants.COMPOSITION + v
+        elif column == AslExtractedColumn.ARCHETYPE_NODE_ID:
+            return self.restore_archetype_node_id
+        elif column == AslExtractedColumn.EHR_SYSTEM_ID_DV:
+            return HierObjectId
+        else:
+            return lambda v: v
+
     def post_process_column(self, column_value: Any) -> Any:
         if column_value is None:
             return None
-
-        if self.extracted_column == AslExtractedColumn.TEMPLATE_ID:
-            return self.knowledge_cache.find_template_id_by_uuid(uuid.UUID(column_value))
-        elif self.extracted_column in {AslExtractedColumn.OV_TIME_COMMITTED_DV, AslExtractedColumn.EHR_TIME_CREATED_DV}:
-            return DvDateTime(column_value)
-        elif self.extracted_column in {AslExtractedColumn.OV_TIME_COMMITTED, AslExtractedColumn.EHR_TIME_CREATED}:
-            return OpenEHRDateTimeSerializationUtils.format_date_time(column_value)
-        elif self.extracted_column == AslExtractedColumn.AD_DESCRIPTION_DV:
-            return DvText(column_value)
-        elif self.extracted_column == AslExtractedColumn.AD_CHANGE_TYPE_DV:
-            return self.contribution_change_type_as_dv_coded_text(column_value)
-        elif self.extracted_column in {AslExtractedColumn.AD_CHANGE_TYPE_VALUE, AslExtractedColumn.AD_CHANGE_TYPE_PREFERRED_TERM}:
-            return column_value.get_literal().lower()
-        elif self.extracted_column == AslExtractedColumn.AD_CHANGE_TYPE_CODE_STRING:
-            return ChangeTypeUtils.get_code_by_jooq_change_type(column_value)
-        elif self.extracted_column == AslExtractedColumn.VO_ID:
-            return self.restore_vo_id(column_value)
-        elif self.extracted_column == AslExtractedColumn.ROOT_CONCEPT:
-            return AslRmTypeAndConcept.ARCHETYPE_PREFIX + RmConstants.COMPOSITION + column_value
-        elif self.extracted_column == AslExtractedColumn.ARCHETYPE_NODE_ID:
-            return self.restore_archetype_node_id(column_value)
-        elif self.extracted_column == AslExtractedColumn.EHR_SYSTEM_ID_DV:
-            return HierObjectId(column_value)
-        else:
-            return column_value
+        return self._converter(column_value)
+
+    def __call__(self, column_value: Any) -> Any:
+        return self.post_process_column(column_value)
+
+    def post_process_columns(self, column_values: List[Any]) -> List[Any]:
+        """
+        Converts all values of one column of a fetched chunk.
+        Memoized results are shared between rows and must not be modified.
+        """
+        convert = self._converter
+        if self.extracted_column not in self.MEMOIZED_COLUMNS:
+            return [None if v is None else convert(v) for v in column_values]
+
+        resolved: Dict[Any, Any] = {None: None}
+        result = []
+        for v in column_values:
+            try:
+                result.append(resolved[v])
+            except KeyError:
+                resolved[v] = converted = convert(v)
+                result.append(converted)
+        return result
 
     def restore_archetype_node_id(self, src_row: Dict[str, Any]) -> str:
         entity_concept = src_row.get('concept', '')
@@ -0,0 +1,47 @@
+import pytest
+from sqlalchemy import column
+from sqlalchemy.dialects import postgresql
+from your_module import AdditionalSQLFunctions, AqlQuerySample, UnprocessableEntityException
+
+
+def test_ratio_is_rounded_to_buckets():
+    assert AqlQuerySample.of_ratio("0.1").buckets == 1000
+    assert AqlQuerySample.of_ratio(0.00001).ratio == 1 / AqlQuerySample.BUCKETS
+    assert AqlQuerySample.of_ratio(1).ratio == 1.0
+    for invalid in (0, 1.5, -0.1, "ten percent"):
+        with pytest.raises(UnprocessableEntityException):
+            AqlQuerySample.of_ratio(invalid)
+
+
+def test_sampled_sql():
+    sample = AqlQuerySample.of_ratio(0.25)
+    dialect = postgresql.dialect()
+
+    condition = str(sample.condition(column("vo_id")).compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+    count = str(AdditionalSQLFunctions.count(False, None, sample.ratio).compile(
+        dialect=dialect, compile_kwargs={"literal_binds": True}))
+
+    # % is escaped for the pyformat parameter style of the driver
+    assert condition == "(hashtext(CAST(vo_id AS TEXT)) & 2147483647) %% 10000 < 2500"
+    assert count == "CAST(round(count('*') / CAST(0.25 AS DOUBLE PRECISION)) AS BIGINT)"
+
+
+def test_distinct_count_is_not_extrapolated():
+    with pytest.raises(ValueError):
+        AdditionalSQLFunctions.count(True, column("ehr_id"), 0.25)
+
+    # a ratio of 1 is no sample
+    count = str(AdditionalSQLFunctions.count(True, column("ehr_id"), 1.0).compile(dialect=postgresql.dialect()))
+    assert "round" not in count
+
+
+def test_error_estimate():
+    sample = AqlQuerySample.of_ratio(0.1)
+
+    meta = sample.to_meta([90000, 900, 0])
+
+    # 1.96 * sqrt(0.9 / (900 * 0.1))
+    assert meta["relative_error"] == pytest.approx(0.196)
+    assert meta["ratio"] == 0.1
+    assert AqlQuerySample.of_ratio(1).to_meta([10])["relative_error"] == 0
+    assert sample.to_meta([])["relative_error"] is None
@@ -0,0 +1,51 @@
+import pytest
+from datetime import datetime, timezone
+from decimal import Decimal
+from uuid import UUID
+from your_module import ContinuationToken, UnprocessableEntityException
+
+VO_ID = UUID("e6fad8ba-fb4f-46a2-bf82-66edb43f142f")
+
+
+def test_round_trip():
+    token = ContinuationToken(
+        ContinuationToken.hash_query("SELECT c FROM COMPOSITION c ORDER BY c/name/value"),
+        ("name", 42, Decimal("1.50"), datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc), None),
+        VO_ID
+    )
+
+    decoded = ContinuationToken.decode(token.encode(), token.query_hash)
+
+    assert decoded == token
+    assert decoded.null_mask() == (False, False, False, False, True)
+    assert decoded.bind_values() == {
+        "keyset_0": "name",
+        "keyset_1": 42,
+        "keyset_2": Decimal("1.50"),
+        "keyset_3": datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+        "keyset_vo_id": VO_ID
+    }
+
+
+def test_from_keyset_row():
+    token = ContinuationToken.from_keyset_row("abc", ["x", 1, VO_ID])
+    assert token.order_by_values == ("x", 1)
+    assert token.tiebreaker == VO_ID
+
+
+def test_query_hash_depends_on_parameters():
+    aql = "SELECT c FROM COMPOSITION c WHERE c/name/value = $name"
+    assert ContinuationToken.hash_query(aql, {"name": "a"}) != ContinuationToken.hash_query(aql, {"name": "b"})
+    assert ContinuationToken.hash_query(aql, {"name": "a"}) == ContinuationToken.hash_query(aql, {"name": "a"})
+
+
+def test_reject_other_query():
+    token = ContinuationToken(ContinuationToken.hash_query("SELECT c FROM COMPOSITION c"), (), VO_ID).encode()
+    with pytest.raises(UnprocessableEntityException, match="different query"):
+        ContinuationToken.decode(token, ContinuationToken.hash_query("SELECT e FROM EHR e"))
+
+
+@pytest.mark.parametrize("token", ["", "not a token", "eyJxIjoiYSJ9"])
+def test_reject_invalid(token):
+    with pytest.raises(UnprocessableEntityException, match="Invalid continuation token"):
+        ContinuationToken.decode(token)
@@ -68,6 +68,23 @@ class AqlSqlLayerTest(unittest.TestCase):
         self.assertEqual(queries[3].get_data_field().get_column_name(), "data")
         self.assertEqual(queries[3].get_data_field().get_type(), 'JSONB')
 
+    def test_keyset_seek_condition(self):
+        from sqlalchemy import column
+        a, b, vo_id = column("a"), column("b"), column("vo_id")
+
+        condition = AqlSqlLayer.seek_condition([(a, False), (b, True)], (False, False), vo_id)
+        self.assertEqual(
+            str(condition),
+            "a > :keyset_0 OR a IS NULL OR a = :keyset_0 AND b < :keyset_1 "
+            "OR a = :keyset_0 AND b = :keyset_1 AND vo_id > :keyset_vo_id"
+        )
+
+        null_condition = AqlSqlLayer.seek_condition([(a, False), (b, True)], (True, True), vo_id)
+        self.assertEqual(
+            str(null_condition),
+            "false OR a IS NULL AND b IS NOT NULL OR a IS NULL AND b IS NULL AND vo_id > :keyset_vo_id"
+        )
+
     def build_sql_query(self, query: str) -> AslRootQuery:
         aql_query = AqlQueryParser.parse(query)
         query_wrapper = AqlQueryWrapper.create(aql_query)
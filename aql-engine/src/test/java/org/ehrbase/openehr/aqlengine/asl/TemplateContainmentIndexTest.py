@@ -0,0 +1,69 @@
+from dataclasses import dataclass, field
+from typing import List
+
+from your_module import TemplateContainmentIndex
+
+ENCOUNTER = "openEHR-EHR-COMPOSITION.encounter.v1"
+REPORT = "openEHR-EHR-COMPOSITION.report.v1"
+VITALS = "openEHR-EHR-SECTION.vital_signs.v1"
+BLOOD_PRESSURE = "openEHR-EHR-OBSERVATION.blood_pressure.v2"
+BODY_WEIGHT = "openEHR-EHR-OBSERVATION.body_weight.v2"
+DEVICE = "openEHR-EHR-CLUSTER.device.v1"
+
+
+@dataclass
+class Node:
+    node_id: str
+    children: List['Node'] = field(default_factory=list)
+
+    def get_node_id(self) -> str:
+        return self.node_id
+
+    def get_children(self) -> List['Node']:
+        return self.children
+
+
+@dataclass
+class WebTemplate:
+    tree: Node
+
+    def get_tree(self) -> Node:
+        return self.tree
+
+
+def create_index() -> TemplateContainmentIndex:
+    return TemplateContainmentIndex.from_web_templates({
+        "vitals": WebTemplate(Node(ENCOUNTER, [
+            Node("at0001", [Node(VITALS, [
+                Node(BLOOD_PRESSURE, [Node("at0001", [Node(DEVICE)])]),
+                Node(BODY_WEIGHT)
+            ])])
+        ])),
+        "weight_report": WebTemplate(Node(REPORT, [Node(BODY_WEIGHT)]))
+    })
+
+
+def test_archetype_paths():
+    paths = set(TemplateContainmentIndex.archetype_paths(Node(ENCOUNTER, [
+        Node("at0001", [Node(BLOOD_PRESSURE, [Node(DEVICE)])])
+    ])))
+    assert paths == {
+        (ENCOUNTER,),
+        (ENCOUNTER, BLOOD_PRESSURE),
+        (ENCOUNTER, BLOOD_PRESSURE, DEVICE)
+    }
+
+
+def test_templates_containing():
+    index = create_index()
+
+    assert index.templates_containing([BODY_WEIGHT]) == {"vitals", "weight_report"}
+    assert index.templates_containing([ENCOUNTER, BLOOD_PRESSURE]) == {"vitals"}
+    # descendants do not have to be direct children
+    assert index.templates_containing([ENCOUNTER, DEVICE]) == {"vitals"}
+    assert index.templates_containing([REPORT, BLOOD_PRESSURE]) == set()
+    # the nesting is directed
+    assert index.templates_containing([DEVICE, BLOOD_PRESSURE]) == set()
+    # siblings are not nested
+    assert index.templates_containing([BODY_WEIGHT, DEVICE]) == set()
+    assert index.template_ids() == {"vitals", "weight_report"}
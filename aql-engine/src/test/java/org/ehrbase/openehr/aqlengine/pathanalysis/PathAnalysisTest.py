@@ -1,5 +1,5 @@
 import pytest
-from your_module import PathAnalysis, AqlObjectPath, RmConstants, FoundationType, LongPrimitive, StringPrimitive
+from your_module import PathAnalysis, RmTypeIndex, AqlObjectPath, RmConstants, FoundationType, LongPrimitive, StringPrimitive
 from your_module.path_analysis import AndOperatorPredicate, ComparisonOperatorPredicate
 from your_module.rm_attribute_alias import RmAttributeAlias
 
@@ -134,6 +134,22 @@ def archetype_node_id_condition(archetype_node_id):
         ])
     ]
 
+def test_analyze_aql_path_is_memoized():
+    node = PathAnalysis.analyze_aql_path_types("CARE_ENTRY", None, None, AqlObjectPath.parse("data/events"), None)
+    same = PathAnalysis.analyze_aql_path_types("CARE_ENTRY", None, None, AqlObjectPath.parse("data/events"), None)
+    other = PathAnalysis.analyze_aql_path_types(
+        "CARE_ENTRY", None, None, AqlObjectPath.parse("data/events"), {RmConstants.OBSERVATION}
+    )
+    assert same is node
+    assert other is not node
+
+def test_rm_type_index():
+    mask = RmTypeIndex.mask({RmConstants.OBSERVATION, RmConstants.EVALUATION})
+    assert RmTypeIndex.names(mask) == {RmConstants.OBSERVATION, RmConstants.EVALUATION}
+    assert RmTypeIndex.names(mask & RmTypeIndex.mask({RmConstants.OBSERVATION})) == {RmConstants.OBSERVATION}
+    assert RmTypeIndex.names(RmTypeIndex.mask(set())) == set()
+    assert RmTypeIndex.mask(None) is None
+
 def test_create_attribute_infos():
     # Test creation of attribute infos with specific conditions
     node = PathAnalysis.analyze_aql_path_types(
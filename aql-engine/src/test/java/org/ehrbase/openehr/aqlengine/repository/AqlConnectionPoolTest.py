@@ -0,0 +1,101 @@
+import threading
+
+import pytest
+from sqlalchemy import text
+from prometheus_client import CollectorRegistry
+
+from your_module import (AqlCancellationToken, AqlCancelReason, AqlConnectionPool, AqlPoolProperties,
+                         AqlQueryCancelledException)
+
+
+def create_pool(tmp_path, **kwargs) -> AqlConnectionPool:
+    properties = AqlPoolProperties(url=f"sqlite:///{tmp_path / 'aql.db'}", pool_size=2, max_overflow=1, **kwargs)
+    return AqlConnectionPool.create(properties, CollectorRegistry())
+
+
+def test_engine_is_reused(tmp_path):
+    pool = create_pool(tmp_path)
+
+    with pool.connect() as conn:
+        assert conn.execute(text("SELECT 1")).scalar() == 1
+        first_engine = conn.engine
+    with pool.connect() as conn:
+        assert conn.engine is first_engine
+
+    pool.dispose()
+
+
+def test_saturation(tmp_path):
+    pool = create_pool(tmp_path)
+
+    with pool.connect():
+        with pool.connect():
+            status = pool.status()
+            assert status["checked_out"] == 2
+            assert status["capacity"] == 3
+            assert status["saturation"] == 2 / 3
+            assert pool.saturation._value.get() == 2 / 3
+
+    assert pool.status()["checked_out"] == 0
+    assert pool.in_use._value.get() == 0
+    assert pool.checkout_latency._sum.get() >= 0
+
+    pool.dispose()
+
+
+def test_prepared_statements_require_psycopg(tmp_path, caplog):
+    pool = create_pool(tmp_path, prepare_threshold=5)
+
+    with pool.connect() as conn:
+        assert conn.execute(text("SELECT 1")).scalar() == 1
+    assert "require psycopg" in caplog.text
+
+    pool.dispose()
+
+
+def test_use_snapshot_rejects_invalid_id(tmp_path):
+    pool = create_pool(tmp_path)
+
+    with pytest.raises(ValueError):
+        with pool.use_snapshot("1'; DROP TABLE ehr.ehr; --"):
+            pass
+
+    pool.dispose()
+
+
+def test_cancellation_aborts_running_statement(tmp_path):
+    pool = create_pool(tmp_path)
+    cancellation = AqlCancellationToken()
+    endless = text("WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) SELECT max(i) FROM n")
+    threading.Timer(0.2, cancellation.cancel, [AqlCancelReason.CLIENT_DISCONNECT]).start()
+
+    with pytest.raises(AqlQueryCancelledException) as e:
+        with pool.connect() as conn, pool.cancellable(conn, cancellation):
+            conn.execute(endless)
+
+    assert e.value.reason == AqlCancelReason.CLIENT_DISCONNECT
+    assert pool.cancellations.labels("client_disconnect")._value.get() == 1
+    assert pool.status()["checked_out"] == 0
+    # already cancelled: refused before anything is executed
+    with pytest.raises(AqlQueryCancelledException):
+        with pool.connect() as conn, pool.cancellable(conn, cancellation):
+            pass
+
+    pool.dispose()
+
+
+def test_elapsed_timeout_cancels(tmp_path):
+    pool = create_pool(tmp_path)
+    now = [0.0]
+    cancellation = AqlCancellationToken(timeout=500, clock=lambda: now[0])
+
+    assert cancellation.remaining() == 500
+    now[0] = 0.6
+    assert cancellation.remaining() == 0
+    with pytest.raises(AqlQueryCancelledException) as e:
+        with pool.connect() as conn, pool.cancellable(conn, cancellation):
+            pass
+    assert e.value.reason == AqlCancelReason.TIMEOUT
+
+    pool.dispose()
+
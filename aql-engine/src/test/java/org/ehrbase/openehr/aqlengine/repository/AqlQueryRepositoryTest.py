@@ -0,0 +1,59 @@
+import uuid
+from unittest.mock import MagicMock
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from your_module import AqlQueryRepository, ExtractedColumnResultPostprocessor, AslExtractedColumn, Explain, PreparedQuery
+
+
+def test_post_process_db_records_column_wise():
+    rows = [(1, "a"), (2, "b"), (3, None)]
+    column_processors = [None, lambda values: [v.upper() if v else v for v in values]]
+
+    assert AqlQueryRepository.post_process_db_records(rows, column_processors) == [[1, "A"], [2, "B"], [3, None]]
+    assert AqlQueryRepository.post_process_db_records([], column_processors) == []
+
+
+def test_template_id_resolved_once_per_distinct_value():
+    knowledge_cache = MagicMock()
+    knowledge_cache.find_template_id_by_uuid.side_effect = lambda u: f"template-{u}"
+    template_uuid = uuid.uuid4()
+    processor = ExtractedColumnResultPostprocessor(AslExtractedColumn.TEMPLATE_ID, knowledge_cache, "local.ehrbase.org")
+
+    result = processor.post_process_columns([template_uuid, None, template_uuid, template_uuid])
+
+    assert result == [f"template-{template_uuid}", None, f"template-{template_uuid}", f"template-{template_uuid}"]
+    knowledge_cache.find_template_id_by_uuid.assert_called_once_with(template_uuid)
+
+
+def test_noop_columns_are_skipped():
+    repository = AqlQueryRepository(MagicMock(), MagicMock(), MagicMock(), MagicMock())
+
+    assert repository.get_column_processor(AqlQueryRepository.NOOP_POSTPROCESSOR) is None
+    assert repository.get_column_processor(lambda v: v * 2)([1, 2]) == [2, 4]
+
+
+def test_static_result_and_temp_tables_skip_database():
+    connection_pool = MagicMock()
+    repository = AqlQueryRepository(MagicMock(), MagicMock(), MagicMock(), connection_pool)
+    query = sa.select(sa.bindparam("aql_limit"))
+    prepared = PreparedQuery(query, {0: AqlQueryRepository.NOOP_POSTPROCESSOR}, static_result=[[0]])
+
+    bound = prepared.bind({"aql_limit": 5}, {"aql_ids": ["a", "b"]})
+    rows = repository.execute_query(bound)
+    rows[0][0] = 1
+
+    assert bound.temp_tables == {"aql_ids": ["a", "b"]}
+    assert bound.query.compile().params == {"aql_limit": 5}
+    assert repository.execute_query(bound) == [[0]]
+    connection_pool.connect.assert_not_called()
+
+
+def test_explain_keeps_bind_parameters():
+    query = sa.select(sa.column("vo_id")).select_from(sa.table("comp_version")).where(sa.column("ehr_id") == sa.bindparam("aql_ehr_id"))
+
+    compiled = Explain(query).compile(dialect=postgresql.dialect())
+
+    assert str(compiled).startswith("EXPLAIN (FORMAT JSON) SELECT vo_id")
+    assert "ehr_id = %(aql_ehr_id)s" in str(compiled)
+
@@ -0,0 +1,54 @@
+import threading
+
+import pytest
+from prometheus_client import CollectorRegistry
+from your_module import (AqlAdmissionControl, AqlAdmissionProperties, AqlQueryPriority, OverLimitAction, PlanEstimate,
+                         ServiceUnavailableException, UnprocessableEntityException)
+
+
+def create_admission_control(**kwargs) -> AqlAdmissionControl:
+    return AqlAdmissionControl(AqlAdmissionProperties(**kwargs), CollectorRegistry())
+
+
+def test_estimates_above_limit_are_rejected_or_demoted():
+    rejecting = create_admission_control(max_cost=1000, max_rows=500)
+    queueing = create_admission_control(max_cost=1000, over_limit=OverLimitAction.QUEUE)
+
+    assert rejecting.classify(PlanEstimate(999, 10), AqlQueryPriority.INTERACTIVE) == AqlQueryPriority.INTERACTIVE
+    with pytest.raises(UnprocessableEntityException, match="estimated cost 5000 exceeds 1000"):
+        rejecting.classify(PlanEstimate(5000, 10), AqlQueryPriority.INTERACTIVE)
+    with pytest.raises(UnprocessableEntityException, match="estimated rows"):
+        rejecting.classify(PlanEstimate(10, 501), AqlQueryPriority.BATCH)
+    assert rejecting.rejected.labels("cost")._value.get() == 2
+
+    assert queueing.classify(PlanEstimate(5000, 10), AqlQueryPriority.INTERACTIVE) == AqlQueryPriority.BATCH
+    assert not create_admission_control().requires_estimate()
+
+
+def test_priority_classes_have_separate_limits():
+    admission_control = create_admission_control(interactive_max_concurrent=1, batch_max_concurrent=1, queue_timeout=0.05)
+    batch_running = threading.Event()
+    release_batch = threading.Event()
+
+    def run_batch():
+        with admission_control.admit(AqlQueryPriority.BATCH):
+            batch_running.set()
+            release_batch.wait(10)
+
+    batch = threading.Thread(target=run_batch)
+    batch.start()
+    assert batch_running.wait(10)
+
+    # the busy batch class does not block interactive queries
+    with admission_control.admit(AqlQueryPriority.INTERACTIVE):
+        assert admission_control.running.labels("interactive")._value.get() == 1
+    with pytest.raises(ServiceUnavailableException):
+        with admission_control.admit(AqlQueryPriority.BATCH):
+            pass
+    assert admission_control.rejected.labels("queue_timeout")._value.get() == 1
+
+    release_batch.set()
+    batch.join()
+    with admission_control.admit(AqlQueryPriority.BATCH):
+        assert admission_control.running.labels("batch")._value.get() == 1
+    assert admission_control.running.labels("batch")._value.get() == 0
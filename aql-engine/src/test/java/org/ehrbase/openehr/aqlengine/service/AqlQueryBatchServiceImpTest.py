@@ -0,0 +1,90 @@
+import threading
+from contextlib import contextmanager
+
+import pytest
+from your_module import AqlQueryBatchServiceImp, AqlQueryRequest, IllegalAqlException, UnprocessableEntityException
+
+SNAPSHOT_ID = "00000003-0000001B-1"
+
+
+class FakeAqlQueryContext:
+    def __init__(self):
+        self.meta = {}
+
+    def set_meta_property(self, meta_property, value):
+        self.meta[meta_property] = value
+
+    def create_meta_data(self, location):
+        return dict(self.meta)
+
+
+class FakeAqlQueryService:
+    def __init__(self, pool, context):
+        self.pool = pool
+        self.context = context
+
+    def query(self, aql_query_request):
+        if aql_query_request.query_string == "invalid":
+            raise IllegalAqlException("Could not parse AQL query")
+        self.context.set_meta_property("resultsize", 1)
+        self.context.set_meta_property("snapshot", self.pool.current.snapshot_id)
+        return [aql_query_request.query_string]
+
+
+class FakeConnectionPool:
+    def __init__(self):
+        self.current = threading.local()
+        self.current.snapshot_id = None
+        self.exported = 0
+
+    @contextmanager
+    def snapshot(self):
+        self.exported += 1
+        yield SNAPSHOT_ID
+
+    @contextmanager
+    def use_snapshot(self, snapshot_id):
+        self.current.snapshot_id = snapshot_id
+        try:
+            yield
+        finally:
+            self.current.snapshot_id = None
+
+
+def create_service(pool, max_queries=20):
+    return AqlQueryBatchServiceImp(lambda context: FakeAqlQueryService(pool, context), FakeAqlQueryContext, pool,
+                                   max_concurrent=2, max_queries=max_queries)
+
+
+def test_results_in_request_order_with_own_meta():
+    pool = FakeConnectionPool()
+    service = create_service(pool)
+
+    items = service.execute([AqlQueryRequest(f"query {i}") for i in range(5)] + [AqlQueryRequest("invalid")])
+
+    assert [item.result for item in items[:5]] == [[f"query {i}"] for i in range(5)]
+    assert all(item.meta == {"resultsize": 1, "snapshot": None} for item in items[:5])
+    assert not items[5].succeeded()
+    assert isinstance(items[5].error, IllegalAqlException)
+    assert items[5].meta == {}
+    assert pool.exported == 0
+    service.shutdown()
+
+
+def test_snapshot_is_shared_by_all_queries():
+    pool = FakeConnectionPool()
+    service = create_service(pool)
+
+    items = service.execute([AqlQueryRequest(f"query {i}") for i in range(4)], snapshot=True)
+
+    assert [item.meta["snapshot"] for item in items] == [SNAPSHOT_ID] * 4
+    assert pool.exported == 1
+    service.shutdown()
+
+
+def test_too_many_queries():
+    service = create_service(FakeConnectionPool(), max_queries=2)
+
+    with pytest.raises(UnprocessableEntityException):
+        service.execute([AqlQueryRequest("query")] * 3)
+    service.shutdown()
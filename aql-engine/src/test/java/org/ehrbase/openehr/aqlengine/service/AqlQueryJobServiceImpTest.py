@@ -0,0 +1,97 @@
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from your_module import (AqlQueryJobServiceImp, AqlQueryJobState, AqlQueryRequest, ObjectNotFoundException,
+                         ServiceUnavailableException, StateConflictException, StreamedQueryResult)
+
+
+class FakeAqlQueryService:
+    def __init__(self, row_count: int, gate: threading.Event = None):
+        self.row_count = row_count
+        self.gate = gate
+        self.started = threading.Event()
+        self.closed = threading.Event()
+
+    def stream(self, aql_query_request):
+        def rows():
+            self.started.set()
+            try:
+                for i in range(self.row_count):
+                    if self.gate is not None:
+                        self.gate.wait()
+                    yield [i, f"row {i}"]
+            finally:
+                self.closed.set()
+        return StreamedQueryResult({"i": "c/i", "name": "c/name/value"}, rows())
+
+
+def wait_until_finished(service, job_id):
+    service.find_job(job_id).future.result(timeout=10)
+    return service.get_status(job_id)
+
+
+def request():
+    return AqlQueryRequest("SELECT c/i, c/name/value FROM COMPOSITION c")
+
+
+def test_spooled_result_can_be_read_in_ranges(tmp_path):
+    service = AqlQueryJobServiceImp(FakeAqlQueryService(2500), str(tmp_path))
+
+    status = wait_until_finished(service, service.submit(request()).job_id)
+
+    assert status.state == AqlQueryJobState.SUCCEEDED
+    assert status.row_count == 2500
+    assert status.columns == {"i": "c/i", "name": "c/name/value"}
+    assert [json.loads(r)[0] for r in service.read_rows(status.job_id, 1998, 4)] == [1998, 1999, 2000, 2001]
+    assert len(list(service.read_rows(status.job_id, 2400, 1000))) == 100
+    assert list(service.read_rows(status.job_id, 2500, 10)) == []
+    service.shutdown()
+
+
+def test_cancel_running_job(tmp_path):
+    gate = threading.Event()
+    query_service = FakeAqlQueryService(10, gate)
+    service = AqlQueryJobServiceImp(query_service, str(tmp_path))
+    job_id = service.submit(request()).job_id
+    assert query_service.started.wait(10)
+
+    service.cancel(job_id)
+    gate.set()
+    status = wait_until_finished(service, job_id)
+
+    assert status.state == AqlQueryJobState.CANCELLED
+    assert query_service.closed.is_set()
+    with pytest.raises(StateConflictException):
+        service.read_rows(job_id, 0, 10)
+    service.shutdown()
+
+
+def test_queue_is_bounded(tmp_path):
+    gate = threading.Event()
+    service = AqlQueryJobServiceImp(FakeAqlQueryService(1, gate), str(tmp_path), max_concurrent=1, max_queued=1)
+    service.submit(request())
+    queued = service.submit(request())
+
+    with pytest.raises(ServiceUnavailableException):
+        service.submit(request())
+
+    assert service.cancel(queued.job_id).state == AqlQueryJobState.CANCELLED
+    gate.set()
+    service.shutdown()
+
+
+def test_finished_jobs_expire(tmp_path):
+    now = [datetime(2024, 1, 1, tzinfo=timezone.utc)]
+    service = AqlQueryJobServiceImp(FakeAqlQueryService(1), str(tmp_path), retention=timedelta(hours=1),
+                                    clock=lambda: now[0])
+    job_id = service.submit(request()).job_id
+    wait_until_finished(service, job_id)
+
+    now[0] += timedelta(hours=1)
+
+    with pytest.raises(ObjectNotFoundException):
+        service.get_status(job_id)
+    assert list(tmp_path.iterdir()) == []
+    service.shutdown()
@@ -0,0 +1,101 @@
+import pytest
+from your_module import AqlParameterReplacement, AqlQueryParser, AqlQueryPlanCache
+
+
+@pytest.mark.parametrize("src_aql, expected", [
+    ("SELECT c  FROM\n\tCOMPOSITION c", "SELECT c FROM COMPOSITION c"),
+    ("  SELECT c FROM COMPOSITION c  ", "SELECT c FROM COMPOSITION c"),
+    ("SELECT c FROM COMPOSITION c WHERE c/name/value = 'a  b'", "SELECT c FROM COMPOSITION c WHERE c/name/value = 'a  b'"),
+    ("SELECT c FROM COMPOSITION c WHERE c/name/value = $name", "SELECT c FROM COMPOSITION c WHERE c/name/value = $name"),
+])
+def test_normalize(src_aql, expected):
+    assert AqlQueryPlanCache.normalize(src_aql) == expected
+
+
+def test_plan_key():
+    key = AqlQueryPlanCache.plan_key("SELECT c FROM COMPOSITION c", {"b": 1, "a": "x"}, 10, None)
+    same = AqlQueryPlanCache.plan_key("SELECT  c FROM COMPOSITION c", {"a": "x", "b": 1}, 10, None)
+    other_fetch = AqlQueryPlanCache.plan_key("SELECT c FROM COMPOSITION c", {"a": "x", "b": 1}, 20, None)
+    other_value = AqlQueryPlanCache.plan_key("SELECT c FROM COMPOSITION c", {"a": "y", "b": 1}, 10, None)
+
+    assert key == same
+    assert key != other_fetch
+    assert key != other_value
+
+
+def test_plan_key_with_bound_parameters():
+    aql = "SELECT c FROM EHR e CONTAINS COMPOSITION c WHERE e/ehr_id/value = $ehr_id AND c/name/value = $name"
+    key = AqlQueryPlanCache.plan_key(aql, {"ehr_id": "a", "name": "x"}, None, None, None, {"ehr_id"})
+    other_bound_value = AqlQueryPlanCache.plan_key(aql, {"ehr_id": "b", "name": "x"}, None, None, None, {"ehr_id"})
+    other_inlined_value = AqlQueryPlanCache.plan_key(aql, {"ehr_id": "a", "name": "y"}, None, None, None, {"ehr_id"})
+    other_kind = AqlQueryPlanCache.plan_key(aql, {"ehr_id": 1, "name": "x"}, None, None, None, {"ehr_id"})
+
+    assert key == other_bound_value
+    assert key != other_inlined_value
+    assert key != other_kind
+
+
+def test_plan_key_with_partially_inlined_parameter():
+    # $id is bound in the data path condition, but inlined as template id
+    aql = ("SELECT c FROM EHR e CONTAINS COMPOSITION c "
+           "WHERE c/archetype_details/template_id/value = $id AND c/uid/value = $id AND c/name/value = $name")
+    parameters = {"id": "tpl.v0", "name": "x"}
+    bound = AqlParameterReplacement.replace_parameters(AqlQueryParser.parse(aql), parameters, True)
+
+    assert bound["id"].inlined and not bound["name"].inlined
+    value_independent = AqlQueryPlanCache.value_independent(bound)
+    assert value_independent == {"name"}
+
+    key = AqlQueryPlanCache.plan_key(aql, parameters, None, None, None, value_independent)
+    assert key != AqlQueryPlanCache.plan_key(aql, {"id": "tpl.v1", "name": "x"}, None, None, None, value_independent)
+    assert key == AqlQueryPlanCache.plan_key(aql, {"id": "tpl.v0", "name": "y"}, None, None, None, value_independent)
+
+
+def test_bound_parameters_by_shape():
+    cache = AqlQueryPlanCache()
+    aql = "SELECT c FROM COMPOSITION c WHERE c/name/value = $name"
+    shape = AqlQueryPlanCache.shape_key(aql, {"name": "x"}, None, None)
+
+    assert shape == AqlQueryPlanCache.shape_key(aql, {"name": "y"}, None, None)
+    assert cache.bound_parameters(shape) == set()
+
+    cache.put_shape(shape, {"name"})
+    assert cache.bound_parameters(shape) == {"name"}
+
+    cache.invalidate_all()
+    assert cache.bound_parameters(shape) == set()
+
+
+def test_lru_eviction():
+    cache = AqlQueryPlanCache(2)
+    cache.put("a", "plan_a")
+    cache.put("b", "plan_b")
+    assert cache.get("a") == "plan_a"
+
+    cache.put("c", "plan_c")
+
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == "plan_a"
+    assert cache.get("c") == "plan_c"
+
+
+def test_hit_rate_and_invalidation():
+    cache = AqlQueryPlanCache()
+    assert cache.hit_rate() == 0.0
+
+    assert cache.get("a") is None
+    cache.put("a", "plan_a")
+    assert cache.get("a") == "plan_a"
+    assert cache.hit_rate() == 0.5
+
+    cache.on_template_changed("tpl.v0")
+
+    assert len(cache) == 0
+    assert cache.get("a") is None
+    assert cache.stats(False) == {"hit": False, "hit_rate": pytest.approx(1 / 3, abs=1e-4), "size": 0}
+
+
+def test_invalid_max_size():
+    with pytest.raises(ValueError):
+        AqlQueryPlanCache(0)
@@ -0,0 +1,45 @@
+from prometheus_client import CollectorRegistry
+from your_module import AqlQueryProfile, AqlQueryProfiler, AqlQueryStage
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_nested_stages_are_exclusive():
+    clock = FakeClock()
+    profile = AqlQueryProfile(clock)
+
+    with profile.stage(AqlQueryStage.EXECUTION):
+        clock.now += 3
+        with profile.stage(AqlQueryStage.POST_PROCESSING):
+            clock.now += 1
+        clock.now += 2
+        with profile.stage(AqlQueryStage.POST_PROCESSING):
+            clock.now += 1
+    profile.rows = 5
+
+    assert profile.stages == {AqlQueryStage.EXECUTION: 5, AqlQueryStage.POST_PROCESSING: 2}
+    assert profile.to_meta() == {
+        "total_ms": 7000,
+        "stages_ms": {"execution": 5000, "post_processing": 2000},
+        "rows": 5
+    }
+
+
+def test_profiler_exports_stage_histograms():
+    registry = CollectorRegistry()
+    clock = FakeClock()
+    profile = AqlQueryProfile(clock)
+    with profile.stage(AqlQueryStage.PARSE):
+        clock.now += 0.5
+    profile.rows = 10
+
+    AqlQueryProfiler(registry).record(profile)
+
+    assert registry.get_sample_value('ehrbase_aql_stage_seconds_sum', {'stage': 'parse'}) == 0.5
+    assert registry.get_sample_value('ehrbase_aql_result_rows_count') == 1
@@ -1,5 +1,5 @@
 import pytest
-from your_module import AqlQueryServiceImp, AqlQueryParser, AqlQueryRequest, UnprocessableEntityException
+from your_module import AqlQueryServiceImp, AqlQueryParser, AqlQueryRequest, AqlQueryWrapper, UnprocessableEntityException
 from typing import Optional, Dict
 
 def replace_ehr_paths(aql_query):
@@ -62,6 +62,40 @@ def test_query_offset_limit_rejected(aql_limit, aql_offset, param_limit, param_o
 def test_query_offset_limit_accepted(aql_limit, aql_offset, param_limit, param_offset, fetch_precedence, default_limit, max_limit, max_fetch):
     run_query_test(aql_limit, aql_offset, param_limit, param_offset, fetch_precedence, default_limit, max_limit, max_fetch)
 
+@pytest.mark.parametrize("aql, supported", [
+    ("SELECT e/ehr_id/value FROM EHR e ORDER BY e/time_created/value LIMIT 10", True),
+    ("SELECT c/uid/value FROM COMPOSITION c ORDER BY c/name/value LIMIT 10", True),
+    ("SELECT s/uid/value FROM EHR_STATUS s LIMIT 10", True),
+    # several rows per EHR or composition share its tiebreaker
+    ("SELECT c/uid/value FROM EHR e CONTAINS COMPOSITION c LIMIT 10", False),
+    ("SELECT o/uid/value FROM COMPOSITION c CONTAINS OBSERVATION o LIMIT 10", False),
+    ("SELECT c/uid/value FROM VERSION v CONTAINS COMPOSITION c LIMIT 10", False),
+])
+def test_keyset_requires_one_row_per_object(aql, supported):
+    query_wrapper = AqlQueryWrapper.create(AqlQueryParser.parse(aql))
+    non_primitive_selects = list(query_wrapper.non_primitive_selects())
+    if supported:
+        AqlQueryServiceImp.ensure_keyset_supported(query_wrapper, non_primitive_selects)
+    else:
+        with pytest.raises(UnprocessableEntityException, match="Keyset pagination is only supported"):
+            AqlQueryServiceImp.ensure_keyset_supported(query_wrapper, non_primitive_selects)
+
+def test_query_hash():
+    query_hash = AqlQueryServiceImp.query_hash(AqlQueryRequest("SELECT s FROM EHR_STATUS s", {}, None, None))
+
+    # the hash identifies the query, not its layout or page
+    assert AqlQueryServiceImp.query_hash(AqlQueryRequest("SELECT  s\nFROM EHR_STATUS s", {}, 10, 20)) == query_hash
+    assert AqlQueryServiceImp.query_hash(AqlQueryRequest("SELECT s FROM EHR_STATUS s", {"a": 1}, None, None)) != query_hash
+
+def test_result_key():
+    request = AqlQueryRequest("SELECT s FROM EHR_STATUS s", {}, 10, None)
+
+    assert AqlQueryServiceImp.result_key(request) == AqlQueryServiceImp.result_key(
+        AqlQueryRequest("SELECT s FROM EHR_STATUS s", {}, 10, None))
+    # other pages are other results
+    assert AqlQueryServiceImp.result_key(request) != AqlQueryServiceImp.result_key(
+        AqlQueryRequest("SELECT s FROM EHR_STATUS s", {}, 10, 10))
+
 def run_query_test(aql_limit, aql_offset, param_limit, param_offset, fetch_precedence, default_limit, max_limit, max_fetch):
     query = f"SELECT s FROM EHR_STATUS s {'LIMIT ' + aql_limit if aql_limit else ''} {'OFFSET ' + aql_offset if aql_offset else ''}".strip()
 
@@ -0,0 +1,93 @@
+import uuid
+from your_module import (AqlParameterReplacement, AqlQueryParser, AqlQueryWrapper, AqlResultCache, AqlResultScope,
+                         CachedAqlResult, ParameterBinder)
+
+EHR_A = uuid.UUID("6f9c3b8e-1f3a-4f8e-9c6d-2b7a1e0d4c5f")
+EHR_B = uuid.UUID("0b1e2d3c-4a5b-4c6d-8e7f-9a0b1c2d3e4f")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def result(ehr_ids=(), template_ids=()) -> CachedAqlResult:
+    return CachedAqlResult([[1]], AqlResultScope(frozenset(str(e) for e in ehr_ids), frozenset(template_ids)))
+
+
+def test_ehr_scoped_eviction():
+    cache = AqlResultCache()
+    cache.put("a", result(ehr_ids=[EHR_A]), cache.generation())
+    cache.put("b", result(ehr_ids=[EHR_B]), cache.generation())
+
+    cache.on_ehr_changed(EHR_A, "tpl.v0")
+
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+
+
+def test_template_scoped_eviction():
+    cache = AqlResultCache()
+    cache.put("a", result(template_ids=["tpl.v0"]), cache.generation())
+    cache.put("b", result(template_ids=["tpl.v1"]), cache.generation())
+
+    cache.on_ehr_changed(EHR_A, "tpl.v0")
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+
+    # e.g. an EHR_STATUS commit, which is not bound to a template
+    cache.on_ehr_changed(EHR_A)
+    assert cache.get("b") is None
+
+
+def test_unscoped_entries_expire():
+    clock = FakeClock()
+    cache = AqlResultCache(ttl=10, clock=clock)
+    cache.put("scoped", result(ehr_ids=[EHR_A]), cache.generation())
+    cache.put("unscoped", result(), cache.generation())
+
+    clock.now = 10
+    assert cache.get("unscoped") is None
+    assert cache.get("scoped") is not None
+
+
+def test_put_after_commit_is_rejected():
+    cache = AqlResultCache()
+    generation = cache.generation()
+
+    cache.on_ehr_changed(EHR_B)
+
+    assert not cache.put("a", result(ehr_ids=[EHR_A]), generation)
+    assert len(cache) == 0
+
+
+def test_size_bound_and_stats():
+    cache = AqlResultCache(max_size=1)
+    cache.put("a", result(ehr_ids=[EHR_A]), cache.generation())
+    cache.put("b", result(ehr_ids=[EHR_A]), cache.generation())
+
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+    assert cache.stats(True) == {"hit": True, "hit_rate": 0.5, "size": 1}
+
+
+def scope_of(aql: str, parameters, bind_parameters: bool) -> AqlResultScope:
+    aql_query = AqlQueryParser.parse(aql)
+    AqlParameterReplacement.replace_parameters(aql_query, parameters, bind_parameters)
+    return AqlResultScope.of(AqlQueryWrapper.create(aql_query), parameters)
+
+
+def test_scope_of_bound_parameters():
+    aql = "SELECT c FROM EHR e CONTAINS COMPOSITION c WHERE e/ehr_id/value = $ehr_id"
+    for bind_parameters in (False, True):
+        assert scope_of(aql, {"ehr_id": str(EHR_A)}, bind_parameters).ehr_ids == {str(EHR_A)}
+        assert scope_of(aql, {"ehr_id": str(EHR_B).upper()}, bind_parameters).ehr_ids == {str(EHR_B)}
+
+    # large MATCHES lists are bound as an array, independent of bind_parameters
+    ehr_ids = [str(EHR_A)] + [str(uuid.uuid4()) for _ in range(ParameterBinder.ARRAY_THRESHOLD)]
+    scope = scope_of("SELECT c FROM EHR e CONTAINS COMPOSITION c WHERE e/ehr_id/value MATCHES {$ehr_ids}",
+                     {"ehr_ids": ehr_ids}, False)
+    assert scope.ehr_ids == frozenset(ehr_ids)
@@ -0,0 +1,157 @@
+from typing import Dict
+
+from sqlalchemy import Boolean, Column, Integer, MetaData, Table, Text, TIMESTAMP
+from sqlalchemy.dialects.postgresql import ENUM, JSONB, UUID
+
+# Code-defined model of the ehr schema, kept in sync with the flyway migrations in
+# jooq-pg/src/main/resources/db/migration/ehr. Defining it statically means importing
+# the AQL engine needs no database connection (no MetaData.reflect / autoload_with).
+metadata = MetaData(schema="ehr")
+
+CONTRIBUTION_CHANGE_TYPE = ENUM(
+    "creation", "amendment", "modification", "synthesis", "Unknown", "deleted",
+    name="contribution_change_type", metadata=metadata, create_type=False
+)
+CONTRIBUTION_DATA_TYPE = ENUM(
+    "composition", "folder", "ehr", "system", "other",
+    name="contribution_data_type", metadata=metadata, create_type=False
+)
+
+
+def _version_columns(*extra: Column):
+    return [
+        Column("vo_id", UUID(as_uuid=True), nullable=False),
+        Column("ehr_id", UUID(as_uuid=True), nullable=False),
+        Column("contribution_id", UUID(as_uuid=True), nullable=False),
+        Column("audit_id", UUID(as_uuid=True), nullable=False),
+        Column("sys_version", Integer, nullable=False),
+        Column("sys_period_lower", TIMESTAMP(timezone=True), nullable=False),
+        *extra
+    ]
+
+
+def _history_columns():
+    return [
+        Column("sys_period_upper", TIMESTAMP(timezone=True)),
+        Column("sys_deleted", Boolean, nullable=False)
+    ]
+
+
+def _data_columns(*extra: Column):
+    return [
+        Column("vo_id", UUID(as_uuid=True), nullable=False),
+        Column("num", Integer, nullable=False),
+        *extra,
+        Column("citem_num", Integer),
+        Column("rm_entity", Text, nullable=False),
+        Column("entity_concept", Text),
+        Column("entity_name", Text),
+        Column("entity_attribute", Text),
+        Column("entity_idx", Text, nullable=False),
+        Column("entity_idx_len", Integer, nullable=False),
+        Column("data", JSONB, nullable=False),
+        Column("parent_num", Integer, nullable=False),
+        Column("num_cap", Integer, nullable=False)
+    ]
+
+
+def _comp_version_columns():
+    return _version_columns(
+        Column("template_id", UUID(as_uuid=True), nullable=False),
+        Column("root_concept", Text, nullable=False)
+    )
+
+
+def _ehr_folder_version_columns():
+    return _version_columns(Column("ehr_folders_idx", Integer, nullable=False))
+
+
+def _with_field_constants(table: Table) -> Table:
+    # jOOQ style access to the columns, e.g. Tables.COMP_DATA.VO_ID
+    for column in table.columns:
+        setattr(table, column.name.upper(), column)
+    return table
+
+
+class Tables:
+    EHR_ = _with_field_constants(Table(
+        "ehr", metadata,
+        Column("id", UUID(as_uuid=True), primary_key=True),
+        Column("creation_date", TIMESTAMP(timezone=True))
+    ))
+
+    AUDIT_DETAILS = _with_field_constants(Table(
+        "audit_details", metadata,
+        Column("id", UUID(as_uuid=True), primary_key=True),
+        Column("change_type", CONTRIBUTION_CHANGE_TYPE, nullable=False),
+        Column("description", Text),
+        Column("time_committed", TIMESTAMP(timezone=True), nullable=False),
+        Column("committer", JSONB),
+        Column("user_id", UUID(as_uuid=True), nullable=False),
+        Column("target_type", Text, nullable=False)
+    ))
+
+    USERS = _with_field_constants(Table(
+        "users", metadata,
+        Column("id", UUID(as_uuid=True), primary_key=True),
+        Column("username", Text, nullable=False)
+    ))
+
+    CONTRIBUTION = _with_field_constants(Table(
+        "contribution", metadata,
+        Column("id", UUID(as_uuid=True), primary_key=True),
+        Column("ehr_id", UUID(as_uuid=True)),
+        Column("contribution_type", CONTRIBUTION_DATA_TYPE),
+        Column("signature", Text),
+        Column("has_audit", UUID(as_uuid=True))
+    ))
+
+    TEMPLATE_STORE = _with_field_constants(Table(
+        "template_store", metadata,
+        Column("id", UUID(as_uuid=True), primary_key=True),
+        Column("template_id", Text, nullable=False),
+        Column("content", Text),
+        Column("creation_time", TIMESTAMP(timezone=True), nullable=False)
+    ))
+
+    COMP_VERSION = _with_field_constants(Table("comp_version", metadata, *_comp_version_columns()))
+    COMP_VERSION_HISTORY = _with_field_constants(
+        Table("comp_version_history", metadata, *_comp_version_columns(), *_history_columns()))
+    COMP_DATA = _with_field_constants(Table("comp_data", metadata, *_data_columns()))
+    COMP_DATA_HISTORY = _with_field_constants(
+        Table("comp_data_history", metadata, *_data_columns(Column("sys_version", Integer, nullable=False))))
+
+    EHR_STATUS_VERSION = _with_field_constants(Table("ehr_status_version", metadata, *_version_columns()))
+    EHR_STATUS_VERSION_HISTORY = _with_field_constants(
+        Table("ehr_status_version_history", metadata, *_version_columns(), *_history_columns()))
+    EHR_STATUS_DATA = _with_field_constants(
+        Table("ehr_status_data", metadata, *_data_columns(Column("ehr_id", UUID(as_uuid=True), nullable=False))))
+    EHR_STATUS_DATA_HISTORY = _with_field_constants(Table(
+        "ehr_status_data_history", metadata,
+        *_data_columns(Column("ehr_id", UUID(as_uuid=True), nullable=False), Column("sys_version", Integer, nullable=False))
+    ))
+
+    EHR_FOLDER_VERSION = _with_field_constants(Table("ehr_folder_version", metadata, *_ehr_folder_version_columns()))
+    EHR_FOLDER_VERSION_HISTORY = _with_field_constants(
+        Table("ehr_folder_version_history", metadata, *_ehr_folder_version_columns(), *_history_columns()))
+    EHR_FOLDER_DATA = _with_field_constants(Table(
+        "ehr_folder_data", metadata,
+        *_data_columns(Column("ehr_id", UUID(as_uuid=True), nullable=False),
+                       Column("ehr_folders_idx", Integer, nullable=False))
+    ))
+    EHR_FOLDER_DATA_HISTORY = _with_field_constants(Table(
+        "ehr_folder_data_history", metadata,
+        *_data_columns(Column("ehr_id", UUID(as_uuid=True), nullable=False),
+                       Column("ehr_folders_idx", Integer, nullable=False),
+                       Column("sys_version", Integer, nullable=False))
+    ))
+
+    @staticmethod
+    def by_name(table_name: str) -> Table:
+        table = _TABLES_BY_NAME.get(table_name)
+        if table is None:
+            raise ValueError(f"Unknown table {table_name}")
+        return table
+
+
+_TABLES_BY_NAME: Dict[str, Table] = {t.name: t for t in metadata.tables.values()}
@@ -38,7 +38,19 @@ class AdditionalSQLFunctions:
         return func.min_dv_ordered(field).label('min_dv_ordered')
     
     @staticmethod
-    def count(distinct, field):
+    def count(distinct, field, sample_ratio=None):
+        """
+        With sample_ratio, the count over a sample is extrapolated to the whole population.
+        Distinct counts cannot be: values shared by sampled and unsampled units would be counted
+        once per sample instead of once, so they are rejected.
+        """
+        sampled = sample_ratio is not None and sample_ratio != 1
         if distinct:
-            return func.count_distinct(field).cast(BIGINT)
-        return func.count(field).cast(BIGINT) if field is not None else func.count('*').cast(BIGINT)
+            if sampled:
+                raise ValueError("COUNT(DISTINCT) cannot be extrapolated from a sample")
+            count = func.count_distinct(field)
+        else:
+            count = func.count(field) if field is not None else func.count('*')
+        if sampled:
+            count = func.round(count / sample_ratio)
+        return count.cast(BIGINT)
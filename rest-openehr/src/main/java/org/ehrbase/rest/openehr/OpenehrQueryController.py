@@ -1,16 +1,42 @@
+import asyncio
+import json
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable, Iterator, List, TypeVar
+
+import anyio
 from fastapi import APIRouter, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from uuid import UUID
 
+from aql_cancellation_token import AqlCancellationToken, AqlCancelReason
+from aql_feature_not_implemented_exception import AqlFeatureNotImplementedException
+from aql_query_batch_item import AqlQueryBatchItem
+from aql_query_batch_service import AqlQueryBatchService
+from aql_query_cancelled_exception import AqlQueryCancelledException
+from aql_query_priority import AqlQueryPriority
+from aql_query_request import AqlQueryRequest
+from aql_result_export_format import AqlResultExportFormat
+from bad_gateway_exception import BadGatewayException
+from ehrbase_header import EHRbaseHeader
+from illegal_aql_exception import IllegalAqlException
+from object_not_found_exception import ObjectNotFoundException
+from service_unavailable_exception import ServiceUnavailableException
+from streamed_query_result import StreamedQueryResult
+from unprocessable_entity_exception import UnprocessableEntityException
+
 # Replace with actual implementations of these classes
 class AqlQueryService:
     def query(self, aql_query_request):
         # Implementation here
         pass
 
+    def stream(self, aql_query_request):
+        # Implementation here
+        pass
+
 class StoredQueryService:
     def retrieve_stored_query(self, qualified_query_name: str, version: Optional[str]) -> Dict[str, Any]:
         # Implementation here
@@ -25,19 +51,34 @@ class QueryResponseData(BaseModel):
     query: str
     meta: Dict[str, Any]
 
-class AqlQueryRequest(BaseModel):
-    query_string: str
-    parameters: Dict[str, Any]
-    fetch: Optional[int]
-    offset: Optional[int]
-
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# number of rows serialized into one chunk of a streamed response
+STREAM_CHUNK_ROWS = 500
+
+# HTTP status of the exceptions a query of a batch can fail with, checked in order; others are 500
+BATCH_ERROR_STATUS = (
+    (IllegalAqlException, 400),
+    (ObjectNotFoundException, 404),
+    (UnprocessableEntityException, 422),
+    (AqlFeatureNotImplementedException, 501),
+    (BadGatewayException, 502),
+    (ServiceUnavailableException, 503),
+    (AqlQueryCancelledException, 408),
+)
+
+# seconds between checks whether the client of a running query is still connected
+DISCONNECT_POLL_INTERVAL = 0.5
+
+T = TypeVar("T")
+
 # Initialize services
 aql_query_service = AqlQueryService()
 stored_query_service = StoredQueryService()
 aql_query_context = AqlQueryContext()
+# set by the module configuration, see create_aql_query_batch_service
+aql_query_batch_service: Optional[AqlQueryBatchService] = None
 
 @router.get("/query/aql", response_model=QueryResponseData)
 async def execute_ad_hoc_query(
@@ -45,6 +86,9 @@ async def execute_ad_hoc_query(
         offset: Optional[int] = None,
         fetch: Optional[int] = None,
         query_parameters: Optional[Dict[str, Any]] = None,
+        keyset: bool = False,
+        continuation_token: Optional[str] = None,
+        timeout: Optional[int] = None,
         request: Request = None
 ):
     # Enriches request attributes with AQL for later audit processing
@@ -52,8 +96,15 @@ async def execute_ad_hoc_query(
     register_query_execute_endpoint()
 
     # Create AQL query request
-    aql_query_request = create_request(q, query_parameters, fetch, offset)
-    aql_query_result = aql_query_service.query(aql_query_request)
+    aql_query_request = create_request(q, query_parameters, fetch, offset, keyset, continuation_token, is_cache_requested(request),
+                                       requested_sample(request), requested_priority(request), timeout)
+    export_format = requested_export_format(request)
+    if export_format is not None:
+        return create_export_response(await stream_query(request, aql_query_request), export_format, aql_query_request)
+    if is_stream_requested(request):
+        return create_streaming_query_response(await stream_query(request, aql_query_request), aql_query_request, q,
+                                               create_location_uri("query", "aql"))
+    aql_query_result = await run_cancellable(request, [aql_query_request.cancellation], aql_query_service.query, aql_query_request)
 
     # Create and return response
     return create_query_response(aql_query_result, q, create_location_uri("query", "aql"))
@@ -78,12 +129,47 @@ async def execute_ad_hoc_query_post(
     register_query_execute_endpoint()
 
     # Create AQL query request
-    aql_query_request = create_request(raw_query, query_request)
-    aql_query_result = aql_query_service.query(aql_query_request)
+    aql_query_request = create_request(
+        raw_query, query_request, keyset=bool(query_request.get("keyset")), continuation_token=query_request.get("continuation_token"),
+        cache=is_cache_requested(request), sample=requested_sample(request), priority=requested_priority(request),
+        timeout=query_request.get("timeout")
+    )
+    export_format = requested_export_format(request)
+    if export_format is not None:
+        return create_export_response(await stream_query(request, aql_query_request), export_format, aql_query_request)
+    if is_stream_requested(request):
+        return create_streaming_query_response(await stream_query(request, aql_query_request), aql_query_request, raw_query, None)
+    aql_query_result = await run_cancellable(request, [aql_query_request.cancellation], aql_query_service.query, aql_query_request)
 
     # Create and return response
     return create_query_response(aql_query_result, raw_query, None)
 
+# registered before the stored query routes, which would match /query/aql/batch as well
+@router.post("/query/aql/batch")
+async def execute_query_batch(batch_request: Dict[str, Any], request: Request = None):
+    """
+    Executes a list of ad-hoc ({"q": ...}) or stored ({"name": ..., "version": ...}) queries, each with
+    optional query_parameters, fetch and offset. With "snapshot": true all queries read the same
+    committed data. Failing queries are reported in their result, the batch itself still succeeds.
+    """
+    if aql_query_batch_service is None:
+        raise HTTPException(status_code=404, detail="AQL query batches are disabled")
+    queries = batch_request.get("queries")
+    if not isinstance(queries, list) or not queries:
+        raise HTTPException(status_code=400, detail="No AQL queries provided")
+
+    register_query_execute_endpoint()
+    priority = requested_priority(request)
+    aql_query_requests = [create_batch_request(i, query, priority) for i, query in enumerate(queries)]
+    snapshot = bool(batch_request.get("snapshot"))
+    try:
+        items = await run_cancellable(request, [r.cancellation for r in aql_query_requests],
+                                      aql_query_batch_service.execute, aql_query_requests, snapshot)
+    except UnprocessableEntityException as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    return {"snapshot": snapshot, "results": [create_batch_item_response(item) for item in items]}
+
 @router.get("/query/{qualified_query_name}", response_model=QueryResponseData)
 @router.get("/query/{qualified_query_name}/{version}", response_model=QueryResponseData)
 async def execute_stored_query(
@@ -92,6 +178,9 @@ async def execute_stored_query(
         offset: Optional[int] = None,
         fetch: Optional[int] = None,
         query_parameters: Optional[Dict[str, Any]] = None,
+        keyset: bool = False,
+        continuation_token: Optional[str] = None,
+        timeout: Optional[int] = None,
         request: Request = None
 ):
     logger.trace("getStoredQuery with the following input: %s - %s - %s - %s", qualified_query_name, version, offset, fetch)
@@ -103,8 +192,17 @@ async def execute_stored_query(
     query_string = query_definition.get('query_text')
 
     # Create AQL query request
-    aql_query_request = create_request(query_string, query_parameters, fetch, offset)
-    aql_query_result = aql_query_service.query(aql_query_request)
+    aql_query_request = create_request(query_string, query_parameters, fetch, offset, keyset, continuation_token,
+                                       is_cache_requested(request), requested_sample(request), requested_priority(request), timeout)
+    export_format = requested_export_format(request)
+    if export_format is not None:
+        return create_export_response(await stream_query(request, aql_query_request), export_format, aql_query_request)
+    if is_stream_requested(request):
+        return create_streaming_query_response(
+            await stream_query(request, aql_query_request), aql_query_request, query_string,
+            create_location_uri("query", qualified_query_name, version)
+        )
+    aql_query_result = await run_cancellable(request, [aql_query_request.cancellation], aql_query_service.query, aql_query_request)
 
     # Create and return response
     return create_query_response(aql_query_result, query_string, create_location_uri("query", qualified_query_name, version))
@@ -128,8 +226,17 @@ async def execute_stored_query_post(
         raise HTTPException(status_code=404, detail=f"Could not retrieve AQL {qualified_query_name}/{version}")
 
     # Create AQL query request
-    aql_query_request = create_request(query_string, query_request)
-    aql_query_result = aql_query_service.query(aql_query_request)
+    aql_query_request = create_request(
+        query_string, query_request, keyset=bool((query_request or {}).get("keyset")), continuation_token=(query_request or {}).get("continuation_token"),
+        cache=is_cache_requested(request), sample=requested_sample(request), priority=requested_priority(request),
+        timeout=(query_request or {}).get("timeout")
+    )
+    export_format = requested_export_format(request)
+    if export_format is not None:
+        return create_export_response(await stream_query(request, aql_query_request), export_format, aql_query_request)
+    if is_stream_requested(request):
+        return create_streaming_query_response(await stream_query(request, aql_query_request), aql_query_request, query_string, None)
+    aql_query_result = await run_cancellable(request, [aql_query_request.cancellation], aql_query_service.query, aql_query_request)
 
     # Create and return response
     return create_query_response(aql_query_result, query_string, None)
@@ -138,13 +245,166 @@ def create_rest_context(qualified_name: str, version: Optional[str]):
     # Implementation for creating REST context
     pass
 
-def create_request(query_string: str, parameters: Optional[Dict[str, Any]], fetch: Optional[int], offset: Optional[int]) -> AqlQueryRequest:
-    return AqlQueryRequest(query_string=query_string, parameters=parameters or {}, fetch=fetch, offset=offset)
+def create_request(query_string: str, parameters: Optional[Dict[str, Any]], fetch: Optional[int] = None, offset: Optional[int] = None,
+                   keyset: bool = False, continuation_token: Optional[str] = None, cache: bool = False,
+                   sample: Optional[float] = None,
+                   priority: AqlQueryPriority = AqlQueryPriority.INTERACTIVE,
+                   timeout: Optional[int] = None) -> AqlQueryRequest:
+    return AqlQueryRequest(
+        query_string=query_string, parameters=parameters or {}, fetch=fetch, offset=offset,
+        keyset=keyset or continuation_token is not None, continuation_token=continuation_token, cache=cache, sample=sample,
+        priority=priority, cancellation=AqlCancellationToken(timeout)
+    )
+
+def create_batch_request(index: int, query: Any, priority: AqlQueryPriority = AqlQueryPriority.INTERACTIVE) -> AqlQueryRequest:
+    if not isinstance(query, dict):
+        raise HTTPException(status_code=400, detail=f"Query {index} of the batch is not an object")
+    query_string = query.get("q")
+    if query_string is None and query.get("name") is not None:
+        query_definition = stored_query_service.retrieve_stored_query(query["name"], query.get("version"))
+        query_string = query_definition.get('query_text')
+        if query_string is None:
+            raise HTTPException(status_code=404, detail=f"Could not retrieve AQL {query['name']}/{query.get('version')}")
+    if not isinstance(query_string, str):
+        raise HTTPException(status_code=400, detail=f"No AQL query provided for query {index} of the batch")
+    return create_request(query_string, query.get("query_parameters"), query.get("fetch"), query.get("offset"),
+                          sample=query.get("sample"), priority=priority, timeout=query.get("timeout"))
+
+def create_batch_item_response(item: AqlQueryBatchItem) -> Dict[str, Any]:
+    response = {"meta": jsonable_encoder(item.meta), "q": item.query}
+    if item.succeeded():
+        response.update(jsonable_encoder(item.result))
+    else:
+        status = next((s for error_type, s in BATCH_ERROR_STATUS if isinstance(item.error, error_type)), 500)
+        response["error"] = {"status": status, "message": str(item.error)}
+    return response
+
+async def run_cancellable(request: Optional[Request], cancellations: List[AqlCancellationToken],
+                          execute: Callable[..., T], *args) -> T:
+    """
+    Runs the blocking execution on the thread pool, so the event loop can watch the client meanwhile:
+    a disconnect cancels the tokens, which aborts the running statements.
+    """
+    watcher = asyncio.create_task(cancel_on_disconnect(request, cancellations)) if request is not None else None
+    try:
+        return await run_in_threadpool(execute, *args)
+    except AqlQueryCancelledException as e:
+        raise HTTPException(status_code=408, detail=str(e))
+    finally:
+        if watcher is not None:
+            watcher.cancel()
+
+async def stream_query(request: Optional[Request], aql_query_request: AqlQueryRequest) -> StreamedQueryResult:
+    """Prepares the streamed result; the response must be created with CancellableStreamingResponse."""
+    return await run_cancellable(request, [aql_query_request.cancellation], aql_query_service.stream, aql_query_request)
+
+async def cancel_on_disconnect(request: Request, cancellations: List[AqlCancellationToken]) -> None:
+    while not await request.is_disconnected():
+        await asyncio.sleep(DISCONNECT_POLL_INTERVAL)
+    logger.debug("Client disconnected, cancelling AQL execution")
+    for cancellation in cancellations:
+        cancellation.cancel(AqlCancelReason.CLIENT_DISCONNECT)
 
 def create_query_response(aql_query_result, query_string: str, location: Optional[str]) -> QueryResponseData:
     query_response_data = QueryResponseData(query=query_string, meta=aql_query_context.create_meta_data(location))
     return query_response_data
 
+def is_stream_requested(request: Optional[Request]) -> bool:
+    return request is not None and request.headers.get(EHRbaseHeader.AQL_STREAM, "").lower() == "true"
+
+def is_cache_requested(request: Optional[Request]) -> bool:
+    return request is not None and request.headers.get(EHRbaseHeader.AQL_CACHE, "").lower() == "true"
+
+def requested_sample(request: Optional[Request]) -> Optional[float]:
+    """Sampling ratio of an approximate execution, its range is checked by the AQL engine."""
+    value = request.headers.get(EHRbaseHeader.AQL_SAMPLE) if request is not None else None
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {EHRbaseHeader.AQL_SAMPLE} header: {value}")
+
+def requested_priority(request: Optional[Request]) -> AqlQueryPriority:
+    value = request.headers.get(EHRbaseHeader.AQL_PRIORITY) if request is not None else None
+    if value is None:
+        return AqlQueryPriority.INTERACTIVE
+    try:
+        return AqlQueryPriority(value.lower())
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {EHRbaseHeader.AQL_PRIORITY} header: {value}")
+
+def requested_export_format(request: Optional[Request]) -> Optional[AqlResultExportFormat]:
+    export_format = AqlResultExportFormat.select_from_accept(request.headers.get("accept") if request is not None else None)
+    if export_format is not None and not export_format.is_available():
+        raise HTTPException(status_code=406, detail=f"{export_format.media_type} is not supported by this server")
+    return export_format
+
+class CancellableStreamingResponse(StreamingResponse):
+    """
+    Streams the body of an AQL result. If the response ends before the body is complete, usually because
+    the client disconnected, the execution is cancelled and the result closed: the server-side cursor is
+    ended and its connection and admission slot are released at once, not when the body is collected.
+    """
+
+    def __init__(self, content: Iterator, result: StreamedQueryResult, cancellation: AqlCancellationToken,
+                 media_type: str):
+        self.result = result
+        self.cancellation = cancellation
+        self.completed = False
+        super().__init__(self.watch(content), media_type=media_type)
+
+    def watch(self, content: Iterator) -> Iterator:
+        yield from content
+        self.completed = True
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            if not self.completed:
+                # no chunk is fetched any more at this point, so the result can be closed from another thread
+                with anyio.CancelScope(shield=True):
+                    await run_in_threadpool(self.abort)
+
+    def abort(self) -> None:
+        logger.debug("AQL result stream was not completed, cancelling the execution")
+        self.cancellation.cancel(AqlCancelReason.CLIENT_DISCONNECT)
+        self.result.close()
+
+def create_export_response(result: StreamedQueryResult, export_format: AqlResultExportFormat,
+                           aql_query_request: AqlQueryRequest) -> StreamingResponse:
+    return CancellableStreamingResponse(export_format.write(result), result, aql_query_request.cancellation,
+                                        export_format.media_type)
+
+def create_streaming_query_response(result: StreamedQueryResult, aql_query_request: AqlQueryRequest, query_string: str,
+                                    location: Optional[str]) -> StreamingResponse:
+    # meta is created up front, while the request scoped query context is still available
+    meta = aql_query_context.create_meta_data(location)
+    return CancellableStreamingResponse(stream_result_set(result, query_string, meta), result,
+                                        aql_query_request.cancellation, "application/json")
+
+def stream_result_set(result: StreamedQueryResult, query_string: str, meta: Dict[str, Any]) -> Iterator[str]:
+    head = {
+        "meta": jsonable_encoder(meta),
+        "q": query_string,
+        "columns": [{"name": name, "path": path} for name, path in result.columns.items()]
+    }
+    try:
+        yield json.dumps(head)[:-1] + ', "rows": ['
+        chunk = []
+        separator = ""
+        for row in result.rows:
+            chunk.append(separator + json.dumps(jsonable_encoder(row)))
+            separator = ","
+            if len(chunk) >= STREAM_CHUNK_ROWS:
+                yield "".join(chunk)
+                chunk.clear()
+        chunk.append("]}")
+        yield "".join(chunk)
+    finally:
+        result.close()
+
 def create_location_uri(*segments: str) -> str:
     # Implementation for creating a location URI
     return "/".join(segments)
@@ -0,0 +1,121 @@
+import json
+import logging
+from typing import Any, Dict, Iterator, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from aql_query_job_service import AqlQueryJobService
+from aql_query_job_status import AqlQueryJobStatus
+from aql_query_priority import AqlQueryPriority
+from aql_query_request import AqlQueryRequest
+from object_not_found_exception import ObjectNotFoundException
+from service_unavailable_exception import ServiceUnavailableException
+from state_conflict_exception import StateConflictException
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+DEFAULT_RESULT_FETCH = 10000
+
+# set by the module configuration, see create_aql_query_job_service
+aql_query_job_service: Optional[AqlQueryJobService] = None
+
+
+def get_aql_query_job_service() -> AqlQueryJobService:
+    if aql_query_job_service is None:
+        raise HTTPException(status_code=404, detail="AQL query jobs are disabled")
+    return aql_query_job_service
+
+
+def serialize_row(row: List[object]) -> str:
+    return json.dumps(jsonable_encoder(row))
+
+
+@router.post("/query/aql/jobs", status_code=202)
+async def submit_query_job(
+        query_request: Dict[str, Any],
+        job_service: AqlQueryJobService = Depends(get_aql_query_job_service)
+):
+    raw_query = query_request.get("q")
+    if not isinstance(raw_query, str):
+        raise HTTPException(status_code=400, detail="No AQL query provided")
+
+    aql_query_request = AqlQueryRequest(
+        query_string=raw_query,
+        parameters=query_request.get("query_parameters") or {},
+        fetch=query_request.get("fetch"),
+        offset=query_request.get("offset"),
+        # jobs run in the background, they must not take slots of interactive queries
+        priority=AqlQueryPriority.BATCH
+    )
+    try:
+        status = job_service.submit(aql_query_request)
+    except ServiceUnavailableException as e:
+        headers = {"Retry-After": str(e.retry_after)} if e.retry_after else None
+        raise HTTPException(status_code=503, detail=str(e), headers=headers)
+
+    return JSONResponse(
+        status_code=202,
+        content=create_job_response(status),
+        headers={"Location": create_job_location(status.job_id)}
+    )
+
+
+@router.get("/query/aql/jobs/{job_id}")
+async def get_query_job(job_id: str, job_service: AqlQueryJobService = Depends(get_aql_query_job_service)):
+    try:
+        return create_job_response(job_service.get_status(job_id))
+    except ObjectNotFoundException as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.get("/query/aql/jobs/{job_id}/result")
+async def get_query_job_result(
+        job_id: str,
+        offset: int = 0,
+        fetch: int = DEFAULT_RESULT_FETCH,
+        job_service: AqlQueryJobService = Depends(get_aql_query_job_service)
+):
+    """Returns the rows [offset, offset + fetch) of a succeeded job as NDJSON."""
+    try:
+        status = job_service.get_status(job_id)
+        rows = job_service.read_rows(job_id, offset, fetch)
+    except ObjectNotFoundException as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except StateConflictException as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    last = min(offset + fetch, status.row_count) - 1
+    content_range = f"rows {offset}-{last}/{status.row_count}" if last >= offset else f"rows */{status.row_count}"
+    return StreamingResponse(
+        ndjson_lines(rows),
+        media_type="application/x-ndjson",
+        headers={"Content-Range": content_range}
+    )
+
+
+@router.delete("/query/aql/jobs/{job_id}")
+async def cancel_query_job(job_id: str, job_service: AqlQueryJobService = Depends(get_aql_query_job_service)):
+    try:
+        return create_job_response(job_service.cancel(job_id))
+    except ObjectNotFoundException as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+def ndjson_lines(rows: Iterator[str]) -> Iterator[str]:
+    for row in rows:
+        yield row + "\n"
+
+
+def create_job_response(status: AqlQueryJobStatus) -> Dict[str, Any]:
+    response = jsonable_encoder(status)
+    response["result"] = create_job_location(status.job_id) + "/result"
+    return response
+
+
+def create_job_location(job_id: str) -> str:
+    return f"/query/aql/jobs/{job_id}"
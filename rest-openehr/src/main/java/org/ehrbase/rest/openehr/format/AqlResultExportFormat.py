@@ -0,0 +1,159 @@
+import csv
+import importlib.util
+import io
+import json
+from enum import Enum
+from typing import Any, Callable, Iterator, List, Optional, Union
+
+from streamed_query_result import StreamedQueryResult
+
+# rows per chunk of results that are not already chunked by the AQL engine
+EXPORT_CHUNK_ROWS = 1000
+
+
+def encode_json(value: Any) -> str:
+    return json.dumps(value, default=str, separators=(",", ":"))
+
+
+def encode_text(value: Any) -> Optional[str]:
+    """A cell of a text column: strings as they are, objects as their canonical JSON."""
+    if value is None or type(value) is str:
+        return value
+    if isinstance(value, (dict, list, bool, int, float)):
+        return encode_json(value)
+    # UUIDs, dates and the like
+    return str(value)
+
+
+def write_ndjson(result: StreamedQueryResult) -> Iterator[str]:
+    """One JSON object per row, keyed by the column names."""
+    keys = [("{" if i == 0 else ",") + encode_json(name) + ":" for i, name in enumerate(result.columns)]
+    for columns in result.column_chunks(EXPORT_CHUNK_ROWS):
+        # values are encoded column by column, rows are only joined as text
+        encoded = [[key + encode_json(v) for v in column] for key, column in zip(keys, columns)]
+        yield "".join("".join(cells) + "}\n" for cells in zip(*encoded))
+
+
+def write_csv(result: StreamedQueryResult) -> Iterator[str]:
+    """RFC 4180 with a header of the column names; null is an empty cell."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\r\n")
+    writer.writerow(result.columns)
+    for columns in result.column_chunks(EXPORT_CHUNK_ROWS):
+        writer.writerows(zip(*([encode_text(v) for v in column] for column in columns)))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def write_arrow(result: StreamedQueryResult) -> Iterator[bytes]:
+    """
+    An Apache Arrow IPC stream with one record batch per chunk. The schema is taken from the first
+    chunk: columns holding only booleans, integers, numbers (float64) or strings keep that type, all
+    other columns, including mixed ones, are written as text like in CSV. The schema of a stream cannot
+    change, so later chunks are converted to it: integers to float64 and integral numbers to int64; a
+    value that does not fit fails the export instead of being written wrongly.
+    """
+    import pyarrow as pa
+
+    buffer = io.BytesIO()
+    writer = None
+    schema = None
+    converters: List[Callable[[List[Any]], Any]] = []
+    for columns in result.column_chunks(EXPORT_CHUNK_ROWS):
+        if writer is None:
+            types = [arrow_type(pa, column) for column in columns]
+            converters = [arrow_converter(pa, name, t) for name, t in zip(result.columns, types)]
+            schema = pa.schema([pa.field(name, t) for name, t in zip(result.columns, types)])
+            writer = pa.ipc.new_stream(buffer, schema)
+        writer.write_batch(pa.record_batch([convert(c) for convert, c in zip(converters, columns)], schema=schema))
+        yield drain(buffer)
+    if writer is None:
+        # empty result: a schema of text columns
+        writer = pa.ipc.new_stream(buffer, pa.schema([pa.field(name, pa.string()) for name in result.columns]))
+    writer.close()
+    yield drain(buffer)
+
+
+def drain(buffer: io.BytesIO) -> bytes:
+    data = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return data
+
+
+def arrow_type(pa, column: List[Any]):
+    value_types = {type(v) for v in column if v is not None}
+    if value_types == {bool}:
+        return pa.bool_()
+    if value_types == {int}:
+        return pa.int64()
+    if value_types and value_types <= {int, float}:
+        return pa.float64()
+    return pa.string()
+
+
+def arrow_converter(pa, name: str, arrow_type) -> Callable[[List[Any]], Any]:
+    if arrow_type == pa.string():
+        return lambda column: pa.array([encode_text(v) for v in column], type=arrow_type)
+    accepted = {pa.bool_(): (bool,), pa.int64(): (int, float), pa.float64(): (int, float)}[arrow_type]
+
+    def convert(column: List[Any]):
+        for v in column:
+            # bool is an int, but not a number of a JSON result
+            if v is not None and (type(v) not in accepted or (arrow_type == pa.int64() and not float(v).is_integer())):
+                raise ValueError(f"Column {name} is exported as {arrow_type} but holds {encode_json(v)}")
+        if arrow_type == pa.int64():
+            column = [None if v is None else int(v) for v in column]
+        return pa.array(column, type=arrow_type, from_pandas=False)
+
+    return convert
+
+
+class AqlResultExportFormat(Enum):
+    """
+    Formats the query endpoints can stream a result in instead of the canonical JSON result set,
+    selected by the Accept header. They are written chunk by chunk from the streaming cursor.
+    """
+
+    # newline delimited JSON, one object per row
+    NDJSON = ("application/x-ndjson", ("application/x-ndjson", "application/ndjson"), write_ndjson, None)
+
+    # comma separated values, objects are written as JSON text
+    CSV = ("text/csv", ("text/csv",), write_csv, None)
+
+    # Apache Arrow IPC stream, requires pyarrow
+    ARROW = ("application/vnd.apache.arrow.stream", ("application/vnd.apache.arrow.stream",), write_arrow, "pyarrow")
+
+    def __init__(self, media_type: str, accepted: tuple, writer: Callable[[StreamedQueryResult], Iterator[Union[str, bytes]]],
+                 required_module: Optional[str]):
+        self.media_type = media_type
+        self.accepted = accepted
+        self.writer = writer
+        self.required_module = required_module
+
+    def is_available(self) -> bool:
+        return self.required_module is None or importlib.util.find_spec(self.required_module) is not None
+
+    def write(self, result: StreamedQueryResult) -> Iterator[Union[str, bytes]]:
+        """Writes the result and closes it, also when the client stops reading."""
+        try:
+            yield from self.writer(result)
+        finally:
+            result.close()
+
+    @staticmethod
+    def select_from_accept(accept: Optional[str]) -> Optional['AqlResultExportFormat']:
+        """
+        The export format of the first media type of the Accept header that is one, None for the
+        JSON result set. Quality values are not weighed, the client lists its preference first.
+        """
+        for media_range in (accept or "").split(","):
+            media_type = media_range.split(";", 1)[0].strip().lower()
+            if media_type in ("application/json", "*/*", "application/*"):
+                return None
+            for export_format in AqlResultExportFormat:
+                if media_type in export_format.accepted:
+                    return export_format
+        return None
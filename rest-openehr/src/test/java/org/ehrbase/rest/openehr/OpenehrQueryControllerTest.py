@@ -1,6 +1,10 @@
+import asyncio
+import sys
 import unittest
 from unittest.mock import MagicMock, patch
-from your_module import OpenehrQueryController, AqlQueryRequest, InvalidApiParameterException, MetaData, QueryResponseData
+import json
+from your_module import OpenehrQueryController, AqlQueryRequest, InvalidApiParameterException, MetaData, QueryResponseData, StreamedQueryResult, stream_result_set
+from your_module import AqlCancellationToken, AqlCancelReason, CancellableStreamingResponse, create_request, execute_ad_hoc_query
 
 class TestOpenehrQueryController(unittest.TestCase):
 
@@ -146,6 +150,79 @@ class TestOpenehrQueryController(unittest.TestCase):
             )
         self.assertEqual("invalid 'offset' value 'invalid'", str(context.exception))
 
+    def test_stream_result_set(self):
+        for row_count in [0, 1, 499, 500, 1201]:
+            rows = ([i, f"value {i}"] for i in range(row_count))
+            result = StreamedQueryResult({"id": "c/uid/value", "#1": None}, rows)
+
+            chunks = list(stream_result_set(result, self.SAMPLE_QUERY, {"resultsize": None}))
+            body = json.loads("".join(chunks))
+
+            self.assertEqual(self.SAMPLE_QUERY, body["q"])
+            self.assertEqual([{"name": "id", "path": "c/uid/value"}, {"name": "#1", "path": None}], body["columns"])
+            self.assertEqual([[i, f"value {i}"] for i in range(row_count)], body["rows"])
+            self.assertEqual(2 + row_count // 500, len(chunks))
+            # the generator must have been closed to release the connection
+            self.assertIsNone(rows.gi_frame)
+
+    def test_create_request(self):
+        aql_query_request = create_request(self.SAMPLE_QUERY, None, 10, None, timeout=1000)
+
+        self.assertEqual(self.SAMPLE_QUERY, aql_query_request.query_string)
+        self.assertEqual({}, aql_query_request.parameters)
+        # the token is part of the request the service runs with
+        self.assertIsInstance(aql_query_request.cancellation, AqlCancellationToken)
+        self.assertIsNotNone(aql_query_request.cancellation.deadline)
+
+    def test_execute_ad_hoc_query(self):
+        controller = sys.modules[execute_ad_hoc_query.__module__]
+        with patch.object(controller, "aql_query_service") as service, \
+                patch.object(controller, "aql_query_context") as context, \
+                patch.object(controller, "register_query_execute_endpoint"):
+            context.create_meta_data.return_value = {}
+            response = asyncio.run(execute_ad_hoc_query(self.SAMPLE_QUERY, fetch=10))
+
+        aql_query_request = service.query.call_args.args[0]
+        self.assertEqual(AqlQueryRequest(self.SAMPLE_QUERY, {}, 10, None), aql_query_request)
+        self.assertIsNotNone(aql_query_request.cancellation)
+        self.assertEqual(self.SAMPLE_QUERY, response.query)
+
+    def stream_response(self, disconnect_after=None):
+        rows = ([i, f"value {i}"] for i in range(1201))
+        result = StreamedQueryResult({"id": "c/uid/value"}, rows)
+        cancellation = AqlCancellationToken()
+        response = CancellableStreamingResponse(stream_result_set(result, self.SAMPLE_QUERY, {}), result,
+                                                cancellation, "application/json")
+        sent = []
+
+        async def receive():
+            await asyncio.Event().wait()
+
+        async def send(message):
+            if message["type"] == "http.response.body" and len(sent) == disconnect_after:
+                raise OSError("client disconnected")
+            sent.append(message)
+
+        scope = {"type": "http", "asgi": {"spec_version": "2.3"}, "method": "GET", "headers": []}
+        try:
+            asyncio.run(response(scope, receive, send))
+        except OSError:
+            pass
+        return rows, cancellation, sent
+
+    def test_stream_response_completed(self):
+        rows, cancellation, sent = self.stream_response()
+
+        self.assertIsNone(cancellation.reason)
+        self.assertEqual(1201, len(json.loads(b"".join(m.get("body", b"") for m in sent[1:]))["rows"]))
+
+    def test_stream_response_disconnected(self):
+        rows, cancellation, sent = self.stream_response(disconnect_after=2)
+
+        # the execution is cancelled and the cursor released once the response ends
+        self.assertEqual(AqlCancelReason.CLIENT_DISCONNECT, cancellation.reason)
+        self.assertIsNone(rows.gi_frame)
+
     def assert_aql_query_request(self, aql_query_request):
         self.mock_aql_query_service.query.assert_called_once_with(aql_query_request)
 
@@ -0,0 +1,100 @@
+import csv
+import io
+import json
+import uuid
+
+import pytest
+from your_module import AqlResultExportFormat, StreamedQueryResult
+
+COLUMNS = {"ehr_id": "e/ehr_id/value", "weight": "o/data[at0002]/events[at0003]/data[at0001]/items[at0004]/value/magnitude",
+           "name": "o/name"}
+EHR_ID = uuid.UUID("7d44b88c-4199-4bad-97dc-d78268e01398")
+
+
+def create_result():
+    # two fetched chunks, column-wise as the AQL engine streams them
+    chunks = iter([
+        [[str(EHR_ID), "b"], [72.5, 80], [{"_type": "DV_TEXT", "value": "Weight"}, None]],
+        [[EHR_ID], [None], [{"_type": "DV_TEXT", "value": "Gewicht, \"kg\""}]]
+    ])
+    return StreamedQueryResult.of_chunks(COLUMNS, chunks)
+
+
+def test_ndjson():
+    body = "".join(AqlResultExportFormat.NDJSON.write(create_result()))
+
+    assert [json.loads(line) for line in body.splitlines()] == [
+        {"ehr_id": str(EHR_ID), "weight": 72.5, "name": {"_type": "DV_TEXT", "value": "Weight"}},
+        {"ehr_id": "b", "weight": 80, "name": None},
+        {"ehr_id": str(EHR_ID), "weight": None, "name": {"_type": "DV_TEXT", "value": "Gewicht, \"kg\""}}
+    ]
+
+
+def test_csv():
+    body = "".join(AqlResultExportFormat.CSV.write(create_result()))
+
+    assert list(csv.reader(io.StringIO(body))) == [
+        ["ehr_id", "weight", "name"],
+        [str(EHR_ID), "72.5", '{"_type":"DV_TEXT","value":"Weight"}'],
+        ["b", "80", ""],
+        [str(EHR_ID), "", '{"_type":"DV_TEXT","value":"Gewicht, \\"kg\\""}']
+    ]
+
+
+def test_arrow():
+    pa = pytest.importorskip("pyarrow")
+    result = create_result()
+
+    chunks = list(AqlResultExportFormat.ARROW.write(result))
+    table = pa.ipc.open_stream(b"".join(chunks)).read_all()
+
+    # schema, one chunk per record batch and the end of stream marker
+    assert len(chunks) == 3
+    assert table.schema.names == list(COLUMNS)
+    assert table.column("weight").to_pylist() == [72.5, 80.0, None]
+    assert table.column("ehr_id").to_pylist() == [str(EHR_ID), "b", str(EHR_ID)]
+    assert table.column("name").to_pylist()[1] is None
+
+
+def test_arrow_types():
+    pa = pytest.importorskip("pyarrow")
+    columns = {"count": None, "magnitude": None, "mixed": None, "flag": None}
+    chunks = iter([
+        [[1, 2], [1, 2.5], [1, "a"], [True, None]],
+        [[3.0], [4], [True], [False]]
+    ])
+
+    table = pa.ipc.open_stream(b"".join(AqlResultExportFormat.ARROW.write(
+        StreamedQueryResult.of_chunks(columns, chunks)))).read_all()
+
+    assert [str(t) for t in table.schema.types] == ["int64", "double", "string", "bool"]
+    assert table.column("count").to_pylist() == [1, 2, 3]
+    assert table.column("magnitude").to_pylist() == [1.0, 2.5, 4.0]
+    assert table.column("mixed").to_pylist() == ["1", "a", "true"]
+
+
+def test_arrow_type_conflict():
+    pytest.importorskip("pyarrow")
+    chunks = iter([[[1, 2]], [["3"]]])
+
+    # the schema of the stream is already written, the column cannot become text
+    with pytest.raises(ValueError, match="Column count is exported as int64"):
+        list(AqlResultExportFormat.ARROW.write(StreamedQueryResult.of_chunks({"count": None}, chunks)))
+
+
+def test_rows_of_chunks():
+    rows = list(create_result().rows)
+    assert rows[1] == ["b", 80, None]
+    # results created from rows are chunked on demand
+    result = StreamedQueryResult({"i": None}, ([i] for i in range(5)))
+    assert list(result.column_chunks(2)) == [[[0, 1]], [[2, 3]], [[4]]]
+
+
+def test_select_from_accept():
+    assert AqlResultExportFormat.select_from_accept(None) is None
+    assert AqlResultExportFormat.select_from_accept("application/json") is None
+    assert AqlResultExportFormat.select_from_accept("text/csv;charset=utf-8") is AqlResultExportFormat.CSV
+    assert AqlResultExportFormat.select_from_accept("application/ndjson, application/json") is AqlResultExportFormat.NDJSON
+    # the first listed preference wins
+    assert AqlResultExportFormat.select_from_accept("application/json, text/csv") is None
+    assert AqlResultExportFormat.select_from_accept("text/html, application/vnd.apache.arrow.stream") is AqlResultExportFormat.ARROW
@@ -0,0 +1,92 @@
+import json
+from typing import Any, Dict, List
+
+from db_to_rm_format import DbToRmFormat
+from internal_server_exception import InternalServerException
+from rm_alias_codec import RmAliasCodec
+
+# added on commit for sorting and comparing DV_* values, not part of the RM
+MAGNITUDE_ATTRIBUTE = "_magnitude"
+
+
+class DbToCanonicalJson:
+    """
+    Transcodes objects in DB format directly into canonical openEHR JSON.
+
+    Unlike DbToRmFormat no RM objects are built: the path-keyed structure entries are attached to
+    their parents and the attribute and type aliases are reverted while each entry is copied once.
+    The result consists of plain dicts and lists that the response layer serialises as they are.
+    """
+
+    def __init__(self):
+        raise NotImplementedError("This class is not meant to be instantiated.")
+
+    @staticmethod
+    def transcode(db_json: Any) -> Any:
+        """
+        :param db_json: a jsonb value as decoded by the driver, or its text
+        :raises InternalServerException: When the value is not valid DB format
+        """
+        if isinstance(db_json, (str, bytes)):
+            try:
+                db_json = json.loads(db_json)
+            except json.JSONDecodeError as e:
+                raise InternalServerException(f"Invalid DB format: {e}", e)
+        if isinstance(db_json, dict):
+            if DbToRmFormat.TYPE_ALIAS in db_json:
+                # plain object
+                return DbToCanonicalJson.decode_object(db_json)
+            return DbToCanonicalJson.reassemble(db_json)
+        if isinstance(db_json, list):
+            return DbToCanonicalJson.decode_array(db_json)
+        return db_json
+
+    @staticmethod
+    def reassemble(entries: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Builds the object from its structure entries, keyed by entity_idx. Entries are processed
+        parents first, so every entry is attached to its already decoded parent in one lookup.
+        """
+        return DbToRmFormat.reassemble(entries, DbToCanonicalJson.decode_object, DbToCanonicalJson.attribute)
+
+    @staticmethod
+    def decode_object(db_object: Dict[str, Any]) -> Dict[str, Any]:
+        alias_attributes = RmAliasCodec.ALIAS_ATTRIBUTES
+        decoded = {}
+        type_alias = db_object.get(RmAliasCodec.TYPE_ALIAS)
+        if type_alias is not None:
+            # canonical JSON lists the type first
+            decoded[RmAliasCodec.TYPE_ATTRIBUTE] = DbToCanonicalJson.rm_type(type_alias)
+        for alias, value in db_object.items():
+            attribute = alias_attributes.get(alias)
+            if attribute is None:
+                raise InternalServerException(f"Invalid DB format: missing attribute for alias {alias}")
+            if attribute == RmAliasCodec.TYPE_ATTRIBUTE or attribute == MAGNITUDE_ATTRIBUTE:
+                continue
+            value_type = type(value)
+            if value_type is dict:
+                value = DbToCanonicalJson.decode_object(value)
+            elif value_type is list:
+                value = DbToCanonicalJson.decode_array(value)
+            decoded[attribute] = value
+        return decoded
+
+    @staticmethod
+    def decode_array(db_array: List[Any]) -> List[Any]:
+        return [DbToCanonicalJson.decode_object(v) if type(v) is dict
+                else DbToCanonicalJson.decode_array(v) if type(v) is list
+                else v for v in db_array]
+
+    @staticmethod
+    def attribute(alias: str) -> str:
+        attribute = RmAliasCodec.ALIAS_ATTRIBUTES.get(alias)
+        if attribute is None:
+            raise InternalServerException(f"Invalid DB format: missing attribute for alias {alias}")
+        return attribute
+
+    @staticmethod
+    def rm_type(alias: str) -> str:
+        rm_type = RmAliasCodec.ALIAS_TYPES.get(alias)
+        if rm_type is None:
+            raise InternalServerException(f"Invalid DB format: missing type for alias {alias}")
+        return rm_type
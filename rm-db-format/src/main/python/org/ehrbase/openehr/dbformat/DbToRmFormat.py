@@ -1,11 +1,13 @@
 import json
 from collections import defaultdict
-from typing import Any, Dict, List, Optional, Tuple, Union
+from functools import lru_cache
+from itertools import islice
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
-class RMObject:
-    pass
+from internal_server_exception import InternalServerException
 
-class InternalServerException(Exception):
+
+class RMObject:
     pass
 
 class RmDbJson:
@@ -21,23 +23,6 @@ class RmDbJson:
         # Placeholder for conversion logic. Actual implementation would depend on RMObject structure.
         return rm_type()
 
-class RmAttributeAlias:
-    @staticmethod
-    def get_alias(attribute: str) -> str:
-        # Implement alias resolution logic as needed
-        return attribute
-
-    @staticmethod
-    def get_attribute(alias: str) -> str:
-        # Implement reverse alias resolution logic as needed
-        return alias
-
-class RmTypeAlias:
-    @staticmethod
-    def get_rm_type(value: str) -> str:
-        # Implement RM type resolution logic as needed
-        return value
-
 class DbToRmFormat:
     TYPE_ALIAS = "T"
     TYPE_ATTRIBUTE = "_type"
@@ -73,90 +58,94 @@ class DbToRmFormat:
 
     @staticmethod
     def reconstruct_rm_object(rm_type: type, json_object: Dict[str, Any]) -> RMObject:
-        db_root: Dict[str, Any]
-
         if DbToRmFormat.TYPE_ALIAS in json_object:
             # plain object
             db_root = json_object
         else:
-            by_path = DbToRmFormat.group_by_path(json_object)
-            root_path_length = min(len(k) for k in by_path.keys())
-
-            entries = {}
-            for key, value in by_path.items():
-                remaining = DbToRmFormat.remaining_path(root_path_length, key)
-                entries[remaining] = value
-            db_root = entries.pop(DbJsonPath.EMPTY_PATH)
-
-            for k, v in entries.items():
-                DbToRmFormat.insert_json_entry(db_root, k, v)
+            db_root = DbToRmFormat.reassemble(json_object)
 
         decoded = DbToRmFormat.decode_keys(db_root)
         return RmDbJson.convert_value(decoded, rm_type)
 
     @staticmethod
-    def remaining_path(prefix_len: int, full_path_str: str) -> str:
-        if len(full_path_str) > prefix_len and full_path_str[prefix_len] == '.':
-            pos = prefix_len + 1
-        else:
-            pos = prefix_len
-
-        return full_path_str[pos:]
+    def reassemble(entries: Dict[str, Any], convert: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+                   attribute: Optional[Callable[[str], str]] = None) -> Dict[str, Any]:
+        """
+        Builds the object from its structure entries keyed by entity_idx. The paths are sorted once,
+        parents before their children (a parent path is a prefix), so each entry is attached to its
+        parent, found in the map of the entries placed so far, in one linear pass.
+
+        Without convert and attribute the object stays in DB format and the entries are modified;
+        otherwise each entry is replaced by convert(entry) and attached as attribute(alias).
+        """
+        if not entries:
+            raise InternalServerException("Invalid DB format: no structure entries")
+        paths = sorted(entries, key=len)
+        root = entries[paths[0]]
+        nodes: Dict[str, Dict[str, Any]] = {paths[0]: root if convert is None else convert(root)}
+
+        for path in islice(paths, 1, None):
+            parent_path, component = DbJsonPath.split_last(path)
+            parent = nodes.get(parent_path)
+            if parent is None:
+                raise InternalServerException(f"Invalid DB format: missing ancestor of {path}")
+            entry = entries[path]
+            entry = nodes[path] = entry if convert is None else convert(entry)
+            DbToRmFormat.attach(parent, component, entry, attribute)
+        return nodes[paths[0]]
 
     @staticmethod
-    def insert_json_entry(db_root: Dict[str, Any], path: str, value: Dict[str, Any]) -> None:
-        parent_object = db_root
-        components = path.split('.')
-        leaf = components[-1]
-
-        for component in components:
-            is_leaf = component == leaf
-            child = value
-            field_name = component
-
-            if not is_leaf:
-                if field_name not in parent_object:
-                    raise ValueError(f"missing ancestor {field_name} ({path})")
-                parent_object = parent_object[field_name]
-            else:
-                parent_object[field_name] = child
+    def attach(parent: Dict[str, Any], component: Tuple[str, Optional[int]], entry: Dict[str, Any],
+               attribute: Optional[Callable[[str], str]] = None) -> None:
+        alias, idx = component
+        key = alias if attribute is None else attribute(alias)
+        if idx is None:
+            parent[key] = entry
+            return
+        array = parent.get(key)
+        if array is None:
+            array = parent[key] = []
+        if idx >= len(array):
+            array.extend([None] * (idx + 1 - len(array)))
+        array[idx] = entry
 
     @staticmethod
     def decode_keys(db_json: Dict[str, Any]) -> Dict[str, Any]:
-        if RmAttributeAlias.get_alias(DbToRmFormat.TYPE_ATTRIBUTE) in db_json:
-            DbToRmFormat.revert_node_aliases_in_place(db_json)
-        else:
-            for value in db_json.values():
-                DbToRmFormat.revert_node_aliases_in_place(value)
-
-        return db_json
+        if DbToRmFormat.TYPE_ALIAS in db_json:
+            return DbToRmFormat.decode_aliases(db_json)
+        return {key: DbToRmFormat.decode_aliases(value) for key, value in db_json.items()}
 
     @staticmethod
     def revert_node_aliases_in_place(db_json: Any) -> None:
         if isinstance(db_json, dict):
-            nodes = list(db_json.items())
+            decoded = DbToRmFormat.decode_aliases(db_json)
             db_json.clear()
-
-            for alias, value in nodes:
-                attribute = RmAttributeAlias.get_attribute(alias)
-                if DbToRmFormat.TYPE_ATTRIBUTE == attribute:
-                    rm_type = RmTypeAlias.get_rm_type(value)
-                    db_json[attribute] = rm_type
-                else:
-                    db_json[attribute] = value
-                    DbToRmFormat.revert_node_aliases_in_place(value)
+            db_json.update(decoded)
         elif isinstance(db_json, list):
-            for item in db_json:
-                DbToRmFormat.revert_node_aliases_in_place(item)
+            db_json[:] = DbToRmFormat.decode_aliases(db_json)
 
     @staticmethod
-    def group_by_path(db_json: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
-        return {key: value for key, value in db_json.items()}
+    def decode_aliases(db_json: Any) -> Any:
+        """
+        :raises InternalServerException: When an alias is unknown, like DbToCanonicalJson
+        """
+        # imported here, the alias tables depend on this module
+        from rm_alias_codec import RmAliasCodec
+
+        try:
+            return RmAliasCodec.decode(db_json)
+        except ValueError as e:
+            raise InternalServerException(f"Invalid DB format: {e}", e)
+
 
 class DbJsonPath:
-    EMPTY_PATH = 'EMPTY_PATH'
+    """A parsed entity_idx: "c0.d.e1." has the components (("c", 0), ("d", None), ("e", 1))."""
 
-    def __init__(self, path: str, components: List[Tuple[str, Optional[int]]]):
+    EMPTY_PATH: 'DbJsonPath'
+
+    __slots__ = ("path", "components")
+
+    def __init__(self, path: str, components: Tuple[Tuple[str, Optional[int]], ...]):
         self.path = path
         self.components = components
 
@@ -164,33 +153,33 @@ class DbJsonPath:
         return isinstance(other, DbJsonPath) and self.components == other.components
 
     def __hash__(self) -> int:
-        return hash(tuple(self.components))
+        return hash(self.components)
 
     def __str__(self) -> str:
         return f"DbJsonPath{{path={self.path}}}"
 
     @staticmethod
+    @lru_cache(maxsize=8192)
     def parse(path: str) -> 'DbJsonPath':
+        """Parsed once per distinct path, the rows of all versions of a template repeat them."""
         if not path:
             return DbJsonPath.EMPTY_PATH
+        return DbJsonPath(path, tuple(DbJsonPath.parse_component(part) for part in path.split(".") if part))
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def parse_component(part: str) -> Tuple[str, Optional[int]]:
+        """"e12" -> ("e", 12); a composition has many paths but few distinct components."""
+        alias = part.rstrip("0123456789")
+        return alias, int(part[len(alias):]) if len(alias) < len(part) else None
+
+    @staticmethod
+    def split_last(path: str) -> Tuple[str, Tuple[str, Optional[int]]]:
+        """"c0.d.e1." -> ("c0.d.", ("e", 1)), without parsing the whole path."""
+        cut = path.rfind(".", 0, len(path) - 1) + 1
+        return path[:cut], DbJsonPath.parse_component(path[cut:-1])
+
 
-        components = []
-        sb = []
-        nr = -1
-
-        for ch in path:
-            if ch == '.':
-                components.append(( ''.join(sb), nr if nr >= 0 else None))
-                nr = -1
-                sb.clear()
-            elif ch.isdigit():
-                if nr < 0:
-                    nr = int(ch)
-                else:
-                    nr = 10 * nr + int(ch)
-            else:
-                sb.append(ch)
-
-        return DbJsonPath(path, components)
+DbJsonPath.EMPTY_PATH = DbJsonPath("", ())
 
 # Note: The actual RMObject class would need to be properly implemented according to your requirements.
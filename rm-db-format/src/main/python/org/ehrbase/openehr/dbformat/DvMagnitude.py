@@ -0,0 +1,221 @@
+import datetime
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+Magnitude = Union[int, float]
+
+# added on commit for sorting and comparing DV_* values, not part of the RM
+MAGNITUDE_FIELD = "_magnitude"
+
+MILLIS_PER_SECOND = 1000
+MILLIS_PER_MINUTE = 60 * MILLIS_PER_SECOND
+MILLIS_PER_HOUR = 60 * MILLIS_PER_MINUTE
+MILLIS_PER_DAY = 24 * MILLIS_PER_HOUR
+
+# seconds of the nominal duration units, years and months as the average gregorian year
+SECONDS_PER_DAY = 86400
+SECONDS_PER_YEAR = 31556952
+SECONDS_PER_MONTH = SECONDS_PER_YEAR // 12
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+EPOCH_ORDINAL = EPOCH.toordinal()
+ONE_MILLISECOND = datetime.timedelta(milliseconds=1)
+
+DAYS_PER_MONTH = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+DURATION_NUMBER = r"(\d+(?:[.,]\d+)?)"
+DURATION_PATTERN = re.compile(
+    rf"([+-])?P(?:{DURATION_NUMBER}Y)?(?:{DURATION_NUMBER}M)?(?:{DURATION_NUMBER}W)?(?:{DURATION_NUMBER}D)?"
+    rf"(?:T(?:{DURATION_NUMBER}H)?(?:{DURATION_NUMBER}M)?(?:{DURATION_NUMBER}S)?)?"
+)
+DURATION_SECONDS = (SECONDS_PER_YEAR, SECONDS_PER_MONTH, 7 * SECONDS_PER_DAY, SECONDS_PER_DAY, 3600, 60, 1)
+
+
+def digits(value: str) -> int:
+    if not (value.isascii() and value.isdigit()):
+        raise ValueError(f"Not a number: {value}")
+    return int(value)
+
+
+def epoch_day(year: int, month: int, day: int) -> int:
+    """Days since 1970-01-01 of a proleptic gregorian date."""
+    if month < 1 or month > 12:
+        raise ValueError(f"Invalid month {month}")
+    leap = year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+    if day < 1 or day > (29 if month == 2 and leap else DAYS_PER_MONTH[month - 1]):
+        raise ValueError(f"Invalid day {day}")
+    # days from civil, with the year starting in march
+    y = year - 1 if month <= 2 else year
+    era = y // 400
+    year_of_era = y - era * 400
+    day_of_year = (153 * (month - 3 if month > 2 else month + 9) + 2) // 5 + day - 1
+    return era * 146097 + year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year - 719468
+
+
+def parse_date(value: str) -> Tuple[int, int, int]:
+    """(year, month, day) of YYYY, YYYY-MM, YYYY-MM-DD or YYYYMMDD; missing parts are 1."""
+    length = len(value)
+    if length == 4:
+        return digits(value), 1, 1
+    if length == 7 and value[4] == "-":
+        return digits(value[:4]), digits(value[5:]), 1
+    if length == 10 and value[4] == "-" and value[7] == "-":
+        return digits(value[:4]), digits(value[5:7]), digits(value[8:])
+    if length == 8:
+        return digits(value[:4]), digits(value[4:6]), digits(value[6:])
+    raise ValueError(f"Invalid date {value}")
+
+
+def split_zone(value: str) -> Tuple[str, int]:
+    """The local time and the offset of its zone designator (Z, ±hh, ±hh:mm, ±hhmm) in milliseconds."""
+    if value.endswith("Z"):
+        return value[:-1], 0
+    sign = max(value.rfind("+"), value.rfind("-"))
+    if sign < 0:
+        return value, 0
+    zone = value[sign + 1:].replace(":", "")
+    if len(zone) not in (2, 4):
+        raise ValueError(f"Invalid time zone {value[sign:]}")
+    offset = digits(zone[:2]) * MILLIS_PER_HOUR + (digits(zone[2:]) * MILLIS_PER_MINUTE if len(zone) == 4 else 0)
+    return value[:sign], -offset if value[sign] == "-" else offset
+
+
+def parse_time(value: str) -> int:
+    """
+    Milliseconds of the day of hh, hh:mm, hh:mm:ss(.fff) or their basic format, in UTC if a zone is
+    given; missing parts are 0, fractions of a second beyond milliseconds are truncated.
+    """
+    local, offset = split_zone(value)
+    local, separator, fraction = local.replace(",", ".").partition(".")
+    millis = 0
+    if separator:
+        if not (fraction.isascii() and fraction.isdigit()):
+            raise ValueError(f"Invalid time {value}")
+        millis = int(fraction[:3].ljust(3, "0"))
+    parts = local.split(":") if ":" in local else [local[i:i + 2] for i in range(0, len(local), 2)]
+    if not 1 <= len(parts) <= 3 or any(len(p) != 2 for p in parts) or (separator and len(parts) != 3):
+        raise ValueError(f"Invalid time {value}")
+    hours, minutes, seconds = (list(map(digits, parts)) + [0, 0])[:3]
+    if hours > 24 or minutes > 59 or seconds > 60 or (hours == 24 and (minutes or seconds or millis)):
+        raise ValueError(f"Invalid time {value}")
+    return hours * MILLIS_PER_HOUR + minutes * MILLIS_PER_MINUTE + seconds * MILLIS_PER_SECOND + millis - offset
+
+
+class DvMagnitude:
+    """
+    Computes the _magnitude stored with temporal and proportion data values, straight from their
+    canonical JSON:
+
+    * DV_DATE_TIME, DV_DATE: milliseconds since 1970-01-01T00:00Z; partial values count from the
+      start of the period they denote, values without a zone are taken as UTC
+    * DV_TIME: milliseconds since midnight UTC
+    * DV_DURATION: seconds, years and months as average gregorian years
+    * DV_PROPORTION: numerator / denominator
+
+    Complete ISO 8601 values are parsed by the datetime module, partial ones by the parsers of this
+    module. Values repeat within and across compositions, the parsed strings are cached.
+    """
+
+    def __init__(self):
+        raise NotImplementedError("This class is not meant to be instantiated.")
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def date_time(value: str) -> int:
+        try:
+            # complete values are left to the C parser
+            parsed = datetime.datetime.fromisoformat(value)
+            if parsed.tzinfo is None:
+                parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+            return (parsed - EPOCH) // ONE_MILLISECOND
+        except ValueError:
+            pass
+        date, separator, time = value.partition("T")
+        year, month, day = parse_date(date)
+        return epoch_day(year, month, day) * MILLIS_PER_DAY + (parse_time(time) if separator else 0)
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def date(value: str) -> int:
+        try:
+            return (datetime.date.fromisoformat(value).toordinal() - EPOCH_ORDINAL) * MILLIS_PER_DAY
+        except ValueError:
+            pass
+        year, month, day = parse_date(value)
+        return epoch_day(year, month, day) * MILLIS_PER_DAY
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def time(value: str) -> int:
+        try:
+            parsed = datetime.time.fromisoformat(value)
+        except ValueError:
+            # partial values, 24:00 and leap seconds
+            return parse_time(value)
+        offset = parsed.utcoffset()
+        return ((parsed.hour * 60 + parsed.minute) * 60 + parsed.second) * MILLIS_PER_SECOND \
+            + parsed.microsecond // 1000 - (offset // ONE_MILLISECOND if offset else 0)
+
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def duration(value: str) -> Magnitude:
+        match = DURATION_PATTERN.fullmatch(value)
+        if match is None or match.lastindex is None or match.lastindex < 2 or value.endswith("T"):
+            raise ValueError(f"Invalid duration {value}")
+        seconds = 0
+        for amount, unit in zip(match.groups()[1:], DURATION_SECONDS):
+            if amount is not None:
+                number = amount.replace(",", ".")
+                seconds += (float(number) if "." in number else int(number)) * unit
+        return -seconds if match.group(1) == "-" else seconds
+
+    @staticmethod
+    def proportion(obj: Dict[str, Any]) -> Optional[float]:
+        numerator, denominator = obj.get("numerator"), obj.get("denominator")
+        if numerator is None or not denominator:
+            return None
+        return numerator / denominator
+
+    @staticmethod
+    def of(rm_type: Optional[str], obj: Dict[str, Any]) -> Optional[Magnitude]:
+        """
+        The magnitude of a data value in canonical JSON, None for other types or without a value.
+
+        :raises ValueError: When the value is not valid ISO 8601
+        """
+        compute = MAGNITUDE_FUNCTIONS.get(rm_type)
+        return None if compute is None else compute(obj)
+
+    @staticmethod
+    def fill_in(json_node: Any) -> int:
+        """Adds the magnitude to all data values in the JSON, e.g. a whole composition; returns their number."""
+        count = 0
+        stack: List[Any] = [json_node]
+        while stack:
+            value = stack.pop()
+            if type(value) is list:
+                stack.extend(value)
+            elif type(value) is dict:
+                magnitude = DvMagnitude.of(value.get("_type"), value)
+                if magnitude is not None:
+                    value[MAGNITUDE_FIELD] = magnitude
+                    count += 1
+                stack.extend(v for v in value.values() if type(v) is dict or type(v) is list)
+        return count
+
+
+def of_value(parse: Callable[[str], Magnitude]) -> Callable[[Dict[str, Any]], Optional[Magnitude]]:
+    def compute(obj: Dict[str, Any]) -> Optional[Magnitude]:
+        value = obj.get("value")
+        return None if value is None else parse(value)
+    return compute
+
+
+MAGNITUDE_FUNCTIONS: Dict[str, Callable[[Dict[str, Any]], Optional[Magnitude]]] = {
+    "DV_DATE_TIME": of_value(DvMagnitude.date_time),
+    "DV_DATE": of_value(DvMagnitude.date),
+    "DV_TIME": of_value(DvMagnitude.time),
+    "DV_DURATION": of_value(DvMagnitude.duration),
+    "DV_PROPORTION": DvMagnitude.proportion,
+}
@@ -0,0 +1,98 @@
+import sys
+from types import MappingProxyType
+from typing import Any, List, Mapping, Tuple
+
+from db_to_rm_format import DbToRmFormat
+from rm_attribute_alias import RmAttributeAlias
+from rm_type_alias import RmTypeAlias
+
+
+def frozen_mapping(pairs: List[Tuple[str, str]]) -> Mapping[str, str]:
+    """A read-only dict of the pairs, keys and values interned so translated trees share the strings."""
+    mapping = {sys.intern(key): sys.intern(value) for key, value in pairs}
+    if len(mapping) != len(pairs):
+        raise ValueError("Duplicate alias mapping")
+    return MappingProxyType(mapping)
+
+
+CONTAINER_TYPES = frozenset((dict, list))
+
+
+def copy_container(value: Any, stack: List[Tuple[Any, Any]]) -> Any:
+    """An empty copy of the object or array, filled when its turn on the stack comes."""
+    if type(value) is dict:
+        copy = {}
+    elif any(type(v) in CONTAINER_TYPES for v in value):
+        copy = []
+    else:
+        # arrays of plain values have nothing to translate
+        return value.copy()
+    stack.append((value, copy))
+    return copy
+
+
+def translate(root: Any, keys: Mapping[str, str], type_key: str, types: Mapping[str, str], direction: str) -> Any:
+    """
+    Copies the JSON tree with its keys mapped by keys and the values of type_key (a mapped key) by
+    types, in a single walk with an explicit stack.
+    """
+    if type(root) not in CONTAINER_TYPES:
+        return root
+    stack: List[Tuple[Any, Any]] = []
+    result = copy_container(root, stack)
+    while stack:
+        source, target = stack.pop()
+        if type(source) is list:
+            target.extend(copy_container(v, stack) if type(v) in CONTAINER_TYPES else v for v in source)
+            continue
+        for key, value in source.items():
+            mapped = keys.get(key)
+            if mapped is None:
+                raise ValueError(f"Missing {direction} for attribute {key}")
+            if mapped == type_key:
+                value = types.get(value)
+                if value is None:
+                    raise ValueError(f"Missing {direction} for type {source[key]}")
+                target[mapped] = value
+            else:
+                target[mapped] = copy_container(value, stack) if type(value) in CONTAINER_TYPES else value
+    return result
+
+
+class RmAliasCodec:
+    """
+    Translates JSON trees between canonical JSON and the DB format, where attribute names and the
+    values of _type are replaced by the aliases of RmAttributeAlias and RmTypeAlias. The tables for
+    both directions are generated once from those and cannot be modified.
+    """
+
+    ATTRIBUTE_ALIASES: Mapping[str, str] = frozen_mapping(RmAttributeAlias.VALUES)
+    ALIAS_ATTRIBUTES: Mapping[str, str] = frozen_mapping([(a, b) for b, a in RmAttributeAlias.VALUES])
+    TYPE_ALIASES: Mapping[str, str] = frozen_mapping([(t.type, t.alias) for t in RmTypeAlias.values()])
+    ALIAS_TYPES: Mapping[str, str] = frozen_mapping([(t.alias, t.type) for t in RmTypeAlias.values()])
+
+    TYPE_ALIAS = ATTRIBUTE_ALIASES[DbToRmFormat.TYPE_ATTRIBUTE]
+    TYPE_ATTRIBUTE = ALIAS_ATTRIBUTES[TYPE_ALIAS]
+
+    def __init__(self):
+        raise NotImplementedError("This class is not meant to be instantiated.")
+
+    @staticmethod
+    def encode(json_node: Any) -> Any:
+        """
+        A copy of the canonical JSON tree in DB format.
+
+        :raises ValueError: When an attribute or type has no alias
+        """
+        return translate(json_node, RmAliasCodec.ATTRIBUTE_ALIASES, RmAliasCodec.TYPE_ALIAS,
+                         RmAliasCodec.TYPE_ALIASES, "alias")
+
+    @staticmethod
+    def decode(db_json: Any) -> Any:
+        """
+        A copy of the DB format tree in canonical JSON.
+
+        :raises ValueError: When an alias is unknown
+        """
+        return translate(db_json, RmAliasCodec.ALIAS_ATTRIBUTES, RmAliasCodec.TYPE_ATTRIBUTE,
+                         RmAliasCodec.ALIAS_TYPES, "attribute")
@@ -1,10 +1,12 @@
 from collections import defaultdict
-from typing import List, Dict
+from typing import List, Dict, Tuple
+
+from db_to_rm_format import DbToRmFormat
 
 class RmAttributeAlias:
     """For the database: Shorter aliases for attributes of RmObjects."""
 
-    VALUES: List['RmAttributeAlias'] = [
+    VALUES: List[Tuple[str, str]] = [
         # INSTRUCTION
         # Short attribute names with aliases
         ('activities', 'a'),
@@ -182,8 +184,8 @@ class RmAttributeAlias:
 
     @classmethod
     def initialize(cls):
-        cls.attribute2alias = {alias.attribute: alias.alias for alias in cls.VALUES}
-        cls.alias2attribute = {alias.alias: alias.attribute for alias in cls.VALUES}
+        cls.attribute2alias = {attribute: alias for attribute, alias in cls.VALUES}
+        cls.alias2attribute = {alias: attribute for attribute, alias in cls.VALUES}
 
     @classmethod
     def get_alias(cls, attribute: str) -> str:
@@ -113,8 +113,13 @@ class RmTypeAlias:
     def alias(type_: str, alias: str) -> 'RmTypeAlias':
         return RmTypeAlias(type_, alias, False)
 
-    type2alias: Dict[str, str] = {value.type: value.alias for value in values()}
-    alias2type: Dict[str, str] = {value.alias: value.type for value in values()}
+    type2alias: Dict[str, str] = {}
+    alias2type: Dict[str, str] = {}
+
+    @classmethod
+    def initialize(cls):
+        cls.type2alias = {value.type: value.alias for value in cls.values()}
+        cls.alias2type = {value.alias: value.type for value in cls.values()}
 
     @staticmethod
     def get_alias(type_: str) -> str:
@@ -133,3 +138,7 @@ class RmTypeAlias:
         if type_ is None:
             raise ValueError(f"Missing type for alias {alias}")
         return type_
+
+
+# Initialize the mappings
+RmTypeAlias.initialize()
@@ -1,23 +1,28 @@
-from typing import List, Optional, Stream
-import itertools
+import sys
+from typing import Iterator, List, Optional
 
-
-class RmAttributeAlias:
-    @staticmethod
-    def get_alias(attribute: str) -> str:
-        # This method should return the alias for the given attribute.
-        # Implementation needs to be defined based on your requirements.
-        return attribute
+from rm_attribute_alias import RmAttributeAlias
 
 
 class StructureIndex:
+    """
+    The path of a structure node below the root of its version object, as a persistent list: each
+    index points to the index of its parent and adds one node. Children share their parent instead
+    of copying its nodes, so the indexes of a composition take linear time and memory; the hash and
+    the rendered strings are computed once.
+    """
+
     CAP_SYMBOL = "~"  # Lexicographically larger than all employed symbols [0-9, A-Z, a-z]
     INDEX_DELIMITER = "."  # Lexicographically smaller than all employed symbols [0-9, A-Z, a-z]
 
     class Node:
+        __slots__ = ("attribute", "idx", "_hash")
+
         def __init__(self, attribute: str, idx: Optional[int]):
-            self.attribute = attribute
+            # few distinct attribute names occur in many nodes
+            self.attribute = sys.intern(attribute)
             self.idx = idx
+            self._hash = hash((self.attribute, idx))
 
         @classmethod
         def of(cls, attribute: str, idx: Optional[int]) -> 'StructureIndex.Node':
@@ -30,72 +35,109 @@ class StructureIndex:
             return self.idx
 
         def __eq__(self, other):
+            if self is other:
+                return True
             if not isinstance(other, StructureIndex.Node):
                 return False
-            return (self.idx, self.attribute) == (other.idx, other.attribute)
+            return self.attribute is other.attribute and self.idx == other.idx
 
         def __hash__(self):
-            return hash((self.attribute, self.idx))
+            return self._hash
 
         def __str__(self) -> str:
             return f"Node('{self.attribute}' {self.idx})"
 
-    def __init__(self, *index: Node):
-        self.index = list(index)
+        __repr__ = __str__
+
+    __slots__ = ("parent", "node", "_length", "_hash", "_string", "_attribute_string")
+
+    def __init__(self, parent: Optional['StructureIndex'] = None, node: Optional[Node] = None):
+        self.parent = parent
+        self.node = node
+        self._length = 0 if parent is None else parent._length + 1
+        self._hash = hash(()) if parent is None else hash((parent._hash, node._hash))
+        # index_to_string(with_index), rendered on demand
+        self._string: Optional[str] = None
+        self._attribute_string: Optional[str] = None
 
     def create_child(self, i: Node) -> 'StructureIndex':
-        return StructureIndex(*(self.index + [i]))
+        return StructureIndex(self, i)
 
     def __eq__(self, other):
         if not isinstance(other, StructureIndex):
             return False
-        return self.index == other.index
+        a, b = self, other
+        while a is not b:
+            if a._length != b._length or a._hash != b._hash or a.node != b.node:
+                return False
+            a, b = a.parent, b.parent
+        return True
 
     def __hash__(self):
-        return hash(tuple(self.index))
+        return self._hash
 
     @classmethod
     def of(cls, *index: Node) -> 'StructureIndex':
-        return cls(*index)
+        structure_index = cls()
+        for node in index:
+            structure_index = structure_index.create_child(node)
+        return structure_index
 
     @classmethod
     def of_single(cls, attribute: str, index: int) -> 'StructureIndex':
-        return cls(cls.Node(attribute, index))
-
-    def stream(self) -> Stream[Node]:
+        return cls.of(cls.Node(attribute, index))
+
+    @property
+    def index(self) -> List[Node]:
+        nodes = []
+        current = self
+        while current.parent is not None:
+            nodes.append(current.node)
+            current = current.parent
+        nodes.reverse()
+        return nodes
+
+    def stream(self) -> Iterator[Node]:
         return iter(self.index)
 
     def length(self) -> int:
-        return len(self.index)
+        return self._length
 
     def starts_with(self, prefix: 'StructureIndex') -> bool:
-        p_idx = prefix.index
-        p_len = len(p_idx)
-        if self.length() < p_len:
+        if prefix._length > self._length:
             return False
-        return self.index[:p_len] == p_idx
+        current = self
+        for _ in range(self._length - prefix._length):
+            current = current.parent
+        return current == prefix
 
     def print_index_string(self, cap: bool, with_index: bool) -> str:
-        if self.length() == 0:
-            return self.CAP_SYMBOL if cap else ""
-        else:
-            nodes_string = self.index_to_string(with_index)
-            return f"{self.INDEX_DELIMITER}{self.CAP_SYMBOL}" if cap else f"{self.INDEX_DELIMITER}{nodes_string}"
+        """The entity_idx of the index, e.g. "c0.d.e1.", and with cap its upper bound "c0.d.e1.~"."""
+        string = self.index_to_string(with_index)
+        return string + self.CAP_SYMBOL if cap else string
 
     def print_last_attribute(self) -> Optional[str]:
-        if len(self.index) == 0:
+        if self.node is None:
             return None
-        last_node = self.index[-1]
-        return self.get_node_string(last_node, False)
+        return self.get_node_string(self.node, False)
 
     def get_node_string(self, node: Node, with_index: bool) -> str:
         att = RmAttributeAlias.get_alias(node.attribute)
         return f"{att}{node.idx}" if with_index and node.idx is not None else att
 
     def index_to_string(self, with_index: bool) -> str:
-        return self.INDEX_DELIMITER.join(
-            self.get_node_string(node, with_index) for node in self.index
-        )
+        cache = "_string" if with_index else "_attribute_string"
+        # rendered from the closest ancestor that already is, deep indexes must not recurse
+        pending = []
+        current = self
+        while current.parent is not None and getattr(current, cache) is None:
+            pending.append(current)
+            current = current.parent
+        string = getattr(current, cache) or ""
+        for structure_index in reversed(pending):
+            string = string + self.get_node_string(structure_index.node, with_index) + self.INDEX_DELIMITER
+            setattr(structure_index, cache, string)
+        return string
 
     def __str__(self) -> str:
         return str(self.index)
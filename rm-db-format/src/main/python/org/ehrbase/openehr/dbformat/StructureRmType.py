@@ -153,30 +153,33 @@ class StructureRmType(Enum):
     parent_modifiable: Optional[Set['StructureRmType']]
     parents: Set['StructureRmType']
 
-    BY_TYPE: ClassVar[Dict[Type[RMObject], 'StructureRmType']] = {}
-    BY_TYPE_NAME: ClassVar[Dict[str, 'StructureRmType']] = {}
-    STRUCTURE_LEAFS: ClassVar[Set['StructureRmType']] = set()
+    # set by initialize(), not members
+    _ignore_ = ["BY_TYPE", "BY_TYPE_NAME", "BY_RM_TYPE_NAME", "STRUCTURE_LEAFS"]
 
     def __new__(cls, alias: str, structure_root: Optional[StructureRoot], 
                 rm_type: Type[RMObject], structure_entry: bool, 
-                own_parent: Optional[bool] = None, parents: Optional[List['StructureRmType']] = None):
+                own_parent: Optional[bool] = None, parents: Optional[List[tuple]] = None):
         obj = object.__new__(cls)
         obj._value_ = alias
+        obj.alias = alias
         obj.structure_root = structure_root
         obj.type = rm_type
         obj.structure_entry = structure_entry
         obj.is_structure_root = structure_root is not None
-        obj.parent_modifiable = set(parents) if parents else set()
-        if own_parent:
-            obj.parents = {obj} | set(parents) if parents else {obj}
-        else:
-            obj.parents = set(parents) if parents else set()
+        # the parents are still the raw values of the members here, they are resolved in initialize()
+        obj._own_parent = bool(own_parent)
+        obj._parent_aliases = [p[0] for p in parents or []]
         return obj
 
     @classmethod
     def initialize(cls):
+        for v in cls:
+            v.parent_modifiable = {cls(a) for a in v._parent_aliases}
+            v.parents = v.parent_modifiable | {v} if v._own_parent else set(v.parent_modifiable)
         cls.BY_TYPE = {v.type: v for v in cls}
         cls.BY_TYPE_NAME = {v.type.__name__: v for v in cls}
+        # by the _type of canonical JSON
+        cls.BY_RM_TYPE_NAME = {v.name: v for v in cls}
         cls.FEEDER_AUDIT.parent_modifiable.update({cls.ITEM_LIST, cls.ITEM_SINGLE, cls.ITEM_TABLE, cls.ITEM_TREE, cls.CLUSTER, cls.ELEMENT})
         
         cls.STRUCTURE_LEAFS = set(cls) - {parent for v in cls for parent in v.parents}
@@ -193,6 +196,10 @@ class StructureRmType(Enum):
     def by_type_name(cls, rm_type_name: str) -> Optional['StructureRmType']:
         return cls.BY_TYPE_NAME.get(rm_type_name)
 
+    @classmethod
+    def by_rm_type_name(cls, rm_type_name: str) -> Optional['StructureRmType']:
+        return cls.BY_RM_TYPE_NAME.get(rm_type_name)
+
     def get_parents(self) -> Set['StructureRmType']:
         return self.parents
 
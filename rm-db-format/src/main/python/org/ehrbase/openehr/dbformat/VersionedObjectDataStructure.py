@@ -1,7 +1,11 @@
 import json
-from enum import Enum
-from typing import List, Optional, Tuple, Dict, Any, Iterator
-from collections import defaultdict
+from typing import List, Optional, Tuple, Dict, Any
+
+from db_to_rm_format import DbToRmFormat
+from dv_magnitude import DvMagnitude, MAGNITUDE_FIELD
+from rm_alias_codec import RmAliasCodec
+from structure_index import StructureIndex
+from structure_rm_type import StructureRmType
 
 # Assuming these are defined elsewhere based on your Java code
 class RMObject:
@@ -24,6 +28,9 @@ class StructureNode:
         self.content_item = None
         self.parent_num = None
         self.num = None
+        self.num_cap = None
+        # the aliased JSON stored for this node, without the structure entries below it
+        self.db_json = None
 
     def set_entity_idx(self, idx):
         self.entity_idx = idx
@@ -55,160 +62,170 @@ class StructureNode:
     def get_json_node(self):
         return self.json_node
 
+    def get_db_json(self):
+        return self.db_json
 
-class StructureRmType(Enum):
-    ELEMENT = "element"
-    FEEDER_AUDIT = "feeder_audit"
+    def get_num(self):
+        return self.num
 
-    @staticmethod
-    def by_type(rm_object_type):
-        # Placeholder for actual mapping
-        return None
+    def get_parent_num(self):
+        return self.parent_num
 
-class OpenEHRDateTimeSerializationUtils:
-    @staticmethod
-    def to_magnitude(value):
-        # Placeholder for actual conversion logic
-        return value
+    def get_num_cap(self):
+        return self.num_cap
 
-class DbToRmFormat:
-    TYPE_ATTRIBUTE = "type"
+    def get_entity_idx(self):
+        return self.entity_idx
 
-class StructureIndex:
-    class Node:
-        @staticmethod
-        def of(attribute, index):
-            return (attribute, index)
+    def get_entity_name(self):
+        return self.entity_name
 
-class RmAttributeAlias:
-    @staticmethod
-    def get_alias(key):
-        return key  # Placeholder for actual aliasing logic
+    def get_archetype_node_id(self):
+        return self.archetype_node_id
 
-class RmTypeAlias:
-    @staticmethod
-    def get_alias(value):
-        return value  # Placeholder for actual aliasing logic
+    def get_content_item(self):
+        return self.content_item
 
-MAGNITUDE_FIELD = "_magnitude"
 
-class VersionedObjectDataStructure:
-    @staticmethod
-    def create_data_structure(rm_object: RMObject) -> List[StructureNode]:
-        json_node = RmDbJson.marshal_om(rm_object)
-        VersionedObjectDataStructure.fill_in_magnitudes(json_node)
-
-        root = VersionedObjectDataStructure.create_structure_dto(
-            None, json_node, StructureRmType.by_type(type(rm_object)), None
-        )
-
-        roots = [root]
-        VersionedObjectDataStructure.handle_sub_structure(root, root.get_json_node(), None, roots)
-
-        # set num and parentNum fields
-        num = 0
-        root.parent_num = 0
-        for r in roots:
-            if r.get_structure_rm_type() == StructureRmType.ELEMENT:
-                r.num = num
-                num += 1
-                for c in r.get_children():
-                    if c.get_structure_rm_type() == StructureRmType.ELEMENT:
-                        c.parent_num = r.num
-        return roots
+MAGNITUDE_ALIAS = RmAliasCodec.ATTRIBUTE_ALIASES[MAGNITUDE_FIELD]
 
-    @staticmethod
-    def stream_object_nodes(json_node) -> Iterator:
-        if not isinstance(json_node, dict):
-            return iter([])
 
-        for key, value in json_node.items():
-            yield from VersionedObjectDataStructure.stream_object_nodes(value)
-            if isinstance(value, dict):
-                yield value
+# one unit of work of the shredder: a JSON object, its aliased copy, the structure node it belongs to
+# and, for the object of a structure node, that node, which is numbered when the object is visited
+ShredTask = Tuple[Dict[str, Any], Dict[str, Any], StructureNode, Optional[StructureNode]]
 
-    @staticmethod
-    def fill_in_magnitudes(json_node):
-        for node in VersionedObjectDataStructure.stream_object_nodes(json_node):
-            VersionedObjectDataStructure.add_magnitude_attribute(node.get(DbToRmFormat.TYPE_ATTRIBUTE), node)
 
+class VersionedObjectDataStructure:
     @staticmethod
-    def add_magnitude_attribute(type: str, obj):
-        try:
-            if type == "DV_DATE_TIME":
-                obj[MAGNITUDE_FIELD] = OpenEHRDateTimeSerializationUtils.to_magnitude(RmDbJson.marshal_om(obj))
-            elif type == "DV_DATE":
-                obj[MAGNITUDE_FIELD] = OpenEHRDateTimeSerializationUtils.to_magnitude(RmDbJson.marshal_om(obj))
-            elif type == "DV_TIME":
-                obj[MAGNITUDE_FIELD] = OpenEHRDateTimeSerializationUtils.to_magnitude(RmDbJson.marshal_om(obj))
-            elif type == "DV_DURATION":
-                obj[MAGNITUDE_FIELD] = RmDbJson.marshal_om(obj).get('magnitude')
-            elif type == "DV_PROPORTION":
-                obj[MAGNITUDE_FIELD] = RmDbJson.marshal_om(obj).get('magnitude')
-            # No else case needed
-        except json.JSONDecodeError as e:
-            raise RuntimeError(e)
+    def create_data_structure(rm_object: Any) -> List[StructureNode]:
+        """
+        Splits the object into its structure nodes, in depth-first order. Canonical JSON is accepted
+        as it is, other RM objects are marshalled once.
+        """
+        json_node = rm_object if isinstance(rm_object, dict) else RmDbJson.marshal_om(rm_object)
+        structure_rm_type = (StructureRmType.by_type(type(rm_object))
+                             or StructureRmType.by_rm_type_name(json_node.get(DbToRmFormat.TYPE_ATTRIBUTE)))
+        root = VersionedObjectDataStructure.create_structure_dto(None, json_node, structure_rm_type, None)
+        return VersionedObjectDataStructure.shred(root)
 
     @staticmethod
-    def handle_sub_structure(current_node: StructureNode, current_json: Any, array_parent_name: Optional[str], roots: List[StructureNode]) -> bool:
-        if not isinstance(current_json, (dict, list)):
-            return True
-
-        if isinstance(current_json, dict):
-            VersionedObjectDataStructure.handle_sub_object(current_node, current_json, roots)
-            return True
-        elif isinstance(current_json, list):
-            has_remaining_children = False
-            for i, child in enumerate(current_json):
-                remaining_child = VersionedObjectDataStructure.handle_array_element(current_node, current_json, array_parent_name, roots, i)
-                if i == 0:
-                    has_remaining_children = remaining_child
-                elif has_remaining_children != remaining_child:
-                    raise ValueError("Structure elements must not be mixed with non-structure elements")
-            return has_remaining_children
-        else:
-            raise RuntimeError(f"Unexpected container type: {type(current_json)}")
+    def extract_version(uid: Any) -> int:
+        """The version of an OBJECT_VERSION_ID "<object_id>::<creating_system_id>::<version_tree_id>"."""
+        return int(uid.get_value().rsplit("::", 1)[1])
 
     @staticmethod
-    def handle_array_element(root: StructureNode, parent_array: List, parent_name: Optional[str], roots: List[StructureNode], child_index: int) -> bool:
-        child = parent_array[child_index]
-        structure_rm_type = VersionedObjectDataStructure.get_type(child)
-        child_root = structure_rm_type and StructureRmType.by_type(structure_rm_type)
-
-        if child_root:
-            new_root = VersionedObjectDataStructure.create_structure_dto(root, child, child_root, StructureIndex.Node.of(parent_name, child_index))
-            roots.append(new_root)
-        VersionedObjectDataStructure.handle_sub_structure(child_root or root, child, None, roots)
-
-        return not (child_root and child_root.is_structure_entry())
+    def shred(root: StructureNode) -> List[StructureNode]:
+        """
+        A single walk over the JSON of the root with an explicit stack, so deep compositions do not
+        hit the recursion limit. While an object is visited its magnitude is added, its aliased copy
+        is built, structure nodes are created for structure children and numbered in depth-first
+        order (num, parent_num); structure entries are left out of the copy of their parent, they are
+        stored in their own node. The copies become the db_json of the nodes, num_cap is set last.
+        """
+        attribute_aliases = RmAliasCodec.ATTRIBUTE_ALIASES
+        type_aliases = RmAliasCodec.TYPE_ALIASES
+        roots: List[StructureNode] = []
+        root.db_json = {}
+        stack: List[ShredTask] = [(root.json_node, root.db_json, root, root)]
+
+        while stack:
+            source, target, owner, node = stack.pop()
+            if node is not None:
+                node.num = len(roots)
+                node.parent_num = node.parent.num if node.parent is not None else 0
+                roots.append(node)
+
+            tasks: List[ShredTask] = []
+            for attribute, value in source.items():
+                alias = attribute_aliases.get(attribute)
+                if alias is None:
+                    raise ValueError(f"Missing alias for attribute {attribute}")
+                value_type = type(value)
+                if value_type is dict:
+                    child = VersionedObjectDataStructure.shred_child(owner, value, attribute, None, tasks)
+                    if child is not None:
+                        target[alias] = child
+                elif value_type is list:
+                    array = VersionedObjectDataStructure.shred_array(owner, value, attribute, tasks)
+                    if array is not None:
+                        target[alias] = array
+                elif attribute == DbToRmFormat.TYPE_ATTRIBUTE:
+                    type_alias = type_aliases.get(value)
+                    if type_alias is None:
+                        raise ValueError(f"Missing alias for type {value}")
+                    target[alias] = type_alias
+                else:
+                    target[alias] = value
+
+            magnitude = DvMagnitude.of(source.get(DbToRmFormat.TYPE_ATTRIBUTE), source)
+            if magnitude is not None:
+                target[MAGNITUDE_ALIAS] = magnitude
+            # reversed, so siblings are visited in document order
+            stack.extend(reversed(tasks))
+
+        # children follow their parent in depth-first order
+        for node in reversed(roots):
+            node.num_cap = max([node.num] + [c.num_cap for c in node.get_children()])
+        return roots
 
     @staticmethod
-    def handle_sub_object(root: StructureNode, json_node: dict, roots: List[StructureNode]):
-        for attribute, child in json_node.items():
-            child_root = VersionedObjectDataStructure.get_type(child)
-            if child_root and child_root.is_structure_entry() and not (root.get_structure_rm_type() == StructureRmType.ELEMENT and child_root == StructureRmType.FEEDER_AUDIT):
-                del json_node[attribute]
-                continue
+    def shred_child(owner: StructureNode, value: Dict[str, Any], attribute: str, idx: Optional[int],
+                    tasks: List[ShredTask]) -> Optional[Dict[str, Any]]:
+        """Schedules a child object; returns its copy for the parent, None for a structure entry."""
+        copy: Dict[str, Any] = {}
+        structure_rm_type = VersionedObjectDataStructure.structure_type(owner, value)
+        if structure_rm_type is None:
+            tasks.append((value, copy, owner, None))
+            return copy
+
+        node = VersionedObjectDataStructure.create_structure_dto(
+            owner, value, structure_rm_type, StructureIndex.Node.of(attribute, idx))
+        owner.add_child(node)
+        node.db_json = copy
+        tasks.append((value, copy, node, node))
+        return None if structure_rm_type.is_structure_entry() else copy
 
-            new_root = VersionedObjectDataStructure.create_structure_dto(root, child, child_root, StructureIndex.Node.of(attribute, None))
-            roots.append(new_root)
+    @staticmethod
+    def shred_array(owner: StructureNode, values: List[Any], attribute: str,
+                    tasks: List[ShredTask]) -> Optional[List[Any]]:
+        """Copies an array; None if it only holds structure entries, they are not kept in the parent."""
+        array = []
+        entries = 0
+        for i, value in enumerate(values):
+            if type(value) is dict:
+                child = VersionedObjectDataStructure.shred_child(owner, value, attribute, i, tasks)
+                if child is None:
+                    entries += 1
+                else:
+                    array.append(child)
+            else:
+                array.append(value)
+        if entries == 0:
+            return array
+        if array:
+            raise ValueError("Structure elements must not be mixed with non-structure elements")
+        return None
 
-            keep_child = VersionedObjectDataStructure.handle_sub_structure(child_root or root, child, attribute, roots)
-            if not keep_child:
-                del json_node[attribute]
+    @staticmethod
+    def structure_type(owner: StructureNode, value: Dict[str, Any]) -> Optional[StructureRmType]:
+        structure_rm_type = StructureRmType.by_rm_type_name(value.get(DbToRmFormat.TYPE_ATTRIBUTE))
+        if structure_rm_type == StructureRmType.FEEDER_AUDIT and owner.get_structure_rm_type() == StructureRmType.ELEMENT:
+            # the feeder audit of an element stays part of the element
+            return None
+        return structure_rm_type
 
     @staticmethod
-    def create_structure_dto(parent: Optional[StructureNode], json_node: Any, structure_rm_type: Optional[StructureRmType], idx: Optional[Tuple[str, int]]) -> StructureNode:
+    def create_structure_dto(parent: Optional[StructureNode], json_node: Any, structure_rm_type: Optional[StructureRmType], idx: Optional[StructureIndex.Node]) -> StructureNode:
         new_root = StructureNode(parent)
         if parent is None:
-            new_root.set_entity_idx(None)
+            new_root.set_entity_idx(StructureIndex.of())
         else:
             new_root.set_entity_idx(parent.entity_idx.create_child(idx))
 
         new_root.set_structure_rm_type(structure_rm_type)
         
         if isinstance(json_node, dict):
-            name = json_node.get("name", {}).get("value")
+            name = (json_node.get("name") or {}).get("value")
             if name:
                 new_root.set_entity_name(name)
             archetype_node_id = json_node.get("archetype_node_id")
@@ -220,7 +237,7 @@ class VersionedObjectDataStructure:
         if parent is None:
             content_item = None
         else:
-            content_item = parent if parent.get_archetype_node_id() else parent.get_content_item()
+            content_item = parent if parent.archetype_node_id else parent.get_content_item()
         new_root.set_content_item(content_item)
 
         return new_root
@@ -233,18 +250,4 @@ class VersionedObjectDataStructure:
 
     @staticmethod
     def apply_rm_aliases(json_node: dict) -> dict:
-        new_node = {}
-
-        for key, value in json_node.items():
-            alias = RmAttributeAlias.get_alias(key)
-            if isinstance(value, dict):
-                value = VersionedObjectDataStructure.apply_rm_aliases(value)
-            elif isinstance(value, list):
-                new_array = [VersionedObjectDataStructure.apply_rm_aliases(c) if isinstance(c, dict) else c for c in value]
-                value = new_array
-            elif isinstance(value, str) and key == DbToRmFormat.TYPE_ATTRIBUTE:
-                value = RmTypeAlias.get_alias(value)
-
-            new_node[alias] = value
-
-        return new_node
+        return RmAliasCodec.encode(json_node)
@@ -0,0 +1,53 @@
+import copy
+from typing import Any, Dict
+
+
+class CompositionFixture:
+    """Canonical JSON shared by the DB format tests."""
+
+    @staticmethod
+    def text(value: str) -> Dict[str, Any]:
+        return {"_type": "DV_TEXT", "value": value}
+
+    @staticmethod
+    def element(node_id: str, name: str, magnitude: float) -> Dict[str, Any]:
+        return {"_type": "ELEMENT", "archetype_node_id": node_id, "name": CompositionFixture.text(name),
+                "value": {"_type": "DV_QUANTITY", "magnitude": magnitude, "units": "kg"}}
+
+    @staticmethod
+    def composition() -> Dict[str, Any]:
+        """A body weight encounter; a new copy per call, so tests may modify it."""
+        return copy.deepcopy(COMPOSITION)
+
+
+text = CompositionFixture.text
+element = CompositionFixture.element
+
+COMPOSITION = {
+    "_type": "COMPOSITION",
+    "archetype_node_id": "openEHR-EHR-COMPOSITION.encounter.v1",
+    "name": text("Encounter"),
+    "language": {"_type": "CODE_PHRASE", "code_string": "en",
+                 "terminology_id": {"_type": "TERMINOLOGY_ID", "value": "ISO_639-1"}},
+    "context": {"_type": "EVENT_CONTEXT", "setting": {"_type": "DV_CODED_TEXT", "value": "other care"}},
+    "content": [{
+        "_type": "OBSERVATION",
+        "archetype_node_id": "openEHR-EHR-OBSERVATION.body_weight.v2",
+        "name": text("Body weight"),
+        "data": {
+            "_type": "HISTORY", "archetype_node_id": "at0002", "name": text("History"),
+            "events": [{
+                "_type": "POINT_EVENT", "archetype_node_id": "at0003", "name": text("Any event"),
+                "time": {"_type": "DV_DATE_TIME", "value": "2024-01-01T10:00:00Z"},
+                "data": {
+                    "_type": "ITEM_TREE", "archetype_node_id": "at0001", "name": text("Tree"),
+                    "items": [
+                        element("at0004", "Weight", 72.5),
+                        {"_type": "CLUSTER", "archetype_node_id": "at0010", "name": text("Device"),
+                         "items": [element("at0011", "Tare", 0.5)]}
+                    ]
+                }
+            }]
+        }
+    }]
+}
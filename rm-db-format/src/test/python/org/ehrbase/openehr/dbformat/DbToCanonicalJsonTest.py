@@ -0,0 +1,84 @@
+import json
+
+import pytest
+from composition_fixture import text
+from your_module import DbToCanonicalJson, InternalServerException
+
+# a composition with two observations as stored, keyed by entity_idx
+DB_COMPOSITION = {
+    "": {
+        "T": "COMPOSITION",
+        "A": "openEHR-EHR-COMPOSITION.encounter.v1",
+        "N": {"T": "x", "V": "Encounter"},
+        "la": {"T": "C", "cd": "en", "te": {"T": "T", "V": "ISO_639-1"}}
+    },
+    "c0.": {"T": "OBSERVATION", "A": "openEHR-EHR-OBSERVATION.body_weight.v2", "N": {"T": "x", "V": "Body weight"}},
+    "c0.d.": {"T": "HISTORY", "A": "at0002", "N": {"T": "x", "V": "History"}, "og": {"T": "dt", "V": "2024-01-01"}},
+    "c0.d.e0.": {
+        "T": "POINT_EVENT", "A": "at0003", "N": {"T": "x", "V": "Any event"},
+        "ti": {"T": "dt", "V": "2024-01-01T10:00:00Z", "M": 1704103200000}
+    },
+    "c0.d.e0.d.": {"T": "ITEM_TREE", "A": "at0001", "N": {"T": "x", "V": "Tree"}},
+    "c0.d.e0.d.i0.": {
+        "T": "ELEMENT", "A": "at0004", "N": {"T": "x", "V": "Weight"},
+        "V": {"T": "q", "m": 72.5, "un": "kg", "M": 72.5}
+    },
+    "c1.": {"T": "OBSERVATION", "A": "openEHR-EHR-OBSERVATION.height.v2", "N": {"T": "x", "V": "Height"}}
+}
+
+
+def test_composition():
+    composition = DbToCanonicalJson.transcode(DB_COMPOSITION)
+
+    assert composition == {
+        "_type": "COMPOSITION",
+        "archetype_node_id": "openEHR-EHR-COMPOSITION.encounter.v1",
+        "name": text("Encounter"),
+        "language": {"_type": "CODE_PHRASE", "code_string": "en",
+                     "terminology_id": {"_type": "TERMINOLOGY_ID", "value": "ISO_639-1"}},
+        "content": [
+            {
+                "_type": "OBSERVATION",
+                "archetype_node_id": "openEHR-EHR-OBSERVATION.body_weight.v2",
+                "name": text("Body weight"),
+                "data": {
+                    "_type": "HISTORY", "archetype_node_id": "at0002", "name": text("History"),
+                    "origin": {"_type": "DV_DATE_TIME", "value": "2024-01-01"},
+                    "events": [{
+                        "_type": "POINT_EVENT", "archetype_node_id": "at0003", "name": text("Any event"),
+                        "time": {"_type": "DV_DATE_TIME", "value": "2024-01-01T10:00:00Z"},
+                        "data": {
+                            "_type": "ITEM_TREE", "archetype_node_id": "at0001", "name": text("Tree"),
+                            "items": [{
+                                "_type": "ELEMENT", "archetype_node_id": "at0004", "name": text("Weight"),
+                                "value": {"_type": "DV_QUANTITY", "magnitude": 72.5, "units": "kg"}
+                            }]
+                        }
+                    }]
+                }
+            },
+            {"_type": "OBSERVATION", "archetype_node_id": "openEHR-EHR-OBSERVATION.height.v2", "name": text("Height")}
+        ]
+    }
+    # canonical JSON starts with the type
+    assert next(iter(composition)) == "_type"
+    # the same from the text of the column
+    assert DbToCanonicalJson.transcode(json.dumps(DB_COMPOSITION)) == composition
+
+
+def test_sub_structure_and_plain_objects():
+    # selecting an entry yields its entries, keyed by the full entity_idx
+    event = DbToCanonicalJson.transcode({k: v for k, v in DB_COMPOSITION.items() if k.startswith("c0.d.e0.")})
+    assert event["time"] == {"_type": "DV_DATE_TIME", "value": "2024-01-01T10:00:00Z"}
+    assert event["data"]["items"][0]["value"]["units"] == "kg"
+
+    assert DbToCanonicalJson.transcode({"T": "x", "V": "Weight"}) == text("Weight")
+    assert DbToCanonicalJson.transcode([{"T": "x", "V": "a"}, "b"]) == [text("a"), "b"]
+    assert DbToCanonicalJson.transcode(72.5) == 72.5
+
+
+def test_invalid_db_format():
+    with pytest.raises(InternalServerException):
+        DbToCanonicalJson.transcode({"": {"T": "COMPOSITION"}, "c0.d.": {"T": "HISTORY"}})
+    with pytest.raises(InternalServerException):
+        DbToCanonicalJson.transcode({"T": "x", "unknown": 1})
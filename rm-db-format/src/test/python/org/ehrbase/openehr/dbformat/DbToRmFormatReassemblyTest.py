@@ -0,0 +1,45 @@
+import pytest
+from composition_fixture import CompositionFixture
+from your_module import DbJsonPath, DbToRmFormat, InternalServerException, VersionedObjectDataStructure
+
+COMPOSITION = CompositionFixture.composition()
+# decode_keys keeps the _magnitude stored with a DV_DATE_TIME, it is dropped when the RM object is built
+del COMPOSITION["content"][0]["data"]["events"][0]["time"]
+
+
+def db_entries():
+    # as stored: one row per structure node, keyed by entity_idx
+    return {n.entity_idx.print_index_string(False, True): n.get_db_json()
+            for n in VersionedObjectDataStructure.create_data_structure(COMPOSITION)}
+
+
+def test_reassemble():
+    entries = db_entries()
+    # rows are not read in order
+    shuffled = dict(reversed(list(entries.items())))
+
+    assert DbToRmFormat.decode_keys(DbToRmFormat.reassemble(shuffled)) == COMPOSITION
+
+
+def test_reassemble_sub_structure():
+    event = {k: v for k, v in db_entries().items() if k.startswith("c0.d.e0.")}
+
+    decoded = DbToRmFormat.decode_keys(DbToRmFormat.reassemble(event))
+    assert decoded == COMPOSITION["content"][0]["data"]["events"][0]
+
+
+def test_missing_ancestor():
+    entries = db_entries()
+    del entries["c0.d."]
+    with pytest.raises(InternalServerException, match="missing ancestor of c0.d.e0."):
+        DbToRmFormat.reassemble(entries)
+
+
+def test_parse_path():
+    path = DbJsonPath.parse("c0.d.e12.")
+
+    assert path.components == (("c", 0), ("d", None), ("e", 12))
+    assert DbJsonPath.parse("c0.d.e12.") is path
+    assert DbJsonPath.parse("") is DbJsonPath.EMPTY_PATH
+    assert DbJsonPath.split_last("c0.d.e12.") == ("c0.d.", ("e", 12))
+    assert DbJsonPath.split_last("c0.") == ("", ("c", 0))
@@ -0,0 +1,82 @@
+from datetime import datetime
+
+import pytest
+from your_module import DvMagnitude
+
+
+def epoch_millis(value: str) -> int:
+    return int(datetime.fromisoformat(value).timestamp() * 1000)
+
+
+@pytest.mark.parametrize("value", [
+    "2024-01-01T10:00:00+00:00",
+    "2024-03-01T10:30:15.123+01:00",
+    "1900-02-28T23:59:59-05:30",
+    "2000-02-29T12:00:00+00:00",
+    "0001-01-01T00:00:00+00:00"
+])
+def test_date_time(value):
+    assert DvMagnitude.date_time(value) == epoch_millis(value)
+
+
+def test_partial_and_basic_format():
+    # partial values count from the start of the period, without a zone they are UTC
+    assert DvMagnitude.date_time("2024") == epoch_millis("2024-01-01T00:00:00+00:00")
+    assert DvMagnitude.date_time("2024-03") == epoch_millis("2024-03-01T00:00:00+00:00")
+    assert DvMagnitude.date_time("2024-03-01T10") == epoch_millis("2024-03-01T10:00:00+00:00")
+    assert DvMagnitude.date_time("2024-03-01T10:30Z") == epoch_millis("2024-03-01T10:30:00+00:00")
+    assert DvMagnitude.date_time("20240301T103015+0100") == epoch_millis("2024-03-01T10:30:15+01:00")
+    assert DvMagnitude.date("2024-03-01") == DvMagnitude.date_time("2024-03-01T00:00:00Z")
+    assert DvMagnitude.date("2024") == DvMagnitude.date("2024-01-01")
+
+
+def test_time():
+    assert DvMagnitude.time("10") == 36000000
+    assert DvMagnitude.time("10:30:15,5") == 37815500
+    assert DvMagnitude.time("103015.123456") == 37815123
+    assert DvMagnitude.time("10:30:15+01:00") == 34215000
+    assert DvMagnitude.time("24:00") == 86400000
+
+
+def test_duration():
+    assert DvMagnitude.duration("PT1H30M") == 5400
+    assert DvMagnitude.duration("P1W") == 604800
+    assert DvMagnitude.duration("-P1D") == -86400
+    assert DvMagnitude.duration("PT0,5S") == 0.5
+    assert DvMagnitude.duration("P1Y") == 12 * DvMagnitude.duration("P1M")
+
+
+@pytest.mark.parametrize("parse, value", [
+    (DvMagnitude.date, "2023-02-29"),
+    (DvMagnitude.date, "2024-13"),
+    (DvMagnitude.date, "24-01-01"),
+    (DvMagnitude.time, "25:00"),
+    (DvMagnitude.time, "10:61"),
+    (DvMagnitude.time, "10:30:00+1"),
+    (DvMagnitude.date_time, "2024-01-01T"),
+    (DvMagnitude.duration, "P"),
+    (DvMagnitude.duration, "P1DT"),
+])
+def test_invalid(parse, value):
+    with pytest.raises(ValueError):
+        parse(value)
+
+
+def test_fill_in():
+    composition = {
+        "_type": "OBSERVATION",
+        "data": {"_type": "HISTORY", "origin": {"_type": "DV_DATE_TIME", "value": "2024-01-01T10:00:00Z"},
+                 "events": [{"_type": "POINT_EVENT", "time": {"_type": "DV_DATE_TIME", "value": "2024-01-01"}}]},
+        "protocol": {"_type": "ITEM_TREE", "items": [
+            {"_type": "ELEMENT", "value": {"_type": "DV_PROPORTION", "numerator": 1, "denominator": 4, "type": 3}},
+            {"_type": "ELEMENT", "value": {"_type": "DV_DURATION", "value": "PT1M"}},
+            {"_type": "ELEMENT", "value": {"_type": "DV_QUANTITY", "magnitude": 1.0, "units": "kg"}},
+            {"_type": "ELEMENT", "null_flavour": {"_type": "DV_CODED_TEXT", "value": "unknown"}}
+        ]}
+    }
+
+    assert DvMagnitude.fill_in(composition) == 4
+    assert composition["data"]["origin"]["_magnitude"] == 1704103200000
+    assert composition["data"]["events"][0]["time"]["_magnitude"] == 1704067200000
+    assert [e["value"].get("_magnitude") for e in composition["protocol"]["items"][:3]] == [0.25, 60, None]
+    assert DvMagnitude.of("DV_DATE_TIME", {"_type": "DV_DATE_TIME"}) is None
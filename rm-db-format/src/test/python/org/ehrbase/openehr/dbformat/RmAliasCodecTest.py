@@ -0,0 +1,96 @@
+import json
+import sys
+
+import pytest
+from your_module import DbToCanonicalJson, DbToRmFormat, InternalServerException, RmAliasCodec
+
+OBSERVATION = {
+    "_type": "OBSERVATION",
+    "name": {"_type": "DV_TEXT", "value": "Body weight"},
+    "data": {
+        "_type": "HISTORY",
+        "events": [{
+            "_type": "POINT_EVENT",
+            "time": {"_type": "DV_DATE_TIME", "value": "2024-01-01T10:00:00Z"},
+            "data": {"_type": "ITEM_TREE", "items": [
+                {"_type": "ELEMENT", "value": {"_type": "DV_QUANTITY", "magnitude": 72.5, "units": "kg"}}
+            ]}
+        }]
+    },
+    "links": []
+}
+
+DB_OBSERVATION = {
+    "T": "OBSERVATION",
+    "N": {"T": "x", "V": "Body weight"},
+    "d": {
+        "T": "HISTORY",
+        "e": [{
+            "T": "POINT_EVENT",
+            "ti": {"T": "dt", "V": "2024-01-01T10:00:00Z"},
+            "d": {"T": "ITEM_TREE", "i": [{"T": "ELEMENT", "V": {"T": "q", "m": 72.5, "un": "kg"}}]}
+        }]
+    },
+    "lk": []
+}
+
+
+def test_encode_decode():
+    assert RmAliasCodec.encode(OBSERVATION) == DB_OBSERVATION
+    assert RmAliasCodec.decode(DB_OBSERVATION) == OBSERVATION
+    assert RmAliasCodec.decode(RmAliasCodec.encode([OBSERVATION, "a", 1])) == [OBSERVATION, "a", 1]
+    assert RmAliasCodec.decode("x") == "x"
+
+
+def test_decoded_trees_are_copies_with_shared_keys():
+    db_json = json.loads(json.dumps(DB_OBSERVATION))
+    decoded = RmAliasCodec.decode(db_json)
+
+    decoded["data"]["events"][0]["data"]["items"].clear()
+    assert db_json == DB_OBSERVATION
+    # the keys are the strings of the alias tables, not one per parsed object
+    assert next(iter(decoded)) is sys.intern("_type")
+    assert all(k is RmAliasCodec.ALIAS_ATTRIBUTES[a] for k, a in zip(decoded["data"], db_json["d"]))
+
+
+def test_tables_are_frozen():
+    with pytest.raises(TypeError):
+        RmAliasCodec.ATTRIBUTE_ALIASES["name"] = "n"
+    assert RmAliasCodec.ALIAS_TYPES[RmAliasCodec.TYPE_ALIASES["DV_QUANTITY"]] == "DV_QUANTITY"
+
+
+def test_unknown_aliases():
+    with pytest.raises(ValueError):
+        RmAliasCodec.encode({"_type": "DV_TEXT", "unknown": 1})
+    with pytest.raises(ValueError):
+        RmAliasCodec.decode({"T": "UNKNOWN"})
+
+
+def test_deep_tree():
+    depth = sys.getrecursionlimit() + 100
+    tree = {"T": "CLUSTER", "i": []}
+    items = tree["i"]
+    for _ in range(depth):
+        cluster = {"T": "CLUSTER", "i": []}
+        items.append(cluster)
+        items = cluster["i"]
+
+    node = RmAliasCodec.decode(tree)
+    for _ in range(depth):
+        node = node["items"][0]
+    assert node == {"_type": "CLUSTER", "items": []}
+
+
+def test_decode_keys():
+    assert DbToRmFormat.decode_keys(json.loads(json.dumps(DB_OBSERVATION))) == OBSERVATION
+    # entries keyed by entity_idx keep their keys
+    assert DbToRmFormat.decode_keys({"c0.": {"T": "x", "V": "a"}}) == {"c0.": {"_type": "DV_TEXT", "value": "a"}}
+
+
+def test_invalid_db_format():
+    # both decoders of the DB format report unknown aliases alike
+    for db_json in ({"T": "UNKNOWN"}, {"T": "x", "unknown": 1}):
+        with pytest.raises(InternalServerException):
+            DbToRmFormat.decode_keys(db_json)
+        with pytest.raises(InternalServerException):
+            DbToCanonicalJson.transcode(db_json)
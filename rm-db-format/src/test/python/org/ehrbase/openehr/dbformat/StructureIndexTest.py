@@ -0,0 +1,44 @@
+from your_module import StructureIndex
+
+Node = StructureIndex.Node
+
+
+def test_print_index_string():
+    index = StructureIndex.of(Node("content", 0), Node("data", None), Node("events", 1))
+
+    assert index.print_index_string(False, True) == "c0.d.e1."
+    assert index.print_index_string(True, True) == "c0.d.e1.~"
+    assert index.print_index_string(False, False) == "c.d.e."
+    assert index.print_last_attribute() == "e"
+    assert index.length() == 3
+    assert StructureIndex.of().print_index_string(False, True) == ""
+    assert StructureIndex.of().print_index_string(True, True) == "~"
+    assert StructureIndex.of().print_last_attribute() is None
+
+
+def test_equality():
+    parent = StructureIndex.of(Node("content", 0))
+    index = parent.create_child(Node("data", None))
+
+    assert index == StructureIndex.of(Node("content", 0), Node("data", None))
+    assert hash(index) == hash(StructureIndex.of(Node("content", 0), Node("data", None)))
+    assert index != StructureIndex.of(Node("content", 1), Node("data", None))
+    assert index != parent
+    assert index.index == [Node("content", 0), Node("data", None)]
+    assert index.starts_with(parent)
+    assert index.starts_with(StructureIndex.of())
+    assert not parent.starts_with(index)
+    assert not index.starts_with(StructureIndex.of(Node("content", 1)))
+
+
+def test_deep_index():
+    root = StructureIndex.of()
+    index = root
+    for i in range(5000):
+        index = index.create_child(Node("items", i))
+
+    # children share their parent
+    assert index.parent.parent.length() == 4998
+    assert index.print_index_string(False, True).endswith(".i4998.i4999.")
+    assert index.starts_with(root)
+    assert index == StructureIndex.of(*index.index)
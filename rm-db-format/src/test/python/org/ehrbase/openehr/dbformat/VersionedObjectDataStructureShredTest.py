@@ -0,0 +1,53 @@
+import sys
+
+from composition_fixture import CompositionFixture, text
+from your_module import DbToCanonicalJson, StructureRmType, VersionedObjectDataStructure
+
+
+def test_shred_composition():
+    source = CompositionFixture.composition()
+    roots = VersionedObjectDataStructure.create_data_structure(source)
+
+    assert [r.get_structure_rm_type() for r in roots] == [
+        StructureRmType.COMPOSITION, StructureRmType.EVENT_CONTEXT, StructureRmType.OBSERVATION, StructureRmType.HISTORY,
+        StructureRmType.POINT_EVENT, StructureRmType.ITEM_TREE, StructureRmType.ELEMENT, StructureRmType.CLUSTER,
+        StructureRmType.ELEMENT
+    ]
+    assert [r.num for r in roots] == list(range(9))
+    assert [r.parent_num for r in roots] == [0, 0, 0, 2, 3, 4, 5, 5, 7]
+    assert [r.num_cap for r in roots] == [8, 1, 8, 8, 8, 8, 6, 8, 8]
+    assert [r.entity_idx.print_index_string(False, True) for r in roots] == [
+        "", "x.", "c0.", "c0.d.", "c0.d.e0.", "c0.d.e0.d.", "c0.d.e0.d.i0.", "c0.d.e0.d.i1.", "c0.d.e0.d.i1.i0."
+    ]
+    assert roots[8].get_content_item() is roots[7]
+    assert roots[7].get_entity_name() == "Device"
+
+    # structure entries are stored in their own node, the root keeps the rest
+    assert roots[0].get_db_json() == {
+        "T": "COMPOSITION", "A": "openEHR-EHR-COMPOSITION.encounter.v1", "N": {"T": "x", "V": "Encounter"},
+        "la": {"T": "C", "cd": "en", "te": {"T": "T", "V": "ISO_639-1"}}
+    }
+    assert roots[6].get_db_json()["V"] == {"T": "q", "m": 72.5, "un": "kg"}
+    assert roots[4].get_db_json()["ti"] == {"T": "dt", "V": "2024-01-01T10:00:00Z", "M": 1704103200000}
+    # the source is not modified
+    assert source == CompositionFixture.composition()
+
+    # reading the rows back yields the composition
+    entries = {r.entity_idx.print_index_string(False, True): r.get_db_json() for r in roots}
+    assert DbToCanonicalJson.transcode(entries) == source
+
+
+def test_deep_nesting():
+    depth = sys.getrecursionlimit() + 100
+    tree = {"_type": "ITEM_TREE", "archetype_node_id": "at0001", "name": text("Tree"), "items": []}
+    items = tree["items"]
+    for i in range(depth):
+        cluster = {"_type": "CLUSTER", "archetype_node_id": f"at{i}", "name": text(str(i)), "items": []}
+        items.append(cluster)
+        items = cluster["items"]
+
+    roots = VersionedObjectDataStructure.create_data_structure(tree)
+
+    assert len(roots) == depth + 1
+    assert roots[-1].parent_num == depth - 1
+    assert roots[0].num_cap == depth
@@ -21,6 +21,8 @@ from sqlalchemy.ext.declarative import declared_attr
 from sqlalchemy import JSON
 import asyncio
 
+from ehr_data_change_notifier import EhrDataChangeNotifier
+
 Base = declarative_base()
 
 @dataclass
@@ -44,19 +46,23 @@ class KnowledgeCacheService:
         pass
 
 class CompositionRepository:
-    def __init__(self, session: AsyncSession, knowledge_cache: KnowledgeCacheService):
+    def __init__(self, session: AsyncSession, knowledge_cache: KnowledgeCacheService,
+                 change_notifier: Optional[EhrDataChangeNotifier] = None):
         self.session = session
         self.knowledge_cache = knowledge_cache
+        self.change_notifier = change_notifier
 
     async def commit(self, ehr_id: UUID, composition: Composition, contribution_id: Optional[UUID], audit_id: Optional[UUID]):
         template_id = await self._get_template_id(composition)
         root_concept = self._to_entity_concept(composition.archetype_node_id)
 
         # Implement commit_head logic here
+        self._notify_changed(ehr_id, self._template_id_value(composition))
 
     async def delete(self, ehr_id: UUID, comp_id: UUID, version: int, contribution_id: Optional[UUID], audit_id: Optional[UUID]):
         condition = self.single_composition_in_ehr_condition(ehr_id, comp_id)
         # Implement delete logic here
+        self._notify_changed(ehr_id)
 
     async def is_template_used(self, template_id: str) -> bool:
         template_uuid = await self.knowledge_cache.find_uuid_by_template_id(template_id)
@@ -80,6 +86,7 @@ class CompositionRepository:
         root_concept = self._to_entity_concept(composition.archetype_node_id)
 
         # Implement update logic here
+        self._notify_changed(ehr_id, self._template_id_value(composition))
 
     async def exists(self, comp_id: UUID) -> bool:
         query = select(1).where(COMP_VERSION.c.vo_id == comp_id)
@@ -115,12 +122,33 @@ class CompositionRepository:
         return result.scalar_one_or_none()
 
     async def admin_delete(self, comp_id: UUID):
+        ehr_id = None
+        if self.change_notifier is not None:
+            result = await self.session.execute(union_all(
+                select(COMP_VERSION.c.ehr_id).where(COMP_VERSION.c.vo_id == comp_id),
+                select(COMP_VERSION_HISTORY.c.ehr_id).where(COMP_VERSION_HISTORY.c.vo_id == comp_id)
+            ))
+            ehr_id = result.scalars().first()
         await self.session.execute(COMP_VERSION_HISTORY.delete().where(COMP_VERSION_HISTORY.c.vo_id == comp_id))
         await self.session.execute(COMP_VERSION.delete().where(COMP_VERSION.c.vo_id == comp_id))
+        if ehr_id is not None:
+            self._notify_changed(ehr_id)
 
     async def admin_delete_all(self, ehr_id: UUID):
         await self.session.execute(COMP_VERSION_HISTORY.delete().where(COMP_VERSION_HISTORY.c.ehr_id == ehr_id))
         await self.session.execute(COMP_VERSION.delete().where(COMP_VERSION.c.ehr_id == ehr_id))
+        self._notify_changed(ehr_id)
+
+    def _notify_changed(self, ehr_id: UUID, template_id: Optional[str] = None):
+        if self.change_notifier is not None:
+            self.change_notifier.notify_after_commit(self.session, ehr_id, template_id)
+
+    @staticmethod
+    def _template_id_value(composition: Composition) -> Optional[str]:
+        archetype_details = getattr(composition, 'archetype_details', None)
+        if archetype_details is None or archetype_details.template_id is None:
+            return None
+        return archetype_details.template_id.value
 
     def single_composition_in_ehr_condition(self, ehr_id: UUID, comp_id: UUID):
         # Implement condition logic
@@ -0,0 +1,62 @@
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# called with the ehr_id and, for compositions, the template id of the changed data
+EhrDataChangeListener = Callable[[UUID, Optional[str]], None]
+
+# Session.info key of the changes written in the current transaction of a session
+PENDING_CHANGES_KEY = "ehrbase_ehr_data_changes"
+
+
+class EhrDataChangeNotifier:
+    """
+    Informs listeners, e.g. the AQL result cache, about data written to an EHR
+    by CompositionRepository, EhrRepository and EhrFolderRepository.
+
+    The repositories report changes with notify_after_commit: listeners are only called once the
+    transaction has committed, as queries starting before that still read the previous data.
+    Changes of a transaction that is rolled back are dropped.
+    """
+
+    def __init__(self):
+        self.listeners: List[EhrDataChangeListener] = []
+
+    def add_listener(self, listener: EhrDataChangeListener) -> None:
+        self.listeners.append(listener)
+
+    def notify(self, ehr_id: UUID, template_id: Optional[str] = None) -> None:
+        logger.debug(f"Data of EHR {ehr_id} changed (template: {template_id})")
+        for listener in self.listeners:
+            listener(ehr_id, template_id)
+
+    def notify_after_commit(self, session, ehr_id: UUID, template_id: Optional[str] = None) -> None:
+        """Records the change in the transaction of session (a Session or AsyncSession)."""
+        # the events of an AsyncSession are emitted by its synchronous session
+        session = getattr(session, "sync_session", session)
+        changes: Optional[Dict[Tuple[UUID, Optional[str]], None]] = session.info.get(PENDING_CHANGES_KEY)
+        if changes is None:
+            # ordered and without duplicates; the listeners stay registered for later transactions
+            changes = session.info[PENDING_CHANGES_KEY] = {}
+            event.listen(session, "after_commit", self._after_commit)
+            event.listen(session, "after_rollback", self._after_rollback)
+        changes[(ehr_id, template_id)] = None
+
+    def _after_commit(self, session) -> None:
+        changes = session.info[PENDING_CHANGES_KEY]
+        committed = list(changes)
+        changes.clear()
+        for ehr_id, template_id in committed:
+            try:
+                self.notify(ehr_id, template_id)
+            except Exception:
+                # the transaction is committed already, the remaining changes must still be reported
+                logger.exception(f"Failed to report the change of EHR {ehr_id}")
+
+    @staticmethod
+    def _after_rollback(session) -> None:
+        session.info[PENDING_CHANGES_KEY].clear()
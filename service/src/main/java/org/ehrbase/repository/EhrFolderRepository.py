@@ -9,6 +9,7 @@ from models import EhrFolderVersion, EhrFolderData, EhrFolderVersionHistory, Ehr
 from models import Folder
 from services import SystemService, TimeProvider
 from repositories import ContributionRepository, AbstractVersionedObjectRepository
+from ehr_data_change_notifier import EhrDataChangeNotifier
 
 import sys
 sys.path.append('/path/to/your/module')
@@ -23,9 +24,11 @@ class EhrFolderRepository(AbstractVersionedObjectRepository):
                  session: Session, 
                  contribution_repository: ContributionRepository,
                  system_service: SystemService,
-                 time_provider: TimeProvider):
+                 time_provider: TimeProvider,
+                 change_notifier: Optional[EhrDataChangeNotifier] = None):
         super().__init__(EhrFolderVersion, EhrFolderData, EhrFolderVersionHistory, EhrFolderDataHistory, 
                          session, contribution_repository, system_service, time_provider)
+        self.change_notifier = change_notifier
 
     def get_version_data_join_fields(self) -> List[str]:
         return [EhrFolderVersion.ehr_id, EhrFolderVersion.ehr_folders_idx]
@@ -43,6 +46,7 @@ class EhrFolderRepository(AbstractVersionedObjectRepository):
             lambda r: setattr(r, 'ehr_folders_idx', ehr_folders_idx),
             lambda r: setattr(r, 'ehr_id', ehr_id)
         )
+        self._notify_changed(ehr_id)
 
     def update(self, ehr_id: uuid.UUID, folder: Folder, 
                contribution_id: Optional[uuid.UUID], 
@@ -59,6 +63,7 @@ class EhrFolderRepository(AbstractVersionedObjectRepository):
             lambda r: setattr(r, 'ehr_id', ehr_id),
             f"No Directory in ehr: {ehr_id}"
         )
+        self._notify_changed(ehr_id)
 
     def find_head(self, ehr_id: uuid.UUID, ehr_folders_idx: int) -> Optional[Folder]:
         return self.find_head(self.single_folder_condition(ehr_id, ehr_folders_idx, self.version_head()))
@@ -76,6 +81,7 @@ class EhrFolderRepository(AbstractVersionedObjectRepository):
             audit_id,
             f"No folder with {root_folder_id}"
         )
+        self._notify_changed(ehr_id)
 
     def find_by_version(self, ehr_id: uuid.UUID, folder_idx: int, version: int) -> Optional[Folder]:
         return self.find_by_version(
@@ -121,6 +127,11 @@ class EhrFolderRepository(AbstractVersionedObjectRepository):
         if ehr_folders_idx is not None:
             delete_history_query = delete_history_query.where(EhrFolderVersionHistory.ehr_folders_idx == ehr_folders_idx)
         self.session.execute(delete_history_query)
+        self._notify_changed(ehr_id)
+
+    def _notify_changed(self, ehr_id: uuid.UUID) -> None:
+        if self.change_notifier is not None:
+            self.change_notifier.notify_after_commit(self.session, ehr_id)
 
     def find_for_contribution(self, ehr_id: uuid.UUID, contribution_id: uuid.UUID) -> List[uuid.UUID]:
         return self.find_version_ids_by_contribution(ehr_id, contribution_id)
@@ -5,6 +5,8 @@ from sqlalchemy import select, delete, update, and_
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import Session, relationship
 
+from ehr_data_change_notifier import EhrDataChangeNotifier
+
 Base = declarative_base()
 
 # Define database tables as classes
@@ -32,8 +34,9 @@ class EhrStatusDataHistory(Base):
 class EhrRepository:
     NOT_MATCH_LATEST_VERSION = "If-Match version_uid does not match latest version."
 
-    def __init__(self, session: Session):
+    def __init__(self, session: Session, change_notifier: Optional[EhrDataChangeNotifier] = None):
         self.session = session
+        self.change_notifier = change_notifier
 
     def commit(self, ehr_id: UUID, status: EhrStatus, contribution_id: Optional[UUID], audit_id: Optional[UUID]):
         ehr_record = Ehr(id=ehr_id, creation_date=datetime.now())
@@ -41,6 +44,7 @@ class EhrRepository:
 
         # Implementation of commitHead function will be similar to the commit logic in Java
         self.commit_head(ehr_id, status, contribution_id, audit_id)
+        self._notify_changed(ehr_id)
 
     def has_ehr(self, ehr_id: UUID) -> bool:
         return self.session.query(Ehr).filter(Ehr.id == ehr_id).count() > 0
@@ -87,6 +91,7 @@ class EhrRepository:
     def admin_delete(self, ehr_id: UUID):
         self.session.execute(delete(Ehr).where(Ehr.id == ehr_id))
         self.session.execute(delete(EhrStatus).where(EhrStatus.ehr_id == ehr_id))
+        self._notify_changed(ehr_id)
 
     def update(self, ehr_id: UUID, ehr_status: EhrStatus, contribution_id: Optional[UUID], audit_id: Optional[UUID]):
         version_head = self.session.query(EhrStatusVersion).filter(EhrStatusVersion.ehr_id == ehr_id).first()
@@ -96,6 +101,7 @@ class EhrRepository:
         self.copy_head_to_history(version_head)
         self.delete_head(ehr_id, version_head.sys_version)
         self.commit_head(ehr_id, ehr_status, contribution_id, audit_id)
+        self._notify_changed(ehr_id)
 
     def get_original_version_status(self, ehr_id: UUID, versioned_object_uid: UUID, version: int) -> Optional[EhrStatus]:
         return self.get_original_version(ehr_id, versioned_object_uid, version)
@@ -108,6 +114,10 @@ class EhrRepository:
 
     # Helper methods for commit, copy head, and other functionality would go here
 
+    def _notify_changed(self, ehr_id: UUID):
+        if self.change_notifier is not None:
+            self.change_notifier.notify_after_commit(self.session, ehr_id)
+
     def commit_head(self, ehr_id: UUID, status: EhrStatus, contribution_id: Optional[UUID], audit_id: Optional[UUID]):
         pass  # Placeholder for the actual commit logic
 
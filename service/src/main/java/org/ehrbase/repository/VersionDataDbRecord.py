@@ -1,12 +1,16 @@
 import uuid
 import json
-from typing import Collection, Optional, Callable, Generator
+from typing import Any, Collection, Dict, Optional, Callable, Generator
 from datetime import datetime
 from sqlalchemy import Column, String, DateTime, JSON
+from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import IntegrityError
 
+from asl_rm_type_and_concept import AslRmTypeAndConcept
+from versioned_object_data_structure import StructureNode, VersionedObjectDataStructure
+
 # Exception definitions
 class InternalServerException(Exception):
     pass
@@ -42,70 +46,6 @@ class ObjectDataRecordPrototype(Base):
     entity_idx_len = Column(String)
     data = Column(JSON)
 
-class StructureNode:
-    # Simulated StructureNode class for the sake of this implementation
-    def __init__(self, num, parent_num, num_cap, rm_entity, archetype_node_id, entity_name, entity_idx, json_node):
-        self.num = num
-        self.parent_num = parent_num
-        self.num_cap = num_cap
-        self.rm_entity = rm_entity
-        self.archetype_node_id = archetype_node_id
-        self.entity_name = entity_name
-        self.entity_idx = entity_idx
-        self.json_node = json_node
-
-    def get_num(self):
-        return self.num
-
-    def get_content_item(self):
-        return self
-
-    def get_parent_num(self):
-        return self.parent_num
-
-    def get_rm_entity(self):
-        return self.rm_entity
-
-    def get_archetype_node_id(self):
-        return self.archetype_node_id
-
-    def get_entity_name(self):
-        return self.entity_name
-
-    def get_entity_idx(self):
-        return self.entity_idx
-
-    def get_json_node(self):
-        return self.json_node
-
-class AslRmTypeAndConcept:
-    @staticmethod
-    def to_entity_concept(node_id: str) -> str:
-        # Placeholder for the actual conversion logic
-        return node_id
-
-class StructureIndex:
-    # Placeholder implementation for StructureIndex
-    def print_last_attribute(self) -> str:
-        return "last_attribute"
-
-    def print_index_string(self, arg1: bool, arg2: bool) -> str:
-        return "index_string"
-
-    def length(self) -> int:
-        return 1
-
-class VersionedObjectDataStructure:
-    @staticmethod
-    def create_data_structure(version_data_object) -> Collection[StructureNode]:
-        # Placeholder implementation for creating the data structure
-        return [StructureNode("1", "0", "1", "Entity", "nodeId", "EntityName", StructureIndex(), json.loads('{}'))]
-
-    @staticmethod
-    def apply_rm_aliases(json_node) -> dict:
-        # Placeholder implementation for applying RM aliases
-        return json_node
-
 # VersionDataDbRecord class
 class VersionDataDbRecord:
     def __init__(self, version_record: ObjectVersionRecordPrototype, data_records: Callable[[], Generator[ObjectDataRecordPrototype, None, None]]):
@@ -152,34 +92,36 @@ class VersionDataDbRecord:
     def data_records_builder(vo_id: uuid.UUID, node_list: Collection[StructureNode], session) -> Callable[[], Generator[ObjectDataRecordPrototype, None, None]]:
         def generator() -> Generator[ObjectDataRecordPrototype, None, None]:
             for node in node_list:
-                if node.get_rm_entity() == "StructureEntry":  # Simulating StructureEntry check
-                    yield VersionDataDbRecord.build_data_record(vo_id, node, session)
+                yield VersionDataDbRecord.build_data_record(vo_id, node, session)
 
         return generator
 
     @staticmethod
     def build_data_record(vo_id: uuid.UUID, node: StructureNode, session) -> ObjectDataRecordPrototype:
-        rec = ObjectDataRecordPrototype()
-
-        rec.num = node.get_num()
-        rec.citem_num = node.get_content_item().get_num() if node.get_content_item() else None
-        rec.parent_num = node.get_parent_num()
-        rec.num_cap = node.get_num_cap()
-        rec.rm_entity = node.get_rm_entity()  # Assumed to be an alias
-        rec.entity_concept = AslRmTypeAndConcept.to_entity_concept(node.get_archetype_node_id())
-        rec.entity_name = node.get_entity_name()
-        
-        index = node.get_entity_idx()
-        rec.entity_attribute = index.print_last_attribute()
-        rec.entity_idx = index.print_index_string(False, True)
-        rec.entity_idx_len = str(index.length())
-        
-        rec.data = VersionedObjectDataStructure.apply_rm_aliases(node.get_json_node())
-
-        # system columns
-        rec.vo_id = vo_id
+        rec = ObjectDataRecordPrototype(**VersionDataDbRecord.data_record_columns(vo_id, node))
 
         session.add(rec)
         session.commit()
         
         return rec
+
+    @staticmethod
+    def data_record_columns(vo_id: uuid.UUID, node: StructureNode) -> Dict[str, Any]:
+        """The columns of the data row of a structure node, by column name."""
+        index = node.get_entity_idx()
+        return {
+            "num": node.get_num(),
+            "citem_num": node.get_content_item().get_num() if node.get_content_item() else None,
+            "parent_num": node.get_parent_num(),
+            "num_cap": node.get_num_cap(),
+            "rm_entity": node.get_structure_rm_type().alias,
+            "entity_concept": AslRmTypeAndConcept.to_entity_concept(node.get_archetype_node_id()),
+            "entity_name": node.get_entity_name(),
+            "entity_attribute": index.print_last_attribute(),
+            "entity_idx": index.print_index_string(False, True),
+            "entity_idx_len": index.length(),
+            # aliased while the structure was created
+            "data": node.get_db_json(),
+            # system columns
+            "vo_id": vo_id
+        }
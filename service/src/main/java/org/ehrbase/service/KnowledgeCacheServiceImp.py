@@ -1,9 +1,12 @@
 import logging
+import threading
 from abc import ABC, abstractmethod
 from uuid import UUID
-from typing import Optional, List, BinaryIO
+from typing import Optional, List, BinaryIO, Callable
 from xml.etree.ElementTree import ParseError
 
+from template_containment_index import TemplateContainmentIndex
+
 # Placeholder classes for types used in the Java code
 class InvalidApiParameterException(Exception):
     pass
@@ -109,7 +112,13 @@ class KnowledgeCacheServiceImp(KnowledgeCacheService, IntrospectService):
         self.template_storage = template_storage
         self.cache_provider = cache_provider
         self.allow_template_overwrite = allow_template_overwrite
+        self.template_change_listeners: List[Callable[[str], None]] = []
         self.log = logging.getLogger(__name__)
+        self._containment_index: Optional[TemplateContainmentIndex] = None
+        self._containment_index_lock = threading.Lock()
+
+    def add_template_change_listener(self, listener: Callable[[str], None]) -> None:
+        self.template_change_listeners.append(listener)
 
     def add_operational_template(self, input_stream: BinaryIO) -> str:
         template = self.build_operational_template(input_stream)
@@ -137,6 +146,8 @@ class KnowledgeCacheServiceImp(KnowledgeCacheService, IntrospectService):
         
         if self.allow_template_overwrite and not overwrite:
             self.invalidate_cache(template)
+        else:
+            self.notify_template_changed(template_id)
 
         return template_id
 
@@ -150,6 +161,14 @@ class KnowledgeCacheServiceImp(KnowledgeCacheService, IntrospectService):
         self.cache_provider.evict(CacheProvider.INTROSPECT_CACHE, template_id)
         self.cache_provider.evict(CacheProvider.TEMPLATE_ID_UUID_CACHE, template_id)
         self.cache_provider.evict(CacheProvider.TEMPLATE_UUID_ID_CACHE, uuid)
+        self.notify_template_changed(template_id)
+
+    def notify_template_changed(self, template_id: str) -> None:
+        # waits for a build in progress, which may have read the old template
+        with self._containment_index_lock:
+            self._containment_index = None
+        for listener in self.template_change_listeners:
+            listener(template_id)
 
     def list_all_operational_templates(self) -> List:
         return self.template_storage.list_all_operational_templates()
@@ -191,6 +210,20 @@ class KnowledgeCacheServiceImp(KnowledgeCacheService, IntrospectService):
         except KeyError as e:
             raise RuntimeError(e)
 
+    def get_containment_index(self) -> TemplateContainmentIndex:
+        """Archetype nestings of all stored templates, rebuilt lazily after template changes."""
+        index = self._containment_index
+        if index is None:
+            with self._containment_index_lock:
+                index = self._containment_index
+                if index is None:
+                    template_ids = [TemplateUtils.get_template_id(t.operationaltemplate)
+                                    for t in self.list_all_operational_templates()]
+                    index = TemplateContainmentIndex.from_web_templates(
+                        {template_id: self.get_query_opt_metadata(template_id) for template_id in template_ids})
+                    self._containment_index = index
+        return index
+
     def build_query_opt_metadata(self, template_id: str) -> WebTemplate:
         return self.retrieve_operational_template(template_id).map(self._build_query_opt_metadata).or_else(None)
 
@@ -0,0 +1,46 @@
+import uuid
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from your_module import EhrDataChangeNotifier
+
+EHR_A = uuid.UUID("6f9c3b8e-1f3a-4f8e-9c6d-2b7a1e0d4c5f")
+EHR_B = uuid.UUID("0b1e2d3c-4a5b-4c6d-8e7f-9a0b1c2d3e4f")
+
+
+def notifier_and_changes():
+    notifier = EhrDataChangeNotifier()
+    changes = []
+    notifier.add_listener(lambda ehr_id, template_id: changes.append((ehr_id, template_id)))
+    return notifier, changes
+
+
+def test_changes_are_reported_after_commit():
+    notifier, changes = notifier_and_changes()
+    with Session(create_engine("sqlite://")) as session:
+        session.execute(text("SELECT 1"))
+        notifier.notify_after_commit(session, EHR_A, "tpl.v0")
+        notifier.notify_after_commit(session, EHR_A, "tpl.v0")
+        notifier.notify_after_commit(session, EHR_B)
+        assert changes == []
+
+        session.commit()
+        assert changes == [(EHR_A, "tpl.v0"), (EHR_B, None)]
+
+        # a later transaction of the same session only reports its own changes
+        session.execute(text("SELECT 1"))
+        notifier.notify_after_commit(session, EHR_B)
+        session.commit()
+        assert changes == [(EHR_A, "tpl.v0"), (EHR_B, None), (EHR_B, None)]
+
+
+def test_rolled_back_changes_are_dropped():
+    notifier, changes = notifier_and_changes()
+    with Session(create_engine("sqlite://")) as session:
+        session.execute(text("SELECT 1"))
+        notifier.notify_after_commit(session, EHR_A)
+        session.rollback()
+
+        session.execute(text("SELECT 1"))
+        session.commit()
+        assert changes == []
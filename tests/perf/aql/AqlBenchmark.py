@@ -0,0 +1,301 @@
+import argparse
+import json
+import logging
+import platform
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, select
+
+from aql_connection_pool import AqlConnectionPool, AqlPoolProperties
+from aql_engine_module_configuration import create_aql_sql_query_builder
+from aql_query_context import AqlQueryContext, MetaProperty
+from aql_query_feature_check import AqlQueryFeatureCheck
+from aql_query_repository import AqlQueryRepository
+from aql_query_request import AqlQueryRequest
+from aql_query_service_imp import AqlQueryServiceImp
+from aql_sql_layer import AqlSqlLayer
+from benchmark_statistics import percentile
+from jooq_tables import Tables
+from synthetic_ehr_generator import SyntheticEhrGenerator, SyntheticPopulation
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class BenchmarkQuery:
+    name: str
+    aql: str
+    # bound from GeneratedDataset.sample_parameters / the first EHR of the population
+    parameter_names: Tuple[str, ...] = ()
+
+
+# Fixed catalogue, results are only comparable between runs of the same catalogue
+BENCHMARK_QUERIES: Tuple[BenchmarkQuery, ...] = (
+    BenchmarkQuery(
+        "count_compositions",
+        "SELECT COUNT(c/uid/value) FROM EHR e CONTAINS COMPOSITION c"
+    ),
+    BenchmarkQuery(
+        "ehr_compositions",
+        "SELECT c/uid/value, c/name/value, c/archetype_details/template_id/value "
+        "FROM EHR e CONTAINS COMPOSITION c WHERE e/ehr_id/value = $ehr_id",
+        ("ehr_id",)
+    ),
+    BenchmarkQuery(
+        "ehr_blood_pressure",
+        "SELECT o/data[at0001]/events[at0006]/time/value, "
+        "o/data[at0001]/events[at0006]/data[at0003]/items[at0004]/value/magnitude, "
+        "o/data[at0001]/events[at0006]/data[at0003]/items[at0005]/value/magnitude "
+        "FROM EHR e CONTAINS COMPOSITION c CONTAINS OBSERVATION o[openEHR-EHR-OBSERVATION.blood_pressure.v2] "
+        "WHERE e/ehr_id/value = $ehr_id",
+        ("ehr_id",)
+    ),
+    BenchmarkQuery(
+        "population_weight_filter",
+        "SELECT e/ehr_id/value, o/data[at0002]/events[at0003]/data[at0001]/items[at0004]/value/magnitude "
+        "FROM EHR e CONTAINS COMPOSITION c CONTAINS OBSERVATION o[openEHR-EHR-OBSERVATION.body_weight.v2] "
+        "WHERE o/data[at0002]/events[at0003]/data[at0001]/items[at0004]/value/magnitude > 100"
+    ),
+    BenchmarkQuery(
+        "template_filter_paged",
+        "SELECT c/uid/value, c/context/start_time/value FROM COMPOSITION c "
+        "WHERE c/archetype_details/template_id/value = 'ehrbase.benchmark.vital_signs.v1' "
+        "ORDER BY c/uid/value LIMIT 100 OFFSET 100"
+    ),
+    BenchmarkQuery(
+        "element_values",
+        "SELECT el/name/value, el/value/magnitude FROM COMPOSITION c CONTAINS ELEMENT el LIMIT 10000"
+    ),
+)
+
+# metrics where a higher value is a regression
+REGRESSION_METRICS = ("p50_ms", "p95_ms", "peak_memory_bytes")
+
+
+@dataclass
+class QueryBenchmarkResult:
+    name: str
+    iterations: int
+    rows: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    mean_ms: float
+    rows_per_second: float
+    peak_memory_bytes: int
+    # from the AQL query profile of one extra, profiled execution
+    stages_ms: Dict[str, float] = field(default_factory=dict)
+
+
+class BenchmarkAqlQueryContext(AqlQueryContext):
+    """Query context outside of an HTTP request, collecting the meta properties of the last query."""
+
+    def __init__(self):
+        self.profiling = False
+        self.meta: Dict[Any, Any] = {}
+
+    def create_meta_data(self, location: str) -> Any:
+        return dict(self.meta)
+
+    def show_executed_aql(self) -> bool:
+        return False
+
+    def is_dry_run(self) -> bool:
+        return False
+
+    def show_executed_sql(self) -> bool:
+        # also enables the query profile
+        return self.profiling
+
+    def show_query_plan(self) -> bool:
+        return False
+
+    def set_executed_aql(self, executed_aql: str) -> None:
+        pass
+
+    def set_meta_property(self, property: MetaProperty, value: Any) -> None:
+        self.meta[property] = value
+
+
+class BenchmarkKnowledgeCache:
+    """Resolves template ids against template_store, which is all the AQL engine needs of the knowledge cache."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._uuids: Optional[Dict[str, Any]] = None
+
+    def _load(self) -> Dict[str, Any]:
+        if self._uuids is None:
+            with self.engine.connect() as conn:
+                rows = conn.execute(select(Tables.TEMPLATE_STORE.TEMPLATE_ID, Tables.TEMPLATE_STORE.ID))
+                self._uuids = {template_id: uuid for template_id, uuid in rows}
+        return self._uuids
+
+    def find_uuid_by_template_id(self, template_id: str):
+        return self._load().get(template_id)
+
+    def find_template_id_by_uuid(self, uuid) -> Optional[str]:
+        return next((t for t, u in self._load().items() if u == uuid), None)
+
+    def add_template_change_listener(self, listener: Callable) -> None:
+        pass
+
+
+class BenchmarkSystemService:
+    def get_system_id(self) -> str:
+        return "benchmark.ehrbase.org"
+
+
+class AqlBenchmark:
+    """Runs the query catalogue through AqlQueryServiceImp and records latency, throughput and memory."""
+
+    def __init__(self, aql_query_service: AqlQueryServiceImp, context: BenchmarkAqlQueryContext,
+                 warmup: int = 3, iterations: int = 20, clock: Callable[[], float] = time.perf_counter):
+        self.aql_query_service = aql_query_service
+        self.context = context
+        self.warmup = warmup
+        self.iterations = iterations
+        self.clock = clock
+
+    def run(self, queries: Sequence[BenchmarkQuery], parameters: Dict[str, Any]) -> List[QueryBenchmarkResult]:
+        return [self.run_query(q, {n: parameters[n] for n in q.parameter_names}) for q in queries]
+
+    def execute(self, query: BenchmarkQuery, parameters: Dict[str, Any]) -> int:
+        self.context.meta.clear()
+        result = self.aql_query_service.query(AqlQueryRequest(query.aql, parameters))
+        return len(result.result_set)
+
+    def run_query(self, query: BenchmarkQuery, parameters: Dict[str, Any]) -> QueryBenchmarkResult:
+        logger.info(f"Benchmarking {query.name}")
+        for _ in range(self.warmup):
+            self.execute(query, parameters)
+
+        latencies = []
+        rows = 0
+        for _ in range(self.iterations):
+            start = self.clock()
+            rows = self.execute(query, parameters)
+            latencies.append(self.clock() - start)
+
+        # separate runs, tracing and profiling would distort the timings above
+        tracemalloc.start()
+        try:
+            self.execute(query, parameters)
+            _, peak_memory = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        self.context.profiling = True
+        try:
+            self.execute(query, parameters)
+            profile = self.context.meta.get(AqlQueryContext.EHRBASE_META_PROPERTY_PROFILE) or {}
+        finally:
+            self.context.profiling = False
+
+        latencies.sort()
+        total = sum(latencies)
+        return QueryBenchmarkResult(
+            name=query.name,
+            iterations=self.iterations,
+            rows=rows,
+            p50_ms=round(percentile(latencies, 50) * 1000, 3),
+            p95_ms=round(percentile(latencies, 95) * 1000, 3),
+            p99_ms=round(percentile(latencies, 99) * 1000, 3),
+            mean_ms=round(total / len(latencies) * 1000, 3),
+            rows_per_second=round(rows * len(latencies) / total, 1) if total > 0 else 0.0,
+            peak_memory_bytes=peak_memory,
+            stages_ms=profile.get("stages_ms", {})
+        )
+
+
+def create_report(results: List[QueryBenchmarkResult], population: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "population": population,
+        "queries": {r.name: asdict(r) for r in results}
+    }
+
+
+def compare_reports(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[str]:
+    """Lists the metrics of queries present in both reports that got worse by more than threshold (0.2 = 20%)."""
+    regressions = []
+    for name, result in current["queries"].items():
+        base = baseline["queries"].get(name)
+        if base is None:
+            continue
+        for metric in REGRESSION_METRICS:
+            before, after = base.get(metric), result.get(metric)
+            if before and after is not None and after > before * (1 + threshold):
+                regressions.append(f"{name}: {metric} {before} -> {after} (+{(after / before - 1) * 100:.1f}%)")
+    return regressions
+
+
+def create_aql_query_service(pool: AqlConnectionPool, context: BenchmarkAqlQueryContext) -> AqlQueryServiceImp:
+    knowledge_cache = BenchmarkKnowledgeCache(pool.engine)
+    system_service = BenchmarkSystemService()
+    repository = AqlQueryRepository(system_service, knowledge_cache,
+                                    create_aql_sql_query_builder(knowledge_cache), pool)
+    return AqlQueryServiceImp(repository, None, AqlSqlLayer(knowledge_cache, system_service),
+                              AqlQueryFeatureCheck(system_service), json, context)
+
+
+def describe_population(engine) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Size of the benchmarked population and the parameters bound by the catalogue."""
+    with engine.connect() as conn:
+        ehrs = conn.execute(select(func.count()).select_from(Tables.EHR_)).scalar_one()
+        compositions = conn.execute(select(func.count()).select_from(Tables.COMP_VERSION)).scalar_one()
+        first_ehr = conn.execute(
+            select(Tables.EHR_.ID).order_by(Tables.EHR_.CREATION_DATE, Tables.EHR_.ID).limit(1)).scalar()
+    return {"ehrs": ehrs, "compositions": compositions}, {"ehr_id": str(first_ehr) if first_ehr else None}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="AQL engine benchmark")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="write a synthetic population into an empty ehr schema")
+    generate.add_argument("--url", required=True)
+    generate.add_argument("--ehrs", type=int, default=1000)
+    generate.add_argument("--compositions", type=int, default=10, help="compositions per EHR")
+    generate.add_argument("--seed", type=int, default=42)
+
+    run = commands.add_parser("run", help="run the query catalogue and write the results as JSON")
+    run.add_argument("--url", required=True)
+    run.add_argument("--output", required=True)
+    run.add_argument("--warmup", type=int, default=3)
+    run.add_argument("--iterations", type=int, default=20)
+    run.add_argument("--baseline", help="results of an earlier run to compare against")
+    run.add_argument("--threshold", type=float, default=0.2, help="tolerated relative regression")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    pool = AqlConnectionPool.create(AqlPoolProperties(args.url))
+
+    if args.command == "generate":
+        SyntheticEhrGenerator(pool.engine, SyntheticPopulation(args.ehrs, args.compositions, seed=args.seed)).generate()
+        return 0
+
+    population, parameters = describe_population(pool.engine)
+    context = BenchmarkAqlQueryContext()
+    benchmark = AqlBenchmark(create_aql_query_service(pool, context), context, args.warmup, args.iterations)
+    report = create_report(benchmark.run(BENCHMARK_QUERIES, parameters), population)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_reports(json.load(f), report, args.threshold)
+        for regression in regressions:
+            logger.error(f"Regression: {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+import logging
+import random
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.engine import Engine
+
+from jooq_tables import Tables
+from version_data_db_record import VersionDataDbRecord
+from versioned_object_data_structure import VersionedObjectDataStructure
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class SyntheticElement:
+    node_id: str
+    name: str
+    units: str
+    # range the DV_QUANTITY magnitudes are drawn from
+    low: float
+    high: float
+
+
+@dataclass(frozen=True)
+class SyntheticTemplate:
+    """A composition with one OBSERVATION holding a single point event of DV_QUANTITY elements."""
+    template_id: str
+    composition_archetype_id: str
+    observation_archetype_id: str
+    history_node_id: str
+    event_node_id: str
+    tree_node_id: str
+    elements: Tuple[SyntheticElement, ...]
+
+
+DEFAULT_TEMPLATES: Tuple[SyntheticTemplate, ...] = (
+    SyntheticTemplate(
+        "ehrbase.benchmark.blood_pressure.v1", "openEHR-EHR-COMPOSITION.encounter.v1",
+        "openEHR-EHR-OBSERVATION.blood_pressure.v2", "at0001", "at0006", "at0003",
+        (SyntheticElement("at0004", "Systolic", "mm[Hg]", 90, 180),
+         SyntheticElement("at0005", "Diastolic", "mm[Hg]", 50, 110))
+    ),
+    SyntheticTemplate(
+        "ehrbase.benchmark.body_weight.v1", "openEHR-EHR-COMPOSITION.encounter.v1",
+        "openEHR-EHR-OBSERVATION.body_weight.v2", "at0002", "at0003", "at0001",
+        (SyntheticElement("at0004", "Weight", "kg", 40, 140),)
+    ),
+    SyntheticTemplate(
+        "ehrbase.benchmark.vital_signs.v1", "openEHR-EHR-COMPOSITION.encounter.v1",
+        "openEHR-EHR-OBSERVATION.pulse.v2", "at0002", "at0003", "at0001",
+        (SyntheticElement("at0004", "Rate", "/min", 40, 160),
+         SyntheticElement("at1005", "Regularity", "1", 0, 1))
+    ),
+)
+
+
+@dataclass(frozen=True)
+class SyntheticPopulation:
+    ehr_count: int
+    compositions_per_ehr: int
+    templates: Sequence[SyntheticTemplate] = DEFAULT_TEMPLATES
+    seed: int = 42
+    start: datetime = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+
+@dataclass
+class GeneratedDataset:
+    ehr_ids: List[uuid.UUID] = field(default_factory=list)
+    template_uuids: Dict[str, uuid.UUID] = field(default_factory=dict)
+    row_counts: Dict[str, int] = field(default_factory=dict)
+
+    def sample_parameters(self) -> Dict[str, Any]:
+        """Query parameters the benchmark catalogue binds against the generated data."""
+        return {"ehr_id": str(self.ehr_ids[0])} if self.ehr_ids else {}
+
+
+def _concept(archetype_id: str) -> str:
+    # entity_concept as stored by the db format: the archetype id without "openEHR-EHR-<RM type>"
+    return archetype_id[archetype_id.index(".", len("openEHR-EHR-")):]
+
+
+def _text(value: str) -> Dict[str, Any]:
+    return {"_type": "DV_TEXT", "value": value}
+
+
+def _code_phrase(terminology: str, code: str) -> Dict[str, Any]:
+    return {"_type": "CODE_PHRASE", "terminology_id": {"_type": "TERMINOLOGY_ID", "value": terminology},
+            "code_string": code}
+
+
+def _date_time(value: datetime) -> Dict[str, Any]:
+    return {"_type": "DV_DATE_TIME", "value": value.isoformat()}
+
+
+class SyntheticEhrGenerator:
+    """
+    Writes a reproducible synthetic population into the ehr schema: EHRs with compositions
+    in the comp_version / comp_data layout, including the audit, contribution and template
+    rows they reference. The same seed always yields the same data.
+    """
+
+    def __init__(self, engine: Engine, population: SyntheticPopulation, batch_size: int = 1000):
+        self.engine = engine
+        self.population = population
+        self.batch_size = batch_size
+        self.random = random.Random(population.seed)
+
+    def next_uuid(self) -> uuid.UUID:
+        return uuid.UUID(int=self.random.getrandbits(128), version=4)
+
+    def generate(self) -> GeneratedDataset:
+        dataset = GeneratedDataset()
+        rows: Dict[str, List[Dict[str, Any]]] = {}
+
+        user_id = self.next_uuid()
+        self._add(rows, Tables.USERS, {"id": user_id, "username": "ehrbase-benchmark"})
+        for template in self.population.templates:
+            template_uuid = self.next_uuid()
+            dataset.template_uuids[template.template_id] = template_uuid
+            self._add(rows, Tables.TEMPLATE_STORE, {
+                "id": template_uuid, "template_id": template.template_id, "content": "",
+                "creation_time": self.population.start
+            })
+
+        with self.engine.begin() as conn:
+            self._flush(conn, rows, dataset, force=True)
+            for e in range(self.population.ehr_count):
+                ehr_id = self.next_uuid()
+                dataset.ehr_ids.append(ehr_id)
+                created = self.population.start + timedelta(minutes=e)
+                self._add(rows, Tables.EHR_, {"id": ehr_id, "creation_date": created})
+                for c in range(self.population.compositions_per_ehr):
+                    template = self.population.templates[c % len(self.population.templates)]
+                    committed = created + timedelta(hours=c + 1)
+                    self._add_composition(rows, ehr_id, user_id, dataset.template_uuids[template.template_id],
+                                          template, committed)
+                self._flush(conn, rows, dataset)
+            self._flush(conn, rows, dataset, force=True)
+
+        logger.info(f"Generated {len(dataset.ehr_ids)} EHRs: {dataset.row_counts}")
+        return dataset
+
+    def _add_composition(self, rows, ehr_id: uuid.UUID, user_id: uuid.UUID, template_uuid: uuid.UUID,
+                         template: SyntheticTemplate, committed: datetime) -> None:
+        vo_id = self.next_uuid()
+        contribution_audit_id = self.next_uuid()
+        version_audit_id = self.next_uuid()
+        contribution_id = self.next_uuid()
+        for audit_id, target_type in ((contribution_audit_id, "CT"), (version_audit_id, "CO")):
+            self._add(rows, Tables.AUDIT_DETAILS, {
+                "id": audit_id, "change_type": "creation", "description": None, "time_committed": committed,
+                "committer": None, "user_id": user_id, "target_type": target_type
+            })
+        self._add(rows, Tables.CONTRIBUTION, {
+            "id": contribution_id, "ehr_id": ehr_id, "contribution_type": "composition",
+            "signature": None, "has_audit": contribution_audit_id
+        })
+        self._add(rows, Tables.COMP_VERSION, {
+            "vo_id": vo_id, "ehr_id": ehr_id, "contribution_id": contribution_id, "audit_id": version_audit_id,
+            "template_id": template_uuid, "sys_version": 1, "sys_period_lower": committed,
+            "root_concept": _concept(template.composition_archetype_id)
+        })
+        for data_row in self.composition_rows(vo_id, template, committed):
+            self._add(rows, Tables.COMP_DATA, data_row)
+
+    def composition_rows(self, vo_id: uuid.UUID, template: SyntheticTemplate,
+                         committed: datetime) -> Iterator[Dict[str, Any]]:
+        """The comp_data rows of a composition of the template, shredded as on commit."""
+        for node in VersionedObjectDataStructure.create_data_structure(self.composition(template, committed)):
+            yield VersionDataDbRecord.data_record_columns(vo_id, node)
+
+    def composition(self, template: SyntheticTemplate, committed: datetime) -> Dict[str, Any]:
+        """
+        The canonical JSON of a composition of the template:
+        COMPOSITION / OBSERVATION / HISTORY / POINT_EVENT / ITEM_TREE / ELEMENT*.
+        """
+        observation_name = _concept(template.observation_archetype_id).split(".")[1]
+        elements = [{
+            "_type": "ELEMENT", "archetype_node_id": element.node_id, "name": _text(element.name),
+            "value": {"_type": "DV_QUANTITY", "units": element.units,
+                      "magnitude": round(self.random.uniform(element.low, element.high), 1)}
+        } for element in template.elements]
+        return {
+            "_type": "COMPOSITION",
+            "archetype_node_id": template.composition_archetype_id,
+            "name": _text("Encounter"),
+            "language": _code_phrase("ISO_639-1", "en"),
+            "territory": _code_phrase("ISO_3166-1", "DE"),
+            "category": {"_type": "DV_CODED_TEXT", "value": "event",
+                         "defining_code": _code_phrase("openehr", "433")},
+            "composer": {"_type": "PARTY_SELF"},
+            "content": [{
+                "_type": "OBSERVATION",
+                "archetype_node_id": template.observation_archetype_id,
+                "name": _text(observation_name),
+                "language": _code_phrase("ISO_639-1", "en"),
+                "encoding": _code_phrase("IANA_character-sets", "UTF-8"),
+                "subject": {"_type": "PARTY_SELF"},
+                "data": {
+                    "_type": "HISTORY", "archetype_node_id": template.history_node_id, "name": _text("History"),
+                    "origin": _date_time(committed),
+                    "events": [{
+                        "_type": "POINT_EVENT", "archetype_node_id": template.event_node_id,
+                        "name": _text("Any event"), "time": _date_time(committed),
+                        "data": {"_type": "ITEM_TREE", "archetype_node_id": template.tree_node_id,
+                                 "name": _text("Tree"), "items": elements}
+                    }]
+                }
+            }]
+        }
+
+    def _add(self, rows: Dict[str, List[Dict[str, Any]]], table, row: Dict[str, Any]) -> None:
+        rows.setdefault(table.name, []).append(row)
+
+    def _flush(self, conn, rows: Dict[str, List[Dict[str, Any]]], dataset: GeneratedDataset,
+               force: bool = False) -> None:
+        if not force and sum(len(r) for r in rows.values()) < self.batch_size:
+            return
+        # parents before children, to satisfy the foreign keys
+        for table in (Tables.USERS, Tables.TEMPLATE_STORE, Tables.EHR_, Tables.AUDIT_DETAILS,
+                      Tables.CONTRIBUTION, Tables.COMP_VERSION, Tables.COMP_DATA):
+            batch = rows.pop(table.name, None)
+            if batch:
+                conn.execute(insert(table), batch)
+                dataset.row_counts[table.name] = dataset.row_counts.get(table.name, 0) + len(batch)
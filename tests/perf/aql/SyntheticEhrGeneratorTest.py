@@ -0,0 +1,40 @@
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from your_module import (DEFAULT_TEMPLATES, DbJsonPath, DbToCanonicalJson, DbToRmFormat, SyntheticEhrGenerator,
+                         SyntheticPopulation)
+
+COMMITTED = datetime(2024, 1, 1, 10, tzinfo=timezone.utc)
+
+
+def generator():
+    # rows are built without a database
+    return SyntheticEhrGenerator(None, SyntheticPopulation(ehr_count=1, compositions_per_ehr=1))
+
+
+@pytest.mark.parametrize("template", DEFAULT_TEMPLATES, ids=lambda t: t.template_id)
+def test_composition_rows_decode(template):
+    vo_id = uuid.uuid4()
+    rows = list(generator().composition_rows(vo_id, template, COMMITTED))
+
+    # as read back: one row per structure node, keyed by entity_idx
+    decoded = DbToCanonicalJson.transcode({row["entity_idx"]: row["data"] for row in rows})
+    assert decoded == generator().composition(template, COMMITTED)
+    assert [row["num"] for row in rows] == list(range(len(rows)))
+    assert {row["vo_id"] for row in rows} == {vo_id}
+    assert rows[0]["rm_entity"] == "CO" and rows[0]["data"]["T"] == "COMPOSITION"
+
+
+def test_composition_rows_entity_idx():
+    rows = list(generator().composition_rows(uuid.uuid4(), DEFAULT_TEMPLATES[0], COMMITTED))
+    entries = {row["entity_idx"]: row for row in rows}
+
+    assert [row["entity_idx"] for row in rows] == [
+        "", "c0.", "c0.d.", "c0.d.e0.", "c0.d.e0.d.", "c0.d.e0.d.i0.", "c0.d.e0.d.i1."]
+    for row in rows[1:]:
+        parent, (attribute, _) = DbJsonPath.split_last(row["entity_idx"])
+        assert entries[parent]["num"] == row["parent_num"]
+        assert attribute == row["entity_attribute"]
+        assert row["entity_idx_len"] == len(DbJsonPath.parse(row["entity_idx"]).components)
+    assert DbToRmFormat.reassemble({row["entity_idx"]: row["data"] for row in rows})["T"] == "COMPOSITION"
@@ -0,0 +1,184 @@
+import argparse
+import copy
+import json
+import logging
+import platform
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmark_statistics import percentile
+from db_to_rm_format import DbToRmFormat
+from dv_magnitude import DvMagnitude, MAGNITUDE_FIELD
+from structure_index import StructureIndex
+from structure_rm_type import StructureRmType
+from versioned_object_data_structure import VersionedObjectDataStructure
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ShredderBenchmarkResult:
+    name: str
+    iterations: int
+    structure_nodes: int
+    p50_ms: float
+    p95_ms: float
+    mean_ms: float
+    peak_memory_bytes: int
+
+
+def text(value: str) -> Dict[str, Any]:
+    return {"_type": "DV_TEXT", "value": value}
+
+
+def analyte_value(i: int) -> Dict[str, Any]:
+    """Mostly quantities, every fourth analyte a sampling time and every eighth a ratio, which carry a magnitude."""
+    if i % 8 == 7:
+        return {"_type": "DV_PROPORTION", "numerator": i, "denominator": 100, "type": 2}
+    if i % 4 == 3:
+        return {"_type": "DV_DATE_TIME", "value": f"2024-03-{i % 28 + 1:02d}T{i % 24:02d}:{i % 60:02d}:00+01:00"}
+    return {"_type": "DV_QUANTITY", "magnitude": i * 0.1, "units": "mmol/l", "precision": 1}
+
+
+def create_lab_composition(elements: int, elements_per_cluster: int = 20) -> Dict[str, Any]:
+    """A laboratory result with the analytes grouped into clusters of elements_per_cluster."""
+    clusters = []
+    for c in range(0, elements, elements_per_cluster):
+        items = [{
+            "_type": "ELEMENT", "archetype_node_id": "at0001", "name": text(f"Analyte {i}"),
+            "value": analyte_value(i), "null_flavour": None
+        } for i in range(c, min(c + elements_per_cluster, elements))]
+        clusters.append({"_type": "CLUSTER", "archetype_node_id": "at0002", "name": text(f"Panel {c}"),
+                         "items": items})
+    return {
+        "_type": "COMPOSITION", "archetype_node_id": "openEHR-EHR-COMPOSITION.report-result.v1",
+        "name": text("Laboratory result"),
+        "language": {"_type": "CODE_PHRASE", "code_string": "en",
+                     "terminology_id": {"_type": "TERMINOLOGY_ID", "value": "ISO_639-1"}},
+        "context": {"_type": "EVENT_CONTEXT", "setting": {"_type": "DV_CODED_TEXT", "value": "other care"}},
+        "content": [{
+            "_type": "OBSERVATION", "archetype_node_id": "openEHR-EHR-OBSERVATION.laboratory_test_result.v1",
+            "name": text("Laboratory test result"),
+            "data": {
+                "_type": "HISTORY", "archetype_node_id": "at0001", "name": text("History"),
+                "events": [{
+                    "_type": "POINT_EVENT", "archetype_node_id": "at0002", "name": text("Any event"),
+                    "data": {"_type": "ITEM_TREE", "archetype_node_id": "at0003", "name": text("Tree"),
+                             "items": clusters}
+                }]
+            }
+        }]
+    }
+
+
+def reference_shred(composition: Dict[str, Any]) -> list:
+    """
+    The multi-pass pipeline the shredder replaced, as reference: a copy of the composition, a
+    recursive walk adding magnitudes, a recursive split into structure nodes removing the structure
+    entries from their parents and an aliased copy of every node.
+    """
+    json_node = copy.deepcopy(composition)
+
+    def objects(value):
+        children = value.values() if isinstance(value, dict) else value if isinstance(value, list) else ()
+        for child in children:
+            yield from objects(child)
+        if isinstance(value, dict):
+            yield value
+
+    for obj in objects(json_node):
+        magnitude = DvMagnitude.of(obj.get(DbToRmFormat.TYPE_ATTRIBUTE), obj)
+        if magnitude is not None:
+            obj[MAGNITUDE_FIELD] = magnitude
+
+    root = VersionedObjectDataStructure.create_structure_dto(None, json_node, StructureRmType.COMPOSITION, None)
+    roots = [root]
+
+    def split(owner, value, attribute, idx):
+        if isinstance(value, list):
+            return all([split(owner, child, attribute, i) for i, child in enumerate(value)])
+        if not isinstance(value, dict):
+            return True
+        structure_rm_type = VersionedObjectDataStructure.structure_type(owner, value)
+        if structure_rm_type is not None:
+            owner = VersionedObjectDataStructure.create_structure_dto(
+                owner, value, structure_rm_type, StructureIndex.Node.of(attribute, idx))
+            roots.append(owner)
+        for child_attribute in list(value):
+            if not split(owner, value[child_attribute], child_attribute, None):
+                del value[child_attribute]
+        return structure_rm_type is None or not structure_rm_type.is_structure_entry()
+
+    for attribute in list(json_node):
+        if not split(root, json_node[attribute], attribute, None):
+            del json_node[attribute]
+    return [(r, VersionedObjectDataStructure.apply_rm_aliases(r.get_json_node())) for r in roots]
+
+
+def run_shredder(name: str, shred: Callable[[Dict[str, Any]], list], composition: Dict[str, Any],
+                 warmup: int, iterations: int) -> ShredderBenchmarkResult:
+    logger.info(f"Benchmarking {name}")
+    for _ in range(warmup):
+        shred(composition)
+
+    latencies = []
+    nodes = 0
+    for _ in range(iterations):
+        start = time.perf_counter()
+        nodes = len(shred(composition))
+        latencies.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        shred(composition)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    return ShredderBenchmarkResult(
+        name=name,
+        iterations=iterations,
+        structure_nodes=nodes,
+        p50_ms=round(percentile(latencies, 50) * 1000, 3),
+        p95_ms=round(percentile(latencies, 95) * 1000, 3),
+        mean_ms=round(sum(latencies) / len(latencies) * 1000, 3),
+        peak_memory_bytes=peak_memory
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Composition shredder benchmark")
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--elements", type=int, default=5000)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    composition = create_lab_composition(args.elements)
+    results = [
+        run_shredder("reference", reference_shred, composition, args.warmup, args.iterations),
+        run_shredder("shredder", VersionedObjectDataStructure.create_data_structure, composition,
+                     args.warmup, args.iterations)
+    ]
+    reference, shredder = results
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "elements": args.elements,
+        "shredders": {r.name: asdict(r) for r in results},
+        "speedup": round(reference.p50_ms / shredder.p50_ms, 2) if shredder.p50_ms else None
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Speedup (p50): {report['speedup']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
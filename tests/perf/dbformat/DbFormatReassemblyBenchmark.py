@@ -0,0 +1,125 @@
+import argparse
+import json
+import logging
+import platform
+import sys
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from benchmark_statistics import percentile
+from composition_shredder_benchmark import create_lab_composition
+from db_to_rm_format import DbToRmFormat
+from versioned_object_data_structure import VersionedObjectDataStructure
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ReassemblyBenchmarkResult:
+    name: str
+    iterations: int
+    rows: int
+    p50_ms: float
+    p95_ms: float
+    mean_ms: float
+    rows_per_second: float
+
+
+def create_rows(elements: int) -> Dict[str, str]:
+    """The data rows of a composition as read from the database: entity_idx -> jsonb text."""
+    nodes = VersionedObjectDataStructure.create_data_structure(create_lab_composition(elements))
+    return {n.entity_idx.print_index_string(False, True): json.dumps(n.get_db_json()) for n in nodes}
+
+
+def parse_characters(path: str) -> List[Tuple[str, Optional[int]]]:
+    components = []
+    sb = []
+    nr = -1
+    for ch in path:
+        if ch == '.':
+            components.append((''.join(sb), nr if nr >= 0 else None))
+            nr = -1
+            sb.clear()
+        elif ch.isdigit():
+            nr = int(ch) if nr < 0 else 10 * nr + int(ch)
+        else:
+            sb.append(ch)
+    return components
+
+
+def reference_reassemble(entries: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The previous reassembly, as reference: each path is sliced relative to the root and parsed
+    character by character, and each entry is placed by walking down from the root.
+    """
+    paths = sorted(entries, key=len)
+    root_length = len(paths[0])
+    root = entries[paths[0]]
+    for path in paths[1:]:
+        remaining = path[root_length + 1:] if path[root_length:root_length + 1] == '.' else path[root_length:]
+        components = parse_characters(remaining)
+        parent = root
+        for alias, idx in components[:-1]:
+            parent = parent[alias] if idx is None else parent[alias][idx]
+        DbToRmFormat.attach(parent, components[-1], entries[path])
+    return root
+
+
+def run_reassembly(name: str, reassemble: Callable[[Dict[str, Any]], Dict[str, Any]], rows: Dict[str, str],
+                   warmup: int, iterations: int) -> ReassemblyBenchmarkResult:
+    logger.info(f"Benchmarking {name}")
+    latencies = []
+    for i in range(warmup + iterations):
+        # reassembly modifies the entries, each run gets freshly decoded rows like from the driver
+        entries = {k: json.loads(v) for k, v in rows.items()}
+        start = time.perf_counter()
+        reassemble(entries)
+        if i >= warmup:
+            latencies.append(time.perf_counter() - start)
+
+    latencies.sort()
+    total = sum(latencies)
+    return ReassemblyBenchmarkResult(
+        name=name,
+        iterations=iterations,
+        rows=len(rows),
+        p50_ms=round(percentile(latencies, 50) * 1000, 3),
+        p95_ms=round(percentile(latencies, 95) * 1000, 3),
+        mean_ms=round(total / len(latencies) * 1000, 3),
+        rows_per_second=round(len(rows) * len(latencies) / total, 1) if total > 0 else 0.0
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="DB format reassembly benchmark")
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--elements", type=int, default=10000, help="elements of the composition, one data row each")
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    rows = create_rows(args.elements)
+    results = [
+        run_reassembly("reference", reference_reassemble, rows, args.warmup, args.iterations),
+        run_reassembly("reassembly", DbToRmFormat.reassemble, rows, args.warmup, args.iterations),
+        run_reassembly("reassembly_decoded", lambda e: DbToRmFormat.decode_keys(DbToRmFormat.reassemble(e)), rows,
+                       args.warmup, args.iterations)
+    ]
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "rows": len(rows),
+        "reassemblies": {r.name: asdict(r) for r in results},
+        "speedup": round(results[0].p50_ms / results[1].p50_ms, 2) if results[1].p50_ms else None
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Speedup (p50): {report['speedup']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())